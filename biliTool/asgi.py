@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "biliTool.settings")
 
 application = get_asgi_application()
+
+# 只在服务进程中预热jieba词典，管理命令不会执行这里
+from bilistudy.content_filter import warmup_on_startup  # noqa: E402
+
+warmup_on_startup()
@@ -144,6 +144,79 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# 缓存配置
+# 本地开发使用LocMem；生产环境可将BACKEND换成
+# "django.core.cache.backends.redis.RedisCache"，LOCATION填写redis地址
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # B站搜索结果缓存：TIMEOUT为TTL（秒），MAX_ENTRIES为最大条目数（超出后按LRU淘汰）
+    "bilibili_search": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "bilibili-search",
+        "TIMEOUT": int(os.getenv('BILIBILI_SEARCH_CACHE_TTL', 300)),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv('BILIBILI_SEARCH_CACHE_MAX_ENTRIES', 1000)),
+        },
+    },
+}
+
+# 视频元数据刷新：超过该时长（秒）未更新的BiliVideo在被访问时加入后台刷新队列
+BILIVIDEO_STALE_SECONDS = int(os.getenv('BILIVIDEO_STALE_SECONDS', 6 * 60 * 60))
+# 是否在Web进程内用后台线程刷新；关闭后由 refresh_stale_videos 管理命令定时刷新
+BILIVIDEO_BACKGROUND_REFRESH = os.getenv('BILIVIDEO_BACKGROUND_REFRESH', 'True').lower() in ('true', '1', 't')
+
+# 学习报告PDF：是否在Web进程内用后台线程池生成（关闭后由 run_report_jobs 管理命令生成）、线程数、生成超时（秒）
+PLAN_REPORT_BACKGROUND = os.getenv('PLAN_REPORT_BACKGROUND', 'True').lower() in ('true', '1', 't')
+PLAN_REPORT_WORKERS = int(os.getenv('PLAN_REPORT_WORKERS', 2))
+PLAN_REPORT_TIMEOUT = int(os.getenv('PLAN_REPORT_TIMEOUT', 10 * 60))
+# 报告使用的中文字体文件（可选）；未配置时在字体目录（逗号分隔，默认为常见的Linux/Windows/macOS字体目录）中查找，找不到时使用ReportLab自带的STSong-Light
+PLAN_REPORT_FONT_FILE = os.getenv('PLAN_REPORT_FONT_FILE') or None
+PLAN_REPORT_FONT_DIRS = [path for path in os.getenv('PLAN_REPORT_FONT_DIRS', '').split(',') if path]
+
+# AI服务状态检查：结果缓存时长（秒），以及后台刷新间隔（秒，0 表示不在后台刷新）
+AI_STATUS_CACHE_TTL = int(os.getenv('AI_STATUS_CACHE_TTL', 60))
+AI_STATUS_REFRESH_INTERVAL = int(os.getenv('AI_STATUS_REFRESH_INTERVAL', 30))
+
+# AI服务熔断：最近WINDOW秒内至少MIN_REQUESTS次调用且失败率达到FAILURE_RATE时熔断OPEN秒，期间直接切换到另一个服务
+AI_BREAKER_WINDOW_SECONDS = int(os.getenv('AI_BREAKER_WINDOW_SECONDS', 60))
+AI_BREAKER_MIN_REQUESTS = int(os.getenv('AI_BREAKER_MIN_REQUESTS', 5))
+AI_BREAKER_FAILURE_RATE = float(os.getenv('AI_BREAKER_FAILURE_RATE', 0.5))
+AI_BREAKER_OPEN_SECONDS = int(os.getenv('AI_BREAKER_OPEN_SECONDS', 30))
+# 对冲请求：首选服务超过该秒数仍无响应时同时请求备用服务，0 表示关闭（会增加调用费用）
+AI_HEDGE_DELAY = float(os.getenv('AI_HEDGE_DELAY', 0))
+
+# 网络连通性诊断间隔（秒），0 表示不定期诊断（仍会在需要时按需诊断）
+AI_DIAGNOSTICS_INTERVAL = int(os.getenv('AI_DIAGNOSTICS_INTERVAL', 300))
+# 诊断结果使用的缓存别名；为Redis等共享缓存时各Worker和 ai_diagnostics 命令共用一份结果，LocMem时只在本进程有效
+AI_DIAGNOSTICS_CACHE_ALIAS = os.getenv('AI_DIAGNOSTICS_CACHE_ALIAS', 'default')
+
+# AI助手使用的用户学习情况快照缓存时长（秒）；课程、进度、计划变化时会主动失效。多Worker部署时default缓存应使用Redis等共享缓存
+LEARNING_CONTEXT_CACHE_TTL = int(os.getenv('LEARNING_CONTEXT_CACHE_TTL', 60 * 60))
+
+# AI助手对话历史的token预算：最近几轮完整对话按预算装入提示词，更早的对话合并为摘要（摘要另有上限）
+CHAT_MEMORY_TOKEN_BUDGET = int(os.getenv('CHAT_MEMORY_TOKEN_BUDGET', 1500))
+CHAT_MEMORY_SUMMARY_MAX_TOKENS = int(os.getenv('CHAT_MEMORY_SUMMARY_MAX_TOKENS', 500))
+
+# AI助手通用问题回复缓存（默认关闭）：会话中第一个general类型问题按 问题+模型 共享回复，相近问题按字符二元组相似度匹配
+AI_RESPONSE_CACHE_ENABLED = os.getenv('AI_RESPONSE_CACHE_ENABLED', 'False').lower() in ('true', '1', 't')
+AI_RESPONSE_CACHE_TTL = int(os.getenv('AI_RESPONSE_CACHE_TTL', 7 * 24 * 60 * 60))
+AI_RESPONSE_CACHE_SIMILARITY = float(os.getenv('AI_RESPONSE_CACHE_SIMILARITY', 0.8))
+
+# jieba词典预热方式（只在runserver/ASGI/WSGI服务启动时生效，管理命令不预热）：background（启动时后台加载，加载完成前使用简单切分）、sync（启动时同步加载）、off（启动时不预热，首次搜索时再在后台加载）
+JIEBA_WARMUP_MODE = os.getenv('JIEBA_WARMUP_MODE', 'background')
+# 预先生成的jieba词典缓存文件路径（可选），不配置时使用jieba默认的临时目录缓存
+JIEBA_CACHE_FILE = os.getenv('JIEBA_CACHE_FILE') or None
+
+# 内容分析结果缓存：进程内LRU的最大条目数；ALIAS配置为CACHES中的别名（如"default"）时再用该缓存在Worker间共享
+CONTENT_ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv('CONTENT_ANALYSIS_CACHE_MAX_ENTRIES', 2048))
+CONTENT_ANALYSIS_CACHE_ALIAS = os.getenv('CONTENT_ANALYSIS_CACHE_ALIAS') or None
+CONTENT_ANALYSIS_CACHE_TTL = int(os.getenv('CONTENT_ANALYSIS_CACHE_TTL', 60 * 60))
+
+# 关键词库热加载：每隔多少秒检查一次 content_filter_keywords.txt 是否修改，0 表示关闭
+CONTENT_FILTER_RELOAD_INTERVAL = float(os.getenv('CONTENT_FILTER_RELOAD_INTERVAL', 5))
+
 # 邮件配置
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.163.com')  # 163邮箱SMTP服务器
@@ -1,9 +1,11 @@
 from django.contrib import admin
-from .models import BiliVideo, VideoEpisode, UserCourse, LearningProgress, EmailVerification, StudyPlan, DailyStudyRecord
+from .models import BiliVideo, VideoEpisode, UserCourse, LearningProgress, EmailVerification, StudyPlan, DailyStudyRecord, AIContentVerdict, AIResponseCache, PlanReportJob
+from django.utils import timezone
+from .ai_verdicts import make_prompt_hash, make_query_key
 
 @admin.register(BiliVideo)
 class BiliVideoAdmin(admin.ModelAdmin):
-    list_display = ('title', 'bvid', 'author', 'pub_date', 'play_count', 'like_count')
+    list_display = ('title', 'bvid', 'author', 'pub_date', 'play_count', 'like_count', 'metadata_updated_at')
     search_fields = ('title', 'bvid', 'author')
     list_filter = ('pub_date',)
     date_hierarchy = 'pub_date'
@@ -50,3 +52,64 @@ class LearningProgressAdmin(admin.ModelAdmin):
     list_display = ('user_course', 'episode', 'is_completed', 'update_time')
     list_filter = ('is_completed', 'update_time')
     search_fields = ('episode__title',)
+
+
+@admin.register(AIContentVerdict)
+class AIContentVerdictAdmin(admin.ModelAdmin):
+    list_display = ('search_query', 'is_learning_related', 'confidence', 'source', 'is_override', 'hit_count', 'updated_at')
+    list_filter = ('is_learning_related', 'source', 'is_override', 'updated_at')
+    search_fields = ('search_query', 'reason')
+    readonly_fields = ('source', 'is_override', 'prompt_hash', 'query_key', 'full_response', 'hit_count', 'created_at', 'updated_at')
+    fields = ('search_query', 'is_learning_related', 'confidence', 'reason', 'prompt',
+              'source', 'is_override', 'full_response', 'prompt_hash', 'query_key', 'hit_count', 'created_at', 'updated_at')
+
+    def save_model(self, request, obj, form, change):
+        # 管理员新增或修改的结论都作为修正，对该搜索词的所有分析生效；删除记录即可撤销
+        obj.query_key = make_query_key(obj.search_query)
+        if not obj.prompt_hash:
+            obj.prompt_hash = make_prompt_hash(obj.prompt or f"query:{obj.query_key}")
+        obj.is_override = True
+        obj.source = 'admin'
+        if change:
+            super().save_model(request, obj, form, change)
+            return
+
+        # 同一搜索词已有结论（AI结果或之前的修正）时更新该记录，prompt_hash 唯一
+        verdict, _ = AIContentVerdict.objects.update_or_create(
+            prompt_hash=obj.prompt_hash,
+            defaults={
+                'query_key': obj.query_key,
+                'search_query': obj.search_query,
+                'prompt': obj.prompt,
+                'is_learning_related': obj.is_learning_related,
+                'confidence': obj.confidence,
+                'reason': obj.reason,
+                'is_override': True,
+                'source': 'admin',
+            },
+        )
+        obj.pk = verdict.pk
+        obj.hit_count = verdict.hit_count
+        obj.created_at = verdict.created_at
+        obj.updated_at = verdict.updated_at
+        obj._state.adding = False
+
+
+@admin.register(AIResponseCache)
+class AIResponseCacheAdmin(admin.ModelAdmin):
+    list_display = ('question', 'ai_model', 'hit_count', 'last_hit_at', 'is_expired', 'expires_at', 'created_at')
+    list_filter = ('ai_model', 'expires_at', 'created_at')
+    search_fields = ('question', 'response')
+    readonly_fields = ('question_hash', 'ai_model', 'question', 'normalized_question', 'hit_count', 'last_hit_at', 'created_at')
+
+    @admin.display(boolean=True, description='已过期')
+    def is_expired(self, obj):
+        return obj.expires_at <= timezone.now()
+
+
+@admin.register(PlanReportJob)
+class PlanReportJobAdmin(admin.ModelAdmin):
+    list_display = ('study_plan', 'user', 'status', 'created_at', 'started_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('user__username', 'filename')
+    readonly_fields = ('fingerprint', 'created_at', 'started_at', 'finished_at')
@@ -0,0 +1,136 @@
+"""
+网络连通性诊断
+定期（AI_DIAGNOSTICS_INTERVAL 秒）或按需检查基本网络、DeepSeek和Google AI服务器的连通性，
+结果保存在 AI_DIAGNOSTICS_CACHE_ALIAS 缓存中（默认default）。该缓存为Redis等共享缓存时，各Worker和
+ai_diagnostics 管理命令共用同一份结果；LocMemCache只在本进程内有效，管理命令的结果不会更新服务进程的结果。聊天请求不再在每条消息前做连通性测试；调用失败时读取最近一次诊断结果
+（不发起网络请求）附在错误信息中，帮助用户判断是网络、DNS还是服务本身的问题
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+CACHE_KEY = 'ai_diagnostics'
+DEFAULT_INTERVAL = 300
+PROBE_TIMEOUT = 5
+
+# (检查项, 名称, 地址)
+TARGETS = [
+    ('internet', '基本网络', 'https://www.baidu.com'),
+    ('deepseek', 'DeepSeek服务器', 'https://api.deepseek.com'),
+    ('gemini', 'Google AI服务器', 'https://generativelanguage.googleapis.com'),
+]
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ai-diagnostics')
+_inflight = None
+_inflight_lock = threading.Lock()
+_refresher_started = False
+
+
+def get_interval():
+    return getattr(settings, 'AI_DIAGNOSTICS_INTERVAL', DEFAULT_INTERVAL)
+
+
+def get_cache():
+    return caches[getattr(settings, 'AI_DIAGNOSTICS_CACHE_ALIAS', 'default')]
+
+
+def is_shared_cache():
+    """诊断结果能否被其他进程读取（进程内缓存不能）"""
+    return not isinstance(get_cache(), (LocMemCache, DummyCache))
+
+
+async def _check(client, name, url):
+    """能收到HTTP响应即视为连通（不关心状态码）"""
+    start = time.perf_counter()
+    try:
+        await client.get(url)
+    except httpx.TimeoutException:
+        return {'name': name, 'ok': False, 'error': '连接超时'}
+    except httpx.ConnectError as e:
+        return {'name': name, 'ok': False, 'error': f'无法连接（可能是DNS问题或防火墙阻止）：{str(e)[:100]}'}
+    except httpx.HTTPError as e:
+        return {'name': name, 'ok': False, 'error': str(e)[:100]}
+    return {'name': name, 'ok': True, 'latency_ms': round((time.perf_counter() - start) * 1000)}
+
+
+async def check_all():
+    """并发检查全部目标"""
+    async with httpx.AsyncClient(timeout=PROBE_TIMEOUT) as client:
+        results = await asyncio.gather(*(_check(client, name, url) for _, name, url in TARGETS))
+    return {key: result for (key, _, _), result in zip(TARGETS, results)}
+
+
+def run_diagnostics():
+    """执行一次诊断并保存结果"""
+    snapshot = {
+        'checks': asyncio.run(check_all()),
+        'checked_at': timezone.now().isoformat(),
+    }
+    # 结果保留两个检查周期，刷新线程停止后旧结果会自然过期
+    get_cache().set(CACHE_KEY, snapshot, max(get_interval(), 60) * 2)
+    return snapshot
+
+
+def refresh():
+    """在后台执行诊断并返回其Future；已有诊断进行中时直接返回它"""
+    global _inflight
+    with _inflight_lock:
+        if _inflight is None or _inflight.done():
+            _inflight = _executor.submit(run_diagnostics)
+        return _inflight
+
+
+def _refresh_loop(interval):
+    while True:
+        try:
+            refresh().result()
+        except Exception as e:
+            print(f"网络诊断失败: {str(e)}")
+        time.sleep(interval)
+
+
+def start_background_refresher():
+    """启动定期诊断线程（每个进程只启动一次），AI_DIAGNOSTICS_INTERVAL为0时不启动"""
+    global _refresher_started
+    interval = get_interval()
+    if not interval:
+        return
+    with _inflight_lock:
+        if _refresher_started:
+            return
+        _refresher_started = True
+    threading.Thread(target=_refresh_loop, args=(interval,), name='ai-diagnostics', daemon=True).start()
+
+
+def get_snapshot():
+    """最近一次诊断结果（只读缓存，不发起网络请求）；没有结果时返回None并在后台开始诊断"""
+    start_background_refresher()
+    snapshot = get_cache().get(CACHE_KEY)
+    if snapshot is None:
+        refresh()
+    return snapshot
+
+
+def describe(snapshot):
+    """把诊断结果整理成一句提示"""
+    if not snapshot:
+        return ''
+    failed = [check for check in snapshot['checks'].values() if not check['ok']]
+    if not failed:
+        return '网络诊断：网络与AI服务器连接均正常。'
+    return '网络诊断：' + '；'.join(f"{check['name']}{check['error']}" for check in failed) + '。'
+
+
+def with_diagnostics(message):
+    """在AI调用失败的错误信息后附上最近一次网络诊断结果"""
+    hint = describe(get_snapshot())
+    return f"{message}（{hint}）" if hint else message
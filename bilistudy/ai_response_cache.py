@@ -0,0 +1,134 @@
+"""
+AI助手通用问题回复缓存（可选，AI_RESPONSE_CACHE_ENABLED 开启）
+"零基础怎么学Python"之类的问题在不同用户间大量重复，每次都要等待十几秒的模型调用。
+只缓存不含个人信息的问题：聊天类型为general（系统提示词不含课程和进度）、且是会话中的第一个问题
+（没有对话历史）。回复按实际回答的模型保存（故障切换时为备用模型），按 规范化问题 + 模型 精确匹配，未命中时用字符二元组的Jaccard相似度在本地做模糊匹配，
+不依赖外部向量服务。缓存条目在 AI_RESPONSE_CACHE_TTL 秒后过期，命中次数可在后台查看
+"""
+
+import hashlib
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AIResponseCache
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_SIMILARITY = 0.8
+# 模糊匹配时最多比较的缓存条目数（按命中次数优先）
+MAX_CANDIDATES = 1000
+MAX_QUESTION_LENGTH = 500
+
+NON_WORD_PATTERN = re.compile(r'[\W_]+')
+
+
+def is_enabled():
+    return getattr(settings, 'AI_RESPONSE_CACHE_ENABLED', False)
+
+
+def get_ttl():
+    return getattr(settings, 'AI_RESPONSE_CACHE_TTL', DEFAULT_TTL)
+
+
+def get_similarity_threshold():
+    return getattr(settings, 'AI_RESPONSE_CACHE_SIMILARITY', DEFAULT_SIMILARITY)
+
+
+def normalize_question(question):
+    """规范化问题：转小写，去掉空白和标点"""
+    return NON_WORD_PATTERN.sub('', (question or '').lower())[:MAX_QUESTION_LENGTH]
+
+
+def make_question_hash(normalized, ai_model):
+    return hashlib.sha256(f"{ai_model}:{normalized}".encode('utf-8')).hexdigest()
+
+
+def ngrams(text, n=2):
+    """字符n元组集合"""
+    if len(text) <= n:
+        return {text}
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def similarity(a, b):
+    """两个n元组集合的Jaccard相似度"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def is_cacheable(chat_type, chat_history):
+    """只有不含个人信息的问题才能在用户间共享回复"""
+    return is_enabled() and chat_type == 'general' and not chat_history.strip()
+
+
+async def _find_similar(normalized, ai_model, now):
+    """在未过期的缓存中查找最相近的问题，相似度低于阈值时返回None"""
+    threshold = get_similarity_threshold()
+    grams = ngrams(normalized)
+    best, best_score = None, threshold
+    candidates = AIResponseCache.objects.filter(ai_model=ai_model, expires_at__gt=now).order_by(
+        '-hit_count', '-created_at'
+    ).values_list('id', 'normalized_question')[:MAX_CANDIDATES]
+    async for entry_id, candidate in candidates:
+        # 长度相差太大时Jaccard相似度不可能达到阈值
+        shorter, longer = sorted((len(candidate), len(normalized)))
+        if shorter < threshold * longer:
+            continue
+        score = similarity(grams, ngrams(candidate))
+        if score >= best_score:
+            best, best_score = entry_id, score
+    return best
+
+
+async def lookup(question, ai_model):
+    """查找缓存的回复，命中时记录命中次数并返回回复文本，未命中返回None"""
+    normalized = normalize_question(question)
+    if not normalized:
+        return None
+    now = timezone.now()
+    entry = await AIResponseCache.objects.filter(
+        question_hash=make_question_hash(normalized, ai_model), expires_at__gt=now
+    ).only('id', 'response').afirst()
+    if entry is None:
+        entry_id = await _find_similar(normalized, ai_model, now)
+        if entry_id is None:
+            return None
+        entry = await AIResponseCache.objects.only('id', 'response').aget(pk=entry_id)
+
+    await AIResponseCache.objects.filter(pk=entry.pk).aupdate(hit_count=F('hit_count') + 1, last_hit_at=now)
+    return entry.response
+
+
+async def store(question, ai_model, response):
+    """保存一条回复；同一问题的过期条目会被新回复替换"""
+    normalized = normalize_question(question)
+    if not normalized:
+        return
+    try:
+        await AIResponseCache.objects.aupdate_or_create(
+            question_hash=make_question_hash(normalized, ai_model),
+            defaults={
+                'ai_model': ai_model,
+                'question': question,
+                'normalized_question': normalized,
+                'response': response,
+                'hit_count': 0,
+                'last_hit_at': None,
+                'expires_at': timezone.now() + timedelta(seconds=get_ttl()),
+            },
+        )
+    except IntegrityError:
+        # 并发请求已经写入了同一问题的回复
+        pass
+    except Exception as e:
+        print(f"保存AI回复缓存失败: {str(e)}")
+
+
+async def replay(response):
+    """以流式接口的形式返回缓存的回复"""
+    yield response
@@ -0,0 +1,322 @@
+"""
+AI服务路由：熔断 + 对冲请求
+每个服务（Gemini/DeepSeek）一个熔断器，统计最近 AI_BREAKER_WINDOW_SECONDS 秒内的调用结果，
+失败率超过阈值后熔断，期间请求直接切换到另一个服务，不再等待超时；熔断 AI_BREAKER_OPEN_SECONDS 秒后
+放行一次试探请求（半开），成功则恢复。配置了 AI_HEDGE_DELAY 时，首选服务在该时间内没有响应就同时请求备用服务，
+先响应的结果胜出。熔断器状态通过 get_state() 提供给 check_ai_status 用于监控
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+from .ai_stream import AIStreamError
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+PROVIDERS = ('gemini', 'deepseek')
+
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='ai-hedge')
+
+
+class CircuitBreaker:
+    """基于时间窗口失败率的熔断器（线程安全）"""
+
+    def __init__(self, name):
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = None
+        self._results = deque()  # (时间, 是否成功)
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._stats = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    @property
+    def window_seconds(self):
+        return getattr(settings, 'AI_BREAKER_WINDOW_SECONDS', 60)
+
+    @property
+    def min_requests(self):
+        return getattr(settings, 'AI_BREAKER_MIN_REQUESTS', 5)
+
+    @property
+    def failure_rate_threshold(self):
+        return getattr(settings, 'AI_BREAKER_FAILURE_RATE', 0.5)
+
+    @property
+    def open_seconds(self):
+        return getattr(settings, 'AI_BREAKER_OPEN_SECONDS', 30)
+
+    def _trim(self, now):
+        while self._results and now - self._results[0][0] > self.window_seconds:
+            self._results.popleft()
+
+    def _failure_rate(self):
+        if not self._results:
+            return 0.0
+        return sum(1 for _, ok in self._results if not ok) / len(self._results)
+
+    def is_available(self):
+        """是否可以发起请求（不占用半开状态的试探名额）"""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at >= self.open_seconds
+            if self.state == HALF_OPEN:
+                return not self._trial_in_flight
+            return True
+
+    def allow_request(self):
+        """申请发起一次请求；熔断期间返回False，冷却结束后只放行一次试探请求"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    self._stats['rejected'] += 1
+                    return False
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == HALF_OPEN:
+                if self._trial_in_flight:
+                    self._stats['rejected'] += 1
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._stats['successes'] += 1
+            if self.state == HALF_OPEN:
+                # 试探成功，恢复并清空旧的统计
+                self.state = CLOSED
+                self.opened_at = None
+                self._trial_in_flight = False
+                self._results.clear()
+            now = time.monotonic()
+            self._results.append((now, True))
+            self._trim(now)
+
+    def record_failure(self):
+        with self._lock:
+            self._stats['failures'] += 1
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                self._open(now)
+                return
+            self._results.append((now, False))
+            self._trim(now)
+            if (self.state == CLOSED and len(self._results) >= self.min_requests
+                    and self._failure_rate() >= self.failure_rate_threshold):
+                self._open(now)
+
+    def _open(self, now):
+        self.state = OPEN
+        self.opened_at = now
+        self._trial_in_flight = False
+        self._stats['opened'] += 1
+
+    def release(self):
+        """请求被取消（未产生结果），归还半开状态的试探名额"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def reset(self):
+        with self._lock:
+            self.state = CLOSED
+            self.opened_at = None
+            self._trial_in_flight = False
+            self._results.clear()
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    def snapshot(self):
+        """监控用的状态快照"""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            state = self.state
+            if state == OPEN and now - self.opened_at >= self.open_seconds:
+                state = HALF_OPEN
+            return {
+                'state': state,
+                'window_requests': len(self._results),
+                'failure_rate': round(self._failure_rate(), 3),
+                'retry_in': round(max(0.0, self.open_seconds - (now - self.opened_at)), 1) if self.state == OPEN else 0,
+                **self._stats,
+            }
+
+
+breakers = {name: CircuitBreaker(name) for name in PROVIDERS}
+
+
+def get_state():
+    """全部熔断器的状态"""
+    return {name: breaker.snapshot() for name, breaker in breakers.items()}
+
+
+def get_hedge_delay():
+    """对冲请求的等待时间（秒），0表示不对冲"""
+    return getattr(settings, 'AI_HEDGE_DELAY', 0)
+
+
+def order_providers(preferred):
+    """首选服务在前，其余作为备用"""
+    return [preferred] + [name for name in PROVIDERS if name != preferred]
+
+
+def available_providers(preferred):
+    """按优先级排列、当前未熔断的服务"""
+    return [name for name in order_providers(preferred) if breakers[name].is_available()]
+
+
+def _unavailable_error(errors):
+    if errors:
+        # 依次列出各服务的失败原因，首选服务在前
+        return AIStreamError('；'.join(dict.fromkeys(str(e) for e in errors)))
+    return AIStreamError('AI服务暂时不可用（已熔断），请稍后再试。')
+
+
+async def _guarded(name, first, tokens):
+    """转发首段和剩余输出，整个流结束时才记录一次结果：中途出错计为失败，读取方提前停止不计入统计"""
+    breaker = breakers[name]
+    try:
+        yield first
+        async for text in tokens:
+            yield text
+    except Exception:
+        breaker.record_failure()
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    breaker.record_success()
+
+
+async def route_stream(factories, on_select=None):
+    """按优先级流式调用AI服务，逐段返回首个产出内容的服务的输出
+
+    factories: [(服务名, 无参函数，返回该服务回复文本的异步迭代器), ...]
+    on_select: 可选，选定服务（产出首段内容）时以服务名调用
+    已熔断的服务直接跳过；失败（在产出首段内容前）立即切换到下一个服务；
+    配置了对冲时，首选服务超过 AI_HEDGE_DELAY 秒没有首段内容就同时请求下一个服务
+    """
+    hedge_delay = get_hedge_delay()
+    candidates = list(factories)
+    pending = {}  # task -> (服务名, 异步迭代器)
+    errors = []
+
+    def start_next():
+        while candidates:
+            name, factory = candidates.pop(0)
+            if not breakers[name].allow_request():
+                continue
+            tokens = factory()
+            task = asyncio.ensure_future(tokens.__anext__())
+            pending[task] = (name, tokens)
+            return True
+        return False
+
+    async def cancel_pending():
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for name, tokens in pending.values():
+            breakers[name].release()
+            await tokens.aclose()
+        pending.clear()
+
+    if not start_next():
+        raise _unavailable_error(errors)
+
+    try:
+        while pending:
+            timeout = hedge_delay if hedge_delay and candidates else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # 首选服务响应太慢，对冲请求下一个服务
+                start_next()
+                continue
+
+            for task in done:
+                name, tokens = pending.pop(task)
+                try:
+                    first = task.result()
+                except StopAsyncIteration:
+                    breakers[name].record_failure()
+                    errors.append(AIStreamError('抱歉，我暂时无法生成回复，请稍后再试。'))
+                except Exception as e:
+                    breakers[name].record_failure()
+                    errors.append(e)
+                else:
+                    await cancel_pending()
+                    if on_select is not None:
+                        on_select(name)
+                    guarded = _guarded(name, first, tokens)
+                    try:
+                        async for text in guarded:
+                            yield text
+                    finally:
+                        await guarded.aclose()
+                        await tokens.aclose()
+                    return
+
+            if not pending and not start_next():
+                break
+    finally:
+        await cancel_pending()
+
+    raise _unavailable_error(errors)
+
+
+def call_with_failover(calls):
+    """同步版本：按优先级调用，返回 (服务名, 结果)
+
+    calls: [(服务名, 无参函数，成功返回结果、失败抛出异常), ...]
+    """
+    hedge_delay = get_hedge_delay()
+    candidates = list(calls)
+    pending = {}  # future -> 服务名
+    errors = []
+
+    def run(name, fn):
+        try:
+            result = fn()
+        except Exception:
+            breakers[name].record_failure()
+            raise
+        breakers[name].record_success()
+        return result
+
+    def start_next():
+        while candidates:
+            name, fn = candidates.pop(0)
+            if breakers[name].allow_request():
+                pending[_hedge_executor.submit(run, name, fn)] = name
+                return True
+        return False
+
+    if not start_next():
+        raise _unavailable_error(errors)
+
+    while pending:
+        timeout = hedge_delay if hedge_delay and candidates else None
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            start_next()
+            continue
+
+        for future in done:
+            name = pending.pop(future)
+            try:
+                # 未胜出的对冲请求在后台线程中自行结束，结果只用于熔断统计
+                return name, future.result()
+            except Exception as e:
+                errors.append(e)
+
+        if not pending:
+            start_next()
+
+    raise _unavailable_error(errors)
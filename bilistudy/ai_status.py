@@ -0,0 +1,138 @@
+"""
+AI服务状态检查
+并发探测Gemini和DeepSeek，结果在缓存中保存 AI_STATUS_CACHE_TTL 秒；
+同一时间只有一次探测在进行，并发请求共享它的结果。首次检查后启动后台线程
+每隔 AI_STATUS_REFRESH_INTERVAL 秒刷新一次，check_ai_status 直接读取缓存
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+CACHE_KEY = 'ai_status'
+DEFAULT_CACHE_TTL = 60
+DEFAULT_REFRESH_INTERVAL = 30
+PROBE_TIMEOUT = 10
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ai-status')
+_inflight = None
+_inflight_lock = threading.Lock()
+_refresher_started = False
+
+
+def _get_deepseek_error_message(status_code):
+    """获取DeepSeek错误信息"""
+    error_messages = {
+        401: "API密钥无效",
+        402: "账户余额不足或需要付费",
+        429: "请求过于频繁",
+        500: "服务器内部错误"
+    }
+    return error_messages.get(status_code, f"HTTP {status_code}")
+
+
+def _probe_result(status_code, error_message):
+    return {
+        'status': 'normal' if status_code == 200 else 'error',
+        'status_code': status_code,
+        'message': 'API服务正常' if status_code == 200 else error_message
+    }
+
+
+def _probe_error(e):
+    if isinstance(e, httpx.TimeoutException):
+        message = '连接超时'
+    elif isinstance(e, httpx.ConnectError):
+        message = '无法连接到AI服务，可能需要代理或检查网络连接'
+    else:
+        message = str(e)[:100]
+    return {'status': 'error', 'status_code': None, 'message': message}
+
+
+async def probe_gemini(client):
+    """检查Gemini API"""
+    gemini_api_key = os.getenv('GEMINI_API_KEY')
+    gemini_test_url = f"https://generativelanguage.googleapis.com/v1beta/models?key={gemini_api_key}"
+    try:
+        response = await client.get(gemini_test_url)
+    except httpx.HTTPError as e:
+        return _probe_error(e)
+    return _probe_result(response.status_code, f'HTTP {response.status_code}')
+
+
+async def probe_deepseek(client):
+    """检查DeepSeek API"""
+    deepseek_api_key = os.getenv('DEEPSEEK_API_KEY')
+    deepseek_test_url = "https://api.deepseek.com/v1/models"
+    deepseek_headers = {
+        'Authorization': f'Bearer {deepseek_api_key}',
+        'Content-Type': 'application/json'
+    }
+    try:
+        response = await client.get(deepseek_test_url, headers=deepseek_headers)
+    except httpx.HTTPError as e:
+        return _probe_error(e)
+    return _probe_result(response.status_code, _get_deepseek_error_message(response.status_code))
+
+
+async def probe_all():
+    """并发探测全部AI服务，总耗时取决于最慢的一个"""
+    async with httpx.AsyncClient(timeout=PROBE_TIMEOUT) as client:
+        gemini, deepseek = await asyncio.gather(probe_gemini(client), probe_deepseek(client))
+    return {'gemini': gemini, 'deepseek': deepseek}
+
+
+def _probe_and_store():
+    status = {
+        'apis': asyncio.run(probe_all()),
+        'checked_at': timezone.now().isoformat(),
+    }
+    cache.set(CACHE_KEY, status, getattr(settings, 'AI_STATUS_CACHE_TTL', DEFAULT_CACHE_TTL))
+    return status
+
+
+def refresh_status():
+    """开始一次探测并返回其Future；已有探测进行中时直接返回它（single-flight）"""
+    global _inflight
+    with _inflight_lock:
+        if _inflight is None or _inflight.done():
+            _inflight = _executor.submit(_probe_and_store)
+        return _inflight
+
+
+def _refresh_loop(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            refresh_status().result()
+        except Exception as e:
+            print(f"刷新AI服务状态失败: {str(e)}")
+
+
+def start_background_refresher():
+    """启动后台刷新线程（每个进程只启动一次），AI_STATUS_REFRESH_INTERVAL为0时不启动"""
+    global _refresher_started
+    interval = getattr(settings, 'AI_STATUS_REFRESH_INTERVAL', DEFAULT_REFRESH_INTERVAL)
+    if not interval:
+        return
+    with _inflight_lock:
+        if _refresher_started:
+            return
+        _refresher_started = True
+    threading.Thread(target=_refresh_loop, args=(interval,), name='ai-status-refresher', daemon=True).start()
+
+
+async def get_status():
+    """返回 (状态, 是否来自缓存)；缓存为空时等待正在进行的探测"""
+    start_background_refresher()
+    status = await cache.aget(CACHE_KEY)
+    if status is not None:
+        return status, True
+    return await asyncio.wrap_future(refresh_status()), False
@@ -0,0 +1,220 @@
+"""
+AI聊天异步调用
+使用DeepSeek（stream: true）和Gemini（streamGenerateContent?alt=sse）的流式接口逐段读取回复。
+基于httpx.AsyncClient，等待模型输出和重试退避都不占用线程，在ASGI下单进程即可同时处理大量对话
+（ASGI下复用每个事件循环的连接池，WSGI/runserver下每次调用使用独立的客户端并及时关闭，见 client_scope）；
+ai_chat_stream 以Server-Sent Events转发给浏览器，ai_chat 收集完整回复后一次性返回
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import json
+import weakref
+
+import httpx
+
+DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
+GEMINI_STREAM_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:streamGenerateContent"
+
+# 连接超时10秒；流式响应的读取超时是两段数据之间的最长间隔
+STREAM_TIMEOUT = httpx.Timeout(60, connect=10)
+
+# ASGI服务器下每个事件循环一个AsyncClient（连接池不能跨事件循环使用）
+_clients = weakref.WeakKeyDictionary()
+# client_scope(shared=False) 期间使用的独立AsyncClient
+_scoped_client = contextvars.ContextVar('ai_stream_client', default=None)
+
+
+class AIStreamError(Exception):
+    """调用失败，消息可直接展示给用户"""
+
+
+def _new_client():
+    return httpx.AsyncClient(
+        timeout=STREAM_TIMEOUT,
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=20),
+    )
+
+
+def get_client():
+    """当前使用的AsyncClient：client_scope 中的独立客户端，否则为当前事件循环共享的客户端"""
+    client = _scoped_client.get()
+    if client is not None:
+        return client
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _new_client()
+        _clients[loop] = client
+    return client
+
+
+@contextlib.asynccontextmanager
+async def client_scope(shared=True):
+    """一次AI调用使用的AsyncClient
+
+    shared=True：事件循环常驻（uvicorn等ASGI服务器），复用该事件循环共享的连接池；
+    shared=False：WSGI/runserver下异步视图每次都在新的临时事件循环中执行，共享连接池无法复用，
+    改为本次调用创建独立的客户端，结束时关闭连接
+    """
+    if shared:
+        yield
+        return
+    async with _new_client() as client:
+        _scoped_client.set(client)
+        try:
+            yield
+        finally:
+            _scoped_client.set(None)
+
+
+def build_deepseek_messages(system_prompt, user_message, chat_history=""):
+    """构建DeepSeek对话消息列表"""
+    messages = [
+        {
+            "role": "system",
+            "content": system_prompt
+        }
+    ]
+
+    # 如果有聊天历史，添加到消息中
+    if chat_history.strip():
+        messages.append({
+            "role": "assistant",
+            "content": f"以下是我们之前的对话历史：{chat_history}"
+        })
+
+    # 添加当前用户消息
+    messages.append({
+        "role": "user",
+        "content": user_message
+    })
+    return messages
+
+
+def sse_event(event, data):
+    """格式化一条SSE事件"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _iter_sse_data(response):
+    """逐条读取SSE响应中的data字段"""
+    async for line in response.aiter_lines():
+        if line and line.startswith('data:'):
+            yield line[5:].strip()
+
+
+async def stream_deepseek(system_prompt, user_message, chat_history="", api_key=None):
+    """流式调用DeepSeek，逐段返回回复文本"""
+    if not api_key:
+        raise AIStreamError("DeepSeek服务暂时不可用，请配置DEEPSEEK_API_KEY环境变量")
+
+    headers = {
+        'Content-Type': 'application/json',
+        'Authorization': f'Bearer {api_key}',
+        'User-Agent': 'BiliStudy/1.0'
+    }
+    data = {
+        "model": "deepseek-chat",
+        "messages": build_deepseek_messages(system_prompt, user_message, chat_history),
+        "stream": True,
+        "max_tokens": 2000,
+        "temperature": 0.7
+    }
+
+    try:
+        async with get_client().stream('POST', DEEPSEEK_API_URL, headers=headers, json=data) as response:
+            if response.status_code != 200:
+                errors = {
+                    402: "DeepSeek API调用失败：账户余额不足或需要付费。请检查您的DeepSeek账户余额。",
+                    401: "DeepSeek API调用失败：API密钥无效。请检查您的API密钥是否正确。",
+                    429: "DeepSeek API调用失败：请求过于频繁。请稍后再试。",
+                    403: "DeepSeek API调用失败：访问被拒绝。请检查API密钥权限。",
+                }
+                raise AIStreamError(errors.get(response.status_code, f"DeepSeek API调用失败：HTTP {response.status_code}。"))
+
+            async for payload in _iter_sse_data(response):
+                if payload == '[DONE]':
+                    break
+                chunk = json.loads(payload)
+                choices = chunk.get('choices') or []
+                if choices:
+                    text = (choices[0].get('delta') or {}).get('content')
+                    if text:
+                        yield text
+    except httpx.TimeoutException:
+        raise AIStreamError("DeepSeek API响应超时，请稍后再试。")
+    except httpx.HTTPError as e:
+        raise AIStreamError(f"无法连接到DeepSeek API服务：{str(e)[:100]}。请检查网络连接。")
+
+
+async def _open_gemini_stream(full_prompt, api_key, max_retries=3):
+    """发起Gemini流式请求；尚未收到任何内容前遇到503/超时/连接失败时重试（非阻塞退避）"""
+    client = get_client()
+    data = {
+        "contents": [{
+            "parts": [{
+                "text": full_prompt
+            }]
+        }]
+    }
+    params = {'alt': 'sse', 'key': api_key}
+
+    for attempt in range(max_retries):
+        last_attempt = attempt == max_retries - 1
+        request = client.build_request(
+            'POST', GEMINI_STREAM_URL, params=params, headers={'Content-Type': 'application/json'}, json=data
+        )
+        try:
+            response = await client.send(request, stream=True)
+        except httpx.TimeoutException:
+            if last_attempt:
+                raise AIStreamError('AI服务响应超时，请稍后再试。')
+            print(f"请求超时，第{attempt + 1}次重试...")
+            await asyncio.sleep(1)
+            continue
+        except httpx.HTTPError:
+            if last_attempt:
+                raise AIStreamError('网络连接失败，无法访问Google AI服务。请检查网络连接，可能需要使用代理。')
+            print(f"连接失败，第{attempt + 1}次重试...")
+            await asyncio.sleep(1)
+            continue
+
+        if response.status_code == 200:
+            return response
+
+        await response.aclose()
+        if response.status_code == 503 and not last_attempt:
+            print(f"API返回503，第{attempt + 1}次重试...")
+            await asyncio.sleep(2 ** attempt)  # 指数退避
+            continue
+        if response.status_code == 503:
+            raise AIStreamError(f'AI服务暂时不可用（HTTP 503），已重试{max_retries}次。请稍后再试，或检查网络连接。')
+        if response.status_code == 429:
+            raise AIStreamError('AI服务请求过于频繁，请稍后再试。')
+        raise AIStreamError(f'AI服务返回错误：HTTP {response.status_code}。请检查网络连接或稍后再试。')
+
+
+async def stream_gemini(full_prompt, api_key=None, max_retries=3):
+    """流式调用Gemini，逐段返回回复文本"""
+    if not api_key:
+        raise AIStreamError('AI服务暂时不可用，请配置GEMINI_API_KEY环境变量')
+
+    response = await _open_gemini_stream(full_prompt, api_key, max_retries)
+    try:
+        async for payload in _iter_sse_data(response):
+            chunk = json.loads(payload)
+            for candidate in chunk.get('candidates') or []:
+                for part in (candidate.get('content') or {}).get('parts') or []:
+                    if part.get('text'):
+                        yield part['text']
+    except httpx.HTTPError:
+        raise AIStreamError('AI服务响应中断，请稍后再试。')
+    finally:
+        await response.aclose()
+
+
+async def collect(tokens):
+    """收集流式输出的完整文本"""
+    return ''.join([text async for text in tokens])
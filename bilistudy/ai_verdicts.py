@@ -0,0 +1,80 @@
+"""
+AI语义分析结论缓存
+ai_content_analysis 每次调用DeepSeek/Gemini都需要数秒且按量计费，结论按规范化后的提示词持久化到
+AIContentVerdict表，相同的模糊搜索直接返回已有结论。管理员在后台修正的结论对该搜索词的所有分析生效
+"""
+
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+
+from .models import AIContentVerdict
+
+
+def normalize_text(text):
+    """规范化文本：合并连续空白、转小写"""
+    return ' '.join((text or '').split()).lower()
+
+
+def make_prompt_hash(prompt):
+    """提示词哈希（规范化后取sha256）"""
+    return hashlib.sha256(normalize_text(prompt).encode('utf-8')).hexdigest()
+
+
+def make_query_key(search_query):
+    """规范化搜索词，用于匹配管理员修正"""
+    return normalize_text(search_query)[:200]
+
+
+def verdict_to_result(verdict):
+    """转换成 ai_content_analysis 的返回格式"""
+    return {
+        'is_learning_related': verdict.is_learning_related,
+        'confidence': verdict.confidence,
+        'reason': verdict.reason,
+        'full_response': verdict.full_response,
+    }
+
+
+def get_verdict(search_query, prompt):
+    """查找已有结论：管理员修正优先，其次是同一提示词的AI结论；没有返回None"""
+    verdict = AIContentVerdict.objects.filter(
+        Q(prompt_hash=make_prompt_hash(prompt))
+        | Q(query_key=make_query_key(search_query), is_override=True)
+    ).order_by('-is_override', '-updated_at').first()
+    if verdict is None:
+        return None
+
+    AIContentVerdict.objects.filter(pk=verdict.pk).update(hit_count=F('hit_count') + 1)
+    return verdict
+
+
+def save_verdict(search_query, prompt, result, source):
+    """保存AI结论；无法判断的结论不保存（下次重新分析），管理员修正过的记录不会被覆盖"""
+    if result.get('is_learning_related') is None:
+        return None
+
+    prompt_hash = make_prompt_hash(prompt)
+    fields = {
+        'query_key': make_query_key(search_query),
+        'search_query': search_query[:200],
+        'prompt': prompt,
+        'is_learning_related': result['is_learning_related'],
+        'confidence': result.get('confidence', 0.5),
+        'reason': result.get('reason', ''),
+        'full_response': result.get('full_response', ''),
+        'source': source,
+    }
+    try:
+        with transaction.atomic():
+            verdict, created = AIContentVerdict.objects.get_or_create(prompt_hash=prompt_hash, defaults=fields)
+    except IntegrityError:
+        # 并发请求已经写入了同一提示词的结论
+        return AIContentVerdict.objects.filter(prompt_hash=prompt_hash).first()
+
+    if not created and not verdict.is_override:
+        for name, value in fields.items():
+            setattr(verdict, name, value)
+        verdict.save()
+    return verdict
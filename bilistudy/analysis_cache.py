@@ -0,0 +1,110 @@
+"""
+内容分析结果缓存
+相同的搜索词和视频标题不再重复分词、打分。进程内为有界LRU，
+可选再由Django缓存（如Redis）兜底，让多个Worker共享结果
+"""
+
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+KEY_PREFIX = 'content_analysis'
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_TIMEOUT = 60 * 60
+
+
+def make_analysis_key(search_query, video_results, keywords_version, segmenter):
+    """根据分析实际用到的输入生成缓存键
+
+    只取 analyze_content 会读取的字段（前5个视频的标题、分区、标签），
+    关键词库版本和分词方式变化时键随之变化，旧结果自然失效
+    """
+    videos = []
+    for video in (video_results or [])[:5]:
+        videos.append([
+            video.get('title') or '',
+            video.get('zone') or video.get('tname') or '',
+            video.get('tags') or '',
+        ])
+    raw = json.dumps(
+        [search_query or '', videos, keywords_version, segmenter],
+        ensure_ascii=False, sort_keys=True, default=str
+    )
+    return f"{KEY_PREFIX}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+
+class ContentAnalysisCache:
+    """有界LRU缓存，可选Django缓存作为二级缓存"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, cache_alias=None, timeout=DEFAULT_TIMEOUT):
+        self.max_entries = max_entries
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    def _shared_cache(self):
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    def get(self, key):
+        """读取缓存结果，未命中返回None；返回副本，调用方修改不影响缓存"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return copy.deepcopy(result)
+
+        shared_cache = self._shared_cache()
+        if shared_cache is not None:
+            try:
+                result = shared_cache.get(key)
+            except Exception as e:
+                print(f"读取内容分析共享缓存失败: {str(e)}")
+                result = None
+            if result is not None:
+                self._store_local(key, result)
+                with self._lock:
+                    self._stats['shared_hits'] += 1
+                return copy.deepcopy(result)
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def set(self, key, result):
+        """写入分析结果"""
+        self._store_local(key, copy.deepcopy(result))
+        shared_cache = self._shared_cache()
+        if shared_cache is not None:
+            try:
+                shared_cache.set(key, result, self.timeout)
+            except Exception as e:
+                print(f"写入内容分析共享缓存失败: {str(e)}")
+
+    def _store_local(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """清空进程内缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        """命中统计（shared_hits为进程内未命中、共享缓存命中的次数）"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        stats['max_entries'] = self.max_entries
+        lookups = stats['hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['shared_hits']) / lookups, 4) if lookups else 0
+        return stats
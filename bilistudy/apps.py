@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BilistudyConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "bilistudy"
+
+    def ready(self):
+        # 注册模型信号；jieba词典改在服务入口（asgi.py/wsgi.py）预热，migrate、test 等管理命令不加载词典
+        from . import signals  # noqa: F401
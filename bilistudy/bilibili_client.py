@@ -0,0 +1,113 @@
+"""
+B站API客户端
+进程内共享一个 requests.Session，复用到 api.bilibili.com 的 TCP/TLS 连接，
+统一管理请求头、Cookie 和各接口的超时时间
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+
+BILIBILI_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+BILIBILI_COOKIES = {
+    'buvid3': 'CFF74DA7-E79E-4B53-BB96-FC74AB8CD2F3184997infoc',
+}
+
+SEARCH_API_URL = "https://api.bilibili.com/x/web-interface/search/type"
+VIEW_API_URL = "https://api.bilibili.com/x/web-interface/view"
+VIEW_DETAIL_API_URL = "https://api.bilibili.com/x/web-interface/view/detail"
+VIDEO_PAGE_URL = "https://www.bilibili.com/video/{bvid}"
+
+# 各接口的超时时间（秒）：(连接超时, 读取超时)
+DEFAULT_TIMEOUTS = {
+    'search': (3.05, 5),
+    'view': (3.05, 15),
+    'view_detail': (3.05, 15),
+    'video_page': (3.05, 15),
+}
+
+# 连接池大小，可在settings中通过 BILIBILI_POOL_CONNECTIONS / BILIBILI_POOL_MAXSIZE 覆盖
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 20
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _build_session():
+    """创建带连接池和默认请求头的Session"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=getattr(settings, 'BILIBILI_POOL_CONNECTIONS', DEFAULT_POOL_CONNECTIONS),
+        pool_maxsize=getattr(settings, 'BILIBILI_POOL_MAXSIZE', DEFAULT_POOL_MAXSIZE),
+        max_retries=0,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'User-Agent': BILIBILI_USER_AGENT,
+        'Referer': 'https://www.bilibili.com',
+        'Connection': 'keep-alive',
+    })
+    for name, value in BILIBILI_COOKIES.items():
+        session.cookies.set(name, value, domain='.bilibili.com')
+    return session
+
+
+def get_session():
+    """获取进程内共享的Session（首次调用时创建）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def get_timeout(endpoint):
+    """获取指定接口的超时时间，settings.BILIBILI_TIMEOUTS 中的配置优先"""
+    timeouts = getattr(settings, 'BILIBILI_TIMEOUTS', {})
+    return timeouts.get(endpoint, DEFAULT_TIMEOUTS[endpoint])
+
+
+def search_videos(keyword, page=1, order='totalrank'):
+    """调用B站视频搜索接口"""
+    params = {
+        'search_type': 'video',
+        'keyword': keyword,
+        'page': page,
+        'order': order,
+    }
+    return get_session().get(SEARCH_API_URL, params=params, timeout=get_timeout('search'))
+
+
+def get_video_view(bvid):
+    """调用B站视频基础信息接口"""
+    headers = {
+        'Referer': f'https://www.bilibili.com/video/{bvid}',
+        'Origin': 'https://www.bilibili.com',
+        'Accept': 'application/json, text/plain, */*',
+    }
+    return get_session().get(VIEW_API_URL, params={'bvid': bvid}, headers=headers, timeout=get_timeout('view'))
+
+
+def get_video_view_detail(bvid):
+    """调用B站视频详细信息接口"""
+    headers = {
+        'Referer': f'https://www.bilibili.com/video/{bvid}',
+        'Origin': 'https://www.bilibili.com',
+    }
+    return get_session().get(VIEW_DETAIL_API_URL, params={'bvid': bvid}, headers=headers, timeout=get_timeout('view_detail'))
+
+
+def get_video_page(bvid):
+    """获取B站视频网页HTML（API失败时的爬虫兜底）"""
+    headers = {
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
+        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+        'Cache-Control': 'no-cache',
+    }
+    return get_session().get(VIDEO_PAGE_URL.format(bvid=bvid), headers=headers, timeout=get_timeout('video_page'))
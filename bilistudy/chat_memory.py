@@ -0,0 +1,136 @@
+"""
+AI助手会话记忆
+提示词中的对话历史 = 较早对话的滚动摘要 + 按token预算装入的最近几轮完整对话。
+每轮对话保存后，超出预算的旧对话被增量合并进摘要（ChatSessionMemory），摘要本身也有上限，
+因此无论会话多长，提示词大小都是有界的
+"""
+
+import re
+
+from django.conf import settings
+
+from .models import ChatHistory, ChatSessionMemory
+
+DEFAULT_TOKEN_BUDGET = 1500
+DEFAULT_SUMMARY_MAX_TOKENS = 500
+# 每次最多读取的未摘要对话数
+MAX_RECENT_TURNS = 50
+
+CJK_PATTERN = re.compile(r'[\u3000-\u9fff\uff00-\uffef]')
+
+
+def estimate_tokens(text):
+    """粗略估算token数：中文约每字1个token，其他字符约每4个字符1个token"""
+    if not text:
+        return 0
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def get_token_budget():
+    return getattr(settings, 'CHAT_MEMORY_TOKEN_BUDGET', DEFAULT_TOKEN_BUDGET)
+
+
+def get_summary_max_tokens():
+    return getattr(settings, 'CHAT_MEMORY_SUMMARY_MAX_TOKENS', DEFAULT_SUMMARY_MAX_TOKENS)
+
+
+def format_turn(chat):
+    return f"用户：{chat.user_message}\nAI：{chat.ai_response}\n\n"
+
+
+def truncate_to_tokens(text, max_tokens):
+    """截断文本使其不超过max_tokens"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) + 1 <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low] + '…'
+
+
+def summarize_turn(chat):
+    """把一轮对话压缩成一行摘要：用户问题 + AI回复的开头"""
+    question = ' '.join(chat.user_message.split())[:60]
+    answer = ' '.join(re.sub(r'[#*|>`-]+', ' ', chat.ai_response).split())[:80]
+    return f"- 用户问：{question}；AI答：{answer}"
+
+
+def merge_summary(summary, lines):
+    """把新的摘要行追加到滚动摘要，超出上限时丢弃最早的行"""
+    merged = [line for line in summary.split('\n') if line] + lines
+    max_tokens = get_summary_max_tokens()
+    while merged and estimate_tokens('\n'.join(merged)) > max_tokens:
+        merged.pop(0)
+    return '\n'.join(merged)
+
+
+async def _load(session_id):
+    memory = await ChatSessionMemory.objects.filter(session_id=session_id).afirst()
+    summarized_until = memory.summarized_until if memory else 0
+    recent = [
+        chat async for chat in ChatHistory.objects.filter(
+            session_id=session_id, id__gt=summarized_until
+        ).order_by('-id')[:MAX_RECENT_TURNS]
+    ]
+    return memory, recent
+
+
+def _split_by_budget(recent, budget):
+    """recent按时间倒序；返回 (装入预算的最近对话[按时间正序], 装不下的较早对话[按时间正序])"""
+    kept = []
+    used = 0
+    for index, chat in enumerate(recent):
+        tokens = estimate_tokens(format_turn(chat))
+        if used + tokens > budget and kept:
+            return list(reversed(kept)), list(reversed(recent[index:]))
+        kept.append(chat)
+        used += tokens
+    return list(reversed(kept)), []
+
+
+async def build_history(session_id):
+    """生成提示词中的对话历史文本"""
+    memory, recent = await _load(session_id)
+    summary = memory.summary if memory else ''
+
+    budget = get_token_budget()
+    kept, older = _split_by_budget(recent, budget)
+    if older:
+        # 尚未合并进摘要的旧对话（例如摘要更新失败）也只保留摘要行
+        summary = merge_summary(summary, [summarize_turn(chat) for chat in older])
+
+    chat_history = ""
+    if summary:
+        chat_history += f"\n\n较早的对话摘要：\n{summary}"
+    if kept:
+        chat_history += "\n\n最近的对话历史：\n"
+        # 只有一轮对话也超出预算时截断它
+        chat_history += truncate_to_tokens(''.join(format_turn(chat) for chat in kept), budget)
+    return chat_history
+
+
+async def update_memory(session_id):
+    """保存一轮对话后调用：把超出预算的旧对话合并进滚动摘要"""
+    try:
+        memory, recent = await _load(session_id)
+        _, older = _split_by_budget(recent, get_token_budget())
+        if not older:
+            return
+
+        if memory is None:
+            memory = ChatSessionMemory(session_id=session_id)
+        memory.summary = merge_summary(memory.summary, [summarize_turn(chat) for chat in older])
+        memory.summarized_until = older[-1].id
+        await memory.asave()
+    except Exception as e:
+        print(f"更新会话记忆失败: {str(e)}")
+
+
+def forget(session_id):
+    """删除会话的滚动摘要（注销账号时与聊天记录一起删除）；会话记忆只保存在数据库中，没有其他缓存"""
+    return ChatSessionMemory.objects.filter(session_id=session_id).delete()[0]
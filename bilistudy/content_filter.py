@@ -3,49 +3,215 @@
 用于检测搜索内容是否与学习相关
 """
 
+import hashlib
+import json
 import os
 import re
+import threading
+import time
 import jieba
 from typing import List, Dict, Tuple, Optional
 from django.conf import settings
 
+from .analysis_cache import ContentAnalysisCache, make_analysis_key
+from .keyword_matcher import KeywordMatcher
+
+# 参与关键词匹配的分类
+POSITIVE_CATEGORIES = ['learning_positive', 'positive_zones', 'tech_positive', 'subject_positive', 'skill_positive']
+NEGATIVE_CATEGORIES = ['learning_negative', 'negative_zones', 'game_negative', 'entertainment_negative', 'daily_negative']
+
+# jieba词典加载完成前使用的简单切分：连续的中文/字母/数字片段
+FALLBACK_TOKEN_PATTERN = re.compile(r'[\u4e00-\u9fa5a-zA-Z0-9]{2,}')
+
+_jieba_ready = threading.Event()
+_jieba_warmup_lock = threading.Lock()
+_jieba_warmup_started = False
+
+
+def _initialize_jieba():
+    """加载jieba词典（首次加载需要数秒）"""
+    try:
+        cache_file = getattr(settings, 'JIEBA_CACHE_FILE', None)
+        if cache_file:
+            # 使用预先生成的词典缓存文件，避免每次启动重新解析词典
+            jieba.dt.cache_file = cache_file
+        jieba.initialize()
+        _jieba_ready.set()
+        print("jieba词典加载完成")
+    except Exception as e:
+        print(f"jieba词典加载失败，继续使用不分词的关键词匹配: {str(e)}")
+
+
+def start_jieba_warmup(background: bool = True):
+    """预热jieba词典；后台模式下不阻塞调用方，预热完成前分词退回简单切分"""
+    global _jieba_warmup_started
+    with _jieba_warmup_lock:
+        if _jieba_warmup_started:
+            return
+        _jieba_warmup_started = True
+
+    if background:
+        threading.Thread(target=_initialize_jieba, name='jieba-warmup', daemon=True).start()
+    else:
+        _initialize_jieba()
+
+
+def warmup_on_startup():
+    """服务启动时按 JIEBA_WARMUP_MODE 预热jieba词典，避免Worker启动后的第一次搜索被词典加载阻塞"""
+    warmup_mode = getattr(settings, 'JIEBA_WARMUP_MODE', 'background')
+    if warmup_mode in ('background', 'sync'):
+        start_jieba_warmup(background=(warmup_mode == 'background'))
+
+
+def is_jieba_ready() -> bool:
+    """jieba词典是否已加载完成"""
+    return _jieba_ready.is_set()
+
+
+def get_keywords_file() -> str:
+    """关键词文件路径"""
+    return os.path.join(settings.BASE_DIR, 'content_filter_keywords.txt')
+
+
+def parse_keywords_file(keywords_file: str) -> Dict[str, List[str]]:
+    """解析关键词文件，格式：分类:关键词1,关键词2"""
+    keywords = {}
+    with open(keywords_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                if ':' in line:
+                    category, keywords_str = line.split(':', 1)
+                    keywords_list = [kw.strip() for kw in keywords_str.split(',') if kw.strip()]
+                    keywords[category] = keywords_list
+    return keywords
+
+
+class KeywordLibrary:
+    """编译好的关键词库快照
+
+    创建后不再修改；热加载时整体替换ContentFilter上的引用，
+    正在处理的请求继续使用自己拿到的旧快照
+    """
+
+    def __init__(self, keywords: Dict[str, List[str]], mtime: Optional[float] = None):
+        self.keywords = keywords
+        self.mtime = mtime
+        # 将关键词库编译成多模式匹配自动机
+        self.positive_matcher = KeywordMatcher(keywords, POSITIVE_CATEGORIES)
+        self.negative_matcher = KeywordMatcher(keywords, NEGATIVE_CATEGORIES)
+        # 关键词库版本（内容哈希），用于让分析结果缓存随关键词库变化自动失效
+        self.version = hashlib.md5(
+            json.dumps(keywords, ensure_ascii=False).encode('utf-8')
+        ).hexdigest() if keywords else ''
+
+    @classmethod
+    def from_file(cls, keywords_file: str) -> 'KeywordLibrary':
+        """从文件加载并编译关键词库，失败时抛出异常"""
+        mtime = os.path.getmtime(keywords_file)
+        return cls(parse_keywords_file(keywords_file), mtime)
+
 
 class ContentFilter:
     """内容过滤器"""
     
     def __init__(self):
-        self.keywords = {}
+        self.library = KeywordLibrary({})
+        self._reload_lock = threading.Lock()
+        self._reloading = False
+        self._last_reload_check = 0.0
         self.load_keywords()
+
+    @property
+    def keywords(self) -> Dict[str, List[str]]:
+        return self.library.keywords
+
+    @property
+    def keywords_version(self) -> str:
+        return self.library.version
+
+    @property
+    def positive_matcher(self) -> KeywordMatcher:
+        return self.library.positive_matcher
+
+    @property
+    def negative_matcher(self) -> KeywordMatcher:
+        return self.library.negative_matcher
         
     def load_keywords(self):
         """加载关键词库"""
         try:
             # 关键词文件路径
-            keywords_file = os.path.join(settings.BASE_DIR, 'content_filter_keywords.txt')
+            keywords_file = get_keywords_file()
             
             if not os.path.exists(keywords_file):
                 print(f"关键词文件不存在: {keywords_file}")
                 return
-                
-            with open(keywords_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        if ':' in line:
-                            category, keywords_str = line.split(':', 1)
-                            keywords_list = [kw.strip() for kw in keywords_str.split(',') if kw.strip()]
-                            self.keywords[category] = keywords_list
-                            
+
+            self.library = KeywordLibrary.from_file(keywords_file)
             print(f"已加载关键词库，包含 {len(self.keywords)} 个分类")
             
         except Exception as e:
             print(f"加载关键词库失败: {str(e)}")
-            self.keywords = {}
+            self.library = KeywordLibrary({})
+
+    def reload_keywords(self) -> bool:
+        """重新加载关键词库并原子替换；加载失败时保留当前关键词库"""
+        try:
+            library = KeywordLibrary.from_file(get_keywords_file())
+        except Exception as e:
+            print(f"重新加载关键词库失败，继续使用当前关键词库: {str(e)}")
+            return False
+
+        # 替换引用是原子操作，进行中的请求仍持有旧快照
+        self.library = library
+        print(f"已重新加载关键词库，包含 {len(library.keywords)} 个分类")
+        return True
+
+    def reload_if_changed(self):
+        """关键词文件修改时在后台重新加载，不阻塞当前请求
+
+        每隔 CONTENT_FILTER_RELOAD_INTERVAL 秒最多检查一次文件修改时间，配置为0时关闭
+        """
+        interval = getattr(settings, 'CONTENT_FILTER_RELOAD_INTERVAL', 5)
+        if not interval:
+            return
+
+        now = time.monotonic()
+        if now - self._last_reload_check < interval:
+            return
+        self._last_reload_check = now
+
+        try:
+            mtime = os.path.getmtime(get_keywords_file())
+        except OSError:
+            return
+        if mtime == self.library.mtime:
+            return
+
+        with self._reload_lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        def _reload():
+            try:
+                self.reload_keywords()
+            finally:
+                with self._reload_lock:
+                    self._reloading = False
+
+        threading.Thread(target=_reload, name='keywords-reload', daemon=True).start()
     
     def segment_text(self, text: str) -> List[str]:
         """对文本进行分词"""
         if not text:
             return []
+
+        # jieba词典尚未加载完成时不等待，直接按连续的中文/字母/数字切分
+        if not is_jieba_ready():
+            start_jieba_warmup()
+            return FALLBACK_TOKEN_PATTERN.findall(text.lower())
         
         # 使用jieba分词
         words = jieba.lcut(text.lower())
@@ -58,9 +224,10 @@ class ContentFilter:
                 
         return filtered_words
     
-    def check_keywords(self, text: str) -> Dict[str, any]:
+    def check_keywords(self, text: str, library: Optional[KeywordLibrary] = None) -> Dict[str, any]:
         """基于关键词库检查文本"""
-        if not text or not self.keywords:
+        library = library or self.library
+        if not text or not library.keywords:
             return {'method': 'keywords', 'is_learning': None, 'confidence': 0, 'matched_words': []}
         
         # 分词
@@ -68,23 +235,9 @@ class ContentFilter:
         if not words:
             return {'method': 'keywords', 'is_learning': None, 'confidence': 0, 'matched_words': []}
         
-        # 检查各类关键词
-        positive_matches = []
-        negative_matches = []
-        
-        # 检查正面关键词
-        for category in ['learning_positive', 'positive_zones', 'tech_positive', 'subject_positive', 'skill_positive']:
-            if category in self.keywords:
-                for keyword in self.keywords[category]:
-                    if keyword.lower() in text.lower() or keyword.lower() in ' '.join(words):
-                        positive_matches.append((category, keyword))
-        
-        # 检查负面关键词
-        for category in ['learning_negative', 'negative_zones', 'game_negative', 'entertainment_negative', 'daily_negative']:
-            if category in self.keywords:
-                for keyword in self.keywords[category]:
-                    if keyword.lower() in text.lower() or keyword.lower() in ' '.join(words):
-                        negative_matches.append((category, keyword))
+        # 检查正面、负面关键词（自动机一次扫描文本）
+        positive_matches = self._match_keywords(library.positive_matcher, text, words)
+        negative_matches = self._match_keywords(library.negative_matcher, text, words)
         
         # 计算置信度
         positive_score = len(positive_matches)
@@ -113,6 +266,13 @@ class ContentFilter:
         
         return {'method': 'keywords', 'is_learning': None, 'confidence': 0, 'matched_words': []}
     
+    def _match_keywords(self, matcher: KeywordMatcher, text: str, words: List[str]) -> List[Tuple[str, str]]:
+        """在原文和分词结果中匹配关键词"""
+        # 只有包含空白的关键词才可能在分词拼接文本中额外命中
+        if matcher.has_whitespace_patterns:
+            return matcher.match(text, ' '.join(words))
+        return matcher.match(text)
+
     def check_bilibili_zone(self, zone_name: str) -> Dict[str, any]:
         """检查B站分区是否与学习相关"""
         if not zone_name:
@@ -156,13 +316,16 @@ class ContentFilter:
         
         return {'method': 'zone', 'is_learning': None, 'confidence': 0}
     
-    def analyze_content(self, search_query: str, video_results: List[Dict] = None) -> Dict[str, any]:
+    def analyze_content(self, search_query: str, video_results: List[Dict] = None,
+                        library: Optional[KeywordLibrary] = None) -> Dict[str, any]:
         """综合分析搜索内容和结果"""
+        # 整个分析过程使用同一份关键词库快照，热加载不会影响进行中的分析
+        library = library or self.library
         analysis_results = []
         
         # 1. 分析搜索关键词
         if search_query:
-            keyword_result = self.check_keywords(search_query)
+            keyword_result = self.check_keywords(search_query, library)
             if keyword_result['is_learning'] is not None:
                 analysis_results.append({
                     'source': 'search_query',
@@ -177,7 +340,7 @@ class ContentFilter:
                 
                 # 分析视频标题
                 if video.get('title'):
-                    title_result = self.check_keywords(video['title'])
+                    title_result = self.check_keywords(video['title'], library)
                     if title_result['is_learning'] is not None:
                         video_analysis.append({
                             'source': f'video_{i}_title',
@@ -199,7 +362,7 @@ class ContentFilter:
                 # 分析视频标签
                 if video.get('tags'):
                     tags_text = ' '.join(video['tags']) if isinstance(video['tags'], list) else str(video['tags'])
-                    tags_result = self.check_keywords(tags_text)
+                    tags_result = self.check_keywords(tags_text, library)
                     if tags_result['is_learning'] is not None:
                         video_analysis.append({
                             'source': f'video_{i}_tags',
@@ -267,10 +430,28 @@ class ContentFilter:
 # 全局实例
 content_filter = ContentFilter()
 
+# 内容分析结果缓存
+analysis_cache = ContentAnalysisCache(
+    max_entries=getattr(settings, 'CONTENT_ANALYSIS_CACHE_MAX_ENTRIES', 2048),
+    cache_alias=getattr(settings, 'CONTENT_ANALYSIS_CACHE_ALIAS', None),
+    timeout=getattr(settings, 'CONTENT_ANALYSIS_CACHE_TTL', 60 * 60),
+)
+
 
 def analyze_search_content(search_query: str, video_results: List[Dict] = None) -> Dict[str, any]:
-    """分析搜索内容是否与学习相关"""
-    return content_filter.analyze_content(search_query, video_results)
+    """分析搜索内容是否与学习相关（相同输入直接返回缓存结果）"""
+    # jieba预热完成前后分词方式不同，分别缓存
+    segmenter = 'jieba' if is_jieba_ready() else 'fallback'
+    # 关键词文件有修改时在后台热加载；本次请求使用当前快照
+    content_filter.reload_if_changed()
+    library = content_filter.library
+    key = make_analysis_key(search_query, video_results, library.version, segmenter)
+
+    result = analysis_cache.get(key)
+    if result is None:
+        result = content_filter.analyze_content(search_query, video_results, library)
+        analysis_cache.set(key, result)
+    return result
 
 
 def need_ai_semantic_analysis(analysis_result: Dict[str, any]) -> bool:
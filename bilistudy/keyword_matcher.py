@@ -0,0 +1,90 @@
+"""
+多模式关键词匹配（Aho-Corasick自动机）
+关键词库在加载时编译成自动机，一次扫描文本即可找出所有命中的 (分类, 关键词)
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+class KeywordMatcher:
+    """Aho-Corasick关键词匹配器（大小写不敏感）"""
+
+    def __init__(self, keywords: Dict[str, List[str]], categories: Iterable[str] = None):
+        """
+        keywords: {分类: [关键词, ...]}
+        categories: 参与匹配的分类及其顺序，默认使用keywords中的全部分类
+        """
+        # 按分类顺序展开的 (分类, 关键词) 列表；同一关键词重复出现时保留多份，与逐个匹配的计分一致
+        self.entries: List[Tuple[str, str]] = []
+        # 规范化后的模式串 -> 命中该模式的entries下标
+        self._pattern_entries: Dict[str, List[int]] = {}
+
+        for category in (categories if categories is not None else keywords.keys()):
+            for keyword in keywords.get(category, []):
+                pattern = keyword.lower()
+                if not pattern:
+                    continue
+                self._pattern_entries.setdefault(pattern, []).append(len(self.entries))
+                self.entries.append((category, keyword))
+
+        # 包含空白的关键词可能跨越分词结果中的词边界，需要额外匹配分词文本
+        self.has_whitespace_patterns = any(any(ch.isspace() for ch in p) for p in self._pattern_entries)
+        self._build(self._pattern_entries.keys())
+
+    def _build(self, patterns):
+        """构建goto表、失败指针和输出集合"""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[str, ...]] = [()]
+
+        for pattern in patterns:
+            state = 0
+            for ch in pattern:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] = self._output[state] + (pattern,)
+
+        # 广度优先计算失败指针，并把失败链上的输出合并到当前状态
+        # 根节点的子节点失败指针指向根节点
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_patterns(self, text: str) -> set:
+        """扫描一遍文本，返回命中的模式串集合（text应已转小写）"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def match(self, *texts: str) -> List[Tuple[str, str]]:
+        """返回在任一文本中命中的 (分类, 关键词)，按分类和关键词库中的顺序排列"""
+        found = set()
+        for text in texts:
+            if text:
+                found |= self.find_patterns(text.lower())
+
+        indexes = sorted(i for pattern in found for i in self._pattern_entries[pattern])
+        return [self.entries[i] for i in indexes]
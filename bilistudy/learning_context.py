@@ -0,0 +1,91 @@
+"""
+用户学习情况快照
+AI助手的系统提示词需要用户的课程、进度和学习计划。快照用一次查询构建并缓存，
+课程、进度或学习计划变化时失效（见 signals.py 以及使用 update() 更新计数器的地方），
+后台刷新改变视频标题或UP主时也会失效（见 video_refresh.py），
+稳定状态下构建提示词不再访问数据库
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import UserCourse
+
+KEY_PREFIX = 'learning_context'
+DEFAULT_TIMEOUT = 60 * 60
+
+
+def make_cache_key(user_id):
+    return f"{KEY_PREFIX}:{user_id}"
+
+
+class LearningContext:
+    """某个用户的课程、进度和学习计划"""
+
+    def __init__(self, courses):
+        # [{'id', 'title', 'author', 'total_count', 'completed_count', 'plan_total_days', 'plan_daily_minutes', 'plan_is_active'}, ...]
+        self.courses = courses
+
+    @classmethod
+    def build(cls, user_id):
+        """一次查询取出用户全部课程及其学习计划"""
+        rows = UserCourse.objects.filter(user_id=user_id).order_by('id').values(
+            'id', 'custom_title', 'video__title', 'video__author', 'total_count', 'completed_count',
+            'study_plan__total_days', 'study_plan__daily_minutes', 'study_plan__is_active',
+        )
+        return cls([
+            {
+                'id': row['id'],
+                'title': row['custom_title'] or row['video__title'],
+                'author': row['video__author'],
+                'total_count': row['total_count'],
+                'completed_count': row['completed_count'],
+                'plan_total_days': row['study_plan__total_days'],
+                'plan_daily_minutes': row['study_plan__daily_minutes'],
+                'plan_is_active': row['study_plan__is_active'],
+            }
+            for row in rows
+        ])
+
+    def get_course(self, course_id):
+        try:
+            course_id = int(course_id)
+        except (TypeError, ValueError):
+            return None
+        return next((course for course in self.courses if course['id'] == course_id), None)
+
+    @property
+    def total_courses(self):
+        return len(self.courses)
+
+    @property
+    def total_progress(self):
+        return sum(course['total_count'] for course in self.courses)
+
+    @property
+    def completed_progress(self):
+        return sum(course['completed_count'] for course in self.courses)
+
+    @property
+    def completion_rate(self):
+        total = self.total_progress
+        return (self.completed_progress / total * 100) if total > 0 else 0
+
+
+def get_learning_context(user_id):
+    """读取用户的学习情况快照，缓存未命中时构建"""
+    key = make_cache_key(user_id)
+    courses = cache.get(key)
+    if courses is not None:
+        return LearningContext(courses)
+
+    context = LearningContext.build(user_id)
+    cache.set(key, context.courses, getattr(settings, 'LEARNING_CONTEXT_CACHE_TTL', DEFAULT_TIMEOUT))
+    return context
+
+
+def invalidate(user_id):
+    """用户的课程、进度或学习计划变化后调用；在事务提交后再删除缓存，避免并发请求写回旧数据"""
+    if user_id is not None:
+        transaction.on_commit(lambda: cache.delete(make_cache_key(user_id)))
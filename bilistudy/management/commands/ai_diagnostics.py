@@ -0,0 +1,27 @@
+"""
+网络连通性诊断
+立即检查基本网络、DeepSeek和Google AI服务器的连通性：python manage.py ai_diagnostics
+诊断缓存（AI_DIAGNOSTICS_CACHE_ALIAS）为Redis等共享缓存时同时更新Web服务读取的诊断结果；
+使用进程内缓存（LocMemCache）时只是一次独立的连通性检查，服务进程仍按 AI_DIAGNOSTICS_INTERVAL 自行诊断
+"""
+
+from django.core.management.base import BaseCommand
+
+from bilistudy.ai_diagnostics import is_shared_cache, run_diagnostics
+
+
+class Command(BaseCommand):
+    help = "检查AI服务相关的网络连通性（诊断缓存为共享缓存时同时更新服务的诊断结果）"
+
+    def handle(self, *args, **options):
+        snapshot = run_diagnostics()
+        for check in snapshot['checks'].values():
+            if check['ok']:
+                self.stdout.write(self.style.SUCCESS(f"{check['name']}: 正常（{check['latency_ms']} ms）"))
+            else:
+                self.stdout.write(self.style.ERROR(f"{check['name']}: {check['error']}"))
+        if not is_shared_cache():
+            self.stdout.write(self.style.WARNING(
+                "诊断缓存是进程内缓存，本次结果不会更新Web服务的诊断结果；"
+                "如需共享请将 AI_DIAGNOSTICS_CACHE_ALIAS 指向Redis等共享缓存"
+            ))
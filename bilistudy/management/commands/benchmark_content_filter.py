@@ -0,0 +1,100 @@
+"""
+关键词匹配性能测试
+对比逐个关键词子串匹配（旧实现）与Aho-Corasick自动机在 content_filter_keywords.txt 上的耗时，
+并校验两者的匹配结果完全一致：python manage.py benchmark_content_filter
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bilistudy.content_filter import NEGATIVE_CATEGORIES, POSITIVE_CATEGORIES, content_filter
+
+SAMPLE_TEXTS = [
+    "python",
+    "考研数学",
+    "Python零基础入门教程，从安装到实战项目全套讲解",
+    "【考研数学】2025高数基础班 第1讲 函数与极限",
+    "原神4.0新角色抽卡实况，全程高能搞笑",
+    "周末vlog | 和朋友去探店吃火锅",
+    "机器学习 吴恩达 深度学习 神经网络 中英字幕",
+    "王者荣耀 国服第一打野 教学 上分技巧",
+    "雅思口语7分备考经验分享",
+    "ASMR 助眠 白噪音 放松解压 睡前听",
+    "C++数据结构与算法 链表 二叉树 动态规划",
+    "英雄联盟S13总决赛 精彩集锦",
+]
+
+
+def legacy_match(keywords, categories, text, words):
+    """旧实现：每个关键词都对整段文本做一次子串查找"""
+    matches = []
+    for category in categories:
+        if category in keywords:
+            for keyword in keywords[category]:
+                if keyword.lower() in text.lower() or keyword.lower() in ' '.join(words):
+                    matches.append((category, keyword))
+    return matches
+
+
+class Command(BaseCommand):
+    help = "对比关键词匹配新旧实现的性能，并校验结果一致"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='每条文本重复匹配的次数')
+        parser.add_argument('--random-texts', type=int, default=200, help='额外由关键词随机拼接生成的测试文本数量')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        keywords = content_filter.keywords
+        if not keywords:
+            raise CommandError("关键词库为空，请检查 content_filter_keywords.txt")
+
+        # 用关键词库和常见字符随机拼出更多贴近真实标题的文本
+        rng = random.Random(options['seed'])
+        vocabulary = [kw for kws in keywords.values() for kw in kws] + ['的', '了', '和', '2024', '第一集', '｜', ' ']
+        texts = list(SAMPLE_TEXTS)
+        for _ in range(options['random_texts']):
+            texts.append(''.join(rng.choice(vocabulary) for _ in range(rng.randint(3, 12))))
+
+        # 分词与两种实现无关，提前完成
+        segmented = [(text, content_filter.segment_text(text)) for text in texts]
+
+        matchers = [
+            (POSITIVE_CATEGORIES, content_filter.positive_matcher),
+            (NEGATIVE_CATEGORIES, content_filter.negative_matcher),
+        ]
+
+        # 校验结果一致
+        for text, words in segmented:
+            for categories, matcher in matchers:
+                expected = legacy_match(keywords, categories, text, words)
+                actual = content_filter._match_keywords(matcher, text, words)
+                if expected != actual:
+                    raise CommandError(f"匹配结果不一致: {text!r}\n旧实现: {expected}\n新实现: {actual}")
+
+        iterations = options['iterations']
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for text, words in segmented:
+                for categories, _matcher in matchers:
+                    legacy_match(keywords, categories, text, words)
+        legacy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for text, words in segmented:
+                for _categories, matcher in matchers:
+                    content_filter._match_keywords(matcher, text, words)
+        automaton_seconds = time.perf_counter() - start
+
+        calls = iterations * len(segmented)
+        keyword_count = sum(len(kws) for kws in keywords.values())
+        self.stdout.write(f"关键词数量: {keyword_count}，测试文本: {len(segmented)} 条，每条重复 {iterations} 次")
+        self.stdout.write(f"逐个关键词匹配: {legacy_seconds / calls * 1e6:.1f} µs/条")
+        self.stdout.write(f"Aho-Corasick自动机: {automaton_seconds / calls * 1e6:.1f} µs/条")
+        self.stdout.write(self.style.SUCCESS(
+            f"结果一致，加速 {legacy_seconds / max(automaton_seconds, 1e-9):.1f} 倍"
+        ))
@@ -0,0 +1,68 @@
+"""
+学习报告PDF生成性能测试
+在一个最终回滚的事务中创建带大量每日学习记录的学习计划（默认1000和5000条），分别生成普通报告和
+附带全部学习记录的报告，输出耗时、Python内存峰值（tracemalloc）和文件大小：python manage.py benchmark_plan_report
+"""
+
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from bilistudy.models import BiliVideo, DailyStudyRecord, StudyPlan, UserCourse
+from bilistudy.plan_report import build_plan_report, warmup
+
+
+class Command(BaseCommand):
+    help = "测试长学习计划（1000+条学习记录）生成PDF报告的耗时和内存占用"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, nargs='+', default=[1000, 5000], help='每个测试计划的学习记录数')
+
+    def create_plan(self, index, record_count):
+        user = User.objects.create_user(username=f'benchmark_report_{index}')
+        video = BiliVideo.objects.create(
+            bvid=f'BVbench{index:05d}', title=f'性能测试课程 {index}', cover='https://i0.hdslb.com/bfs/archive/test.jpg',
+            author='测试UP主', pub_date=date(2024, 1, 1),
+        )
+        course = UserCourse.objects.create(user=user, video=video, total_count=100, completed_count=40)
+        plan = StudyPlan.objects.create(user=user, user_course=course, total_days=record_count, daily_minutes=60)
+        start = date.today() - timedelta(days=record_count - 1)
+        DailyStudyRecord.objects.bulk_create([
+            DailyStudyRecord(study_plan=plan, study_date=start + timedelta(days=day), study_minutes=(day * 37) % 120)
+            for day in range(record_count)
+        ], batch_size=1000)
+        return plan
+
+    def measure(self, plan, include_all_records):
+        with tempfile.TemporaryFile() as output:
+            tracemalloc.start()
+            start = time.perf_counter()
+            build_plan_report(plan, output, include_all_records=include_all_records)
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            size = output.tell()
+        return seconds, peak, size
+
+    def handle(self, *args, **options):
+        # 字体和样式每个进程只初始化一次，不计入单次导出
+        warmup()
+
+        with transaction.atomic():
+            for index, record_count in enumerate(options['records']):
+                plan = self.create_plan(index, record_count)
+                for label, include_all_records in (('普通报告', False), ('含全部记录', True)):
+                    seconds, peak, size = self.measure(plan, include_all_records)
+                    self.stdout.write(
+                        f"{record_count} 条记录 {label}: {seconds * 1000:.0f} ms，"
+                        f"内存峰值 {peak / 1024 / 1024:.1f} MB，文件 {size / 1024:.0f} KB"
+                    )
+            # 测试数据全部回滚
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("测试完成，测试数据已回滚"))
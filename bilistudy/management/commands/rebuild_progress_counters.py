@@ -0,0 +1,30 @@
+"""
+重建课程学习进度计数器
+UserCourse.completed_count / total_count 与LearningProgress不一致时使用：
+python manage.py rebuild_progress_counters [--user 用户名]
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from bilistudy.models import UserCourse
+
+
+class Command(BaseCommand):
+    help = "根据LearningProgress重建UserCourse的已完成/总分集计数器"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='只重建指定用户名的课程')
+
+    def handle(self, *args, **options):
+        courses = UserCourse.objects.all()
+        if options['user']:
+            courses = courses.filter(user__username=options['user'])
+
+        rebuilt = 0
+        for course in courses.iterator():
+            with transaction.atomic():
+                course.rebuild_progress_counters()
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"已重建 {rebuilt} 门课程的进度计数器"))
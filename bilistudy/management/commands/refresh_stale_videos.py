@@ -0,0 +1,36 @@
+"""
+刷新元数据过期的B站视频
+可配合cron定时执行：python manage.py refresh_stale_videos --limit 200
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from bilistudy.video_refresh import refresh_video, stale_videos
+
+
+class Command(BaseCommand):
+    help = "刷新元数据过期的BiliVideo（播放量、点赞数等）"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help='本次最多刷新的视频数量')
+        parser.add_argument('--interval', type=float, default=0.5, help='两次请求之间的间隔（秒），避免触发B站限流')
+
+    def handle(self, *args, **options):
+        bvids = list(
+            stale_videos().order_by(F('metadata_updated_at').asc(nulls_first=True)).values_list('bvid', flat=True)[:options['limit']]
+        )
+        if not bvids:
+            self.stdout.write("没有需要刷新的视频")
+            return
+
+        refreshed = 0
+        for i, bvid in enumerate(bvids):
+            if i and options['interval'] > 0:
+                time.sleep(options['interval'])
+            if refresh_video(bvid):
+                refreshed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"已刷新 {refreshed}/{len(bvids)} 个视频"))
@@ -0,0 +1,43 @@
+"""
+校验并发布关键词库
+编辑 content_filter_keywords.txt 后执行：python manage.py reload_content_keywords
+校验通过后更新文件修改时间，各Worker在 CONTENT_FILTER_RELOAD_INTERVAL 秒内自动热加载，无需重启
+"""
+
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from bilistudy.content_filter import KeywordLibrary, get_keywords_file
+
+
+class Command(BaseCommand):
+    help = "校验关键词库文件并通知运行中的Worker重新加载"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='只校验，不通知Worker重新加载')
+
+    def handle(self, *args, **options):
+        keywords_file = get_keywords_file()
+        try:
+            library = KeywordLibrary.from_file(keywords_file)
+        except Exception as e:
+            raise CommandError(f"关键词库加载失败: {str(e)}")
+
+        if not library.keywords:
+            raise CommandError(f"关键词库为空: {keywords_file}")
+
+        keyword_count = sum(len(kws) for kws in library.keywords.values())
+        self.stdout.write(f"分类: {len(library.keywords)} 个，关键词: {keyword_count} 个，版本: {library.version[:12]}")
+
+        if options['check']:
+            self.stdout.write(self.style.SUCCESS("关键词库校验通过"))
+            return
+
+        os.utime(keywords_file)
+        interval = getattr(settings, 'CONTENT_FILTER_RELOAD_INTERVAL', 5)
+        if interval:
+            self.stdout.write(self.style.SUCCESS(f"关键词库校验通过，运行中的Worker将在 {interval:g} 秒内重新加载"))
+        else:
+            self.stdout.write(self.style.WARNING("关键词库校验通过，但热加载已关闭（CONTENT_FILTER_RELOAD_INTERVAL=0），需重启Worker生效"))
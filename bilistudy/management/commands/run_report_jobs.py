@@ -0,0 +1,31 @@
+"""
+生成排队中的学习报告PDF
+关闭进程内生成（PLAN_REPORT_BACKGROUND=False）时可配合cron或常驻循环执行：python manage.py run_report_jobs --loop 5
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from bilistudy.plan_report import warmup
+from bilistudy.report_jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = "生成排队中的学习报告PDF（超时中断的任务会重新排队）"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', type=float, default=0, help='持续运行，每隔指定秒数检查一次新任务；0表示处理完当前任务后退出')
+
+    def handle(self, *args, **options):
+        # 常驻运行时字体和样式只在启动时初始化一次
+        warmup()
+        while True:
+            processed = run_pending()
+            if processed:
+                self.stdout.write(self.style.SUCCESS(f"已处理 {processed} 个报告任务"))
+            if not options['loop']:
+                if not processed:
+                    self.stdout.write("没有排队中的报告任务")
+                return
+            time.sleep(options['loop'])
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bilistudy", "0014_userpreference_has_viewed_guide"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bilivideo",
+            name="metadata_updated_at",
+            field=models.DateTimeField(blank=True, null=True, verbose_name="元数据更新时间"),
+        ),
+    ]
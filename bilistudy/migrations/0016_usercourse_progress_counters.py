@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:05
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_progress_counters(apps, schema_editor):
+    """根据已有的学习进度记录初始化计数器"""
+    UserCourse = apps.get_model("bilistudy", "UserCourse")
+    courses = UserCourse.objects.annotate(
+        total=Count("progress"),
+        completed=Count("progress", filter=Q(progress__is_completed=True)),
+    )
+    for course in courses:
+        UserCourse.objects.filter(pk=course.pk).update(
+            total_count=course.total,
+            completed_count=course.completed,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bilistudy", "0015_bilivideo_metadata_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="usercourse",
+            name="completed_count",
+            field=models.IntegerField(default=0, verbose_name="已完成分集数"),
+        ),
+        migrations.AddField(
+            model_name="usercourse",
+            name="total_count",
+            field=models.IntegerField(default=0, verbose_name="总分集数"),
+        ),
+        migrations.RunPython(populate_progress_counters, migrations.RunPython.noop),
+    ]
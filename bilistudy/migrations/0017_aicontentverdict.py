@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bilistudy", "0016_usercourse_progress_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AIContentVerdict",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("prompt_hash", models.CharField(max_length=64, unique=True, verbose_name="提示词哈希")),
+                ("query_key", models.CharField(db_index=True, max_length=200, verbose_name="规范化搜索词")),
+                ("search_query", models.CharField(max_length=200, verbose_name="搜索关键词")),
+                ("prompt", models.TextField(blank=True, verbose_name="分析提示词")),
+                ("is_learning_related", models.BooleanField(blank=True, null=True, verbose_name="是否与学习相关")),
+                ("confidence", models.FloatField(default=0.5, verbose_name="置信度")),
+                ("reason", models.TextField(blank=True, verbose_name="理由")),
+                ("full_response", models.TextField(blank=True, verbose_name="AI完整回复")),
+                ("source", models.CharField(choices=[("deepseek", "DeepSeek"), ("gemini", "Gemini"), ("admin", "管理员")], default="deepseek", max_length=20, verbose_name="来源")),
+                ("is_override", models.BooleanField(default=False, help_text="修正后的结论对该搜索词的所有分析生效，且不会被AI结果覆盖", verbose_name="管理员修正")),
+                ("hit_count", models.IntegerField(default=0, verbose_name="命中次数")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="创建时间")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="更新时间")),
+            ],
+            options={
+                "verbose_name": "AI内容分析结论",
+                "verbose_name_plural": "AI内容分析结论",
+                "ordering": ["-updated_at"],
+            },
+        ),
+    ]
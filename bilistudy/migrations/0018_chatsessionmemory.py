@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bilistudy", "0017_aicontentverdict"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChatSessionMemory",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("session_id", models.CharField(max_length=100, unique=True, verbose_name="会话ID")),
+                ("summary", models.TextField(blank=True, verbose_name="对话摘要")),
+                ("summarized_until", models.BigIntegerField(default=0, verbose_name="已摘要到的聊天记录ID")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="更新时间")),
+            ],
+            options={
+                "verbose_name": "会话记忆",
+                "verbose_name_plural": "会话记忆",
+            },
+        ),
+        migrations.AlterField(
+            model_name="chathistory",
+            name="session_id",
+            field=models.CharField(db_index=True, max_length=100, verbose_name="会话ID"),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bilistudy", "0018_chatsessionmemory"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AIResponseCache",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("question_hash", models.CharField(max_length=64, unique=True, verbose_name="问题哈希")),
+                ("ai_model", models.CharField(max_length=20, verbose_name="AI模型")),
+                ("question", models.TextField(verbose_name="用户问题")),
+                ("normalized_question", models.CharField(max_length=500, verbose_name="规范化问题")),
+                ("response", models.TextField(verbose_name="AI回复")),
+                ("hit_count", models.IntegerField(default=0, verbose_name="命中次数")),
+                ("last_hit_at", models.DateTimeField(blank=True, null=True, verbose_name="最近命中时间")),
+                ("expires_at", models.DateTimeField(db_index=True, verbose_name="过期时间")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="创建时间")),
+            ],
+            options={
+                "verbose_name": "AI回复缓存",
+                "verbose_name_plural": "AI回复缓存",
+                "ordering": ["-hit_count", "-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bilistudy", "0019_airesponsecache"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlanReportJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("fingerprint", models.CharField(help_text="计划、进度和学习记录不变时指纹相同，复用已生成的报告", max_length=64, verbose_name="数据指纹")),
+                ("status", models.CharField(choices=[("pending", "排队中"), ("running", "生成中"), ("done", "已完成"), ("failed", "失败")], db_index=True, default="pending", max_length=10, verbose_name="状态")),
+                ("file", models.FileField(blank=True, upload_to="reports/", verbose_name="报告文件")),
+                ("filename", models.CharField(blank=True, max_length=200, verbose_name="下载文件名")),
+                ("error", models.TextField(blank=True, verbose_name="错误信息")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="创建时间")),
+                ("started_at", models.DateTimeField(blank=True, null=True, verbose_name="开始时间")),
+                ("finished_at", models.DateTimeField(blank=True, null=True, verbose_name="完成时间")),
+                ("study_plan", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="report_jobs", to="bilistudy.studyplan", verbose_name="学习计划")),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="report_jobs", to=settings.AUTH_USER_MODEL, verbose_name="用户")),
+            ],
+            options={
+                "verbose_name": "学习报告任务",
+                "verbose_name_plural": "学习报告任务",
+                "ordering": ["-created_at"],
+                "indexes": [models.Index(fields=["study_plan", "fingerprint"], name="bilistudy_p_study_p_632885_idx")],
+            },
+        ),
+    ]
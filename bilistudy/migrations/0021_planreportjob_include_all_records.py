@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bilistudy", "0020_planreportjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="planreportjob",
+            name="include_all_records",
+            field=models.BooleanField(default=False, verbose_name="包含全部学习记录"),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Count, F, Q
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
@@ -15,6 +16,7 @@ class BiliVideo(models.Model):
     play_count = models.IntegerField(default=0, verbose_name="播放量")
     like_count = models.IntegerField(default=0, verbose_name="点赞数")
     description = models.TextField(blank=True, verbose_name="视频简介")
+    metadata_updated_at = models.DateTimeField(null=True, blank=True, verbose_name="元数据更新时间")
     
     def __str__(self):
         return self.title
@@ -76,6 +78,9 @@ class UserCourse(models.Model):
     video = models.ForeignKey(BiliVideo, on_delete=models.CASCADE, verbose_name="视频")
     custom_title = models.CharField(max_length=200, blank=True, null=True, verbose_name="自定义课程名称")
     add_time = models.DateTimeField(auto_now_add=True, verbose_name="添加时间")
+    # 学习进度计数器（冗余字段，随LearningProgress变化同步维护，可用 rebuild_progress_counters 命令重建）
+    completed_count = models.IntegerField(default=0, verbose_name="已完成分集数")
+    total_count = models.IntegerField(default=0, verbose_name="总分集数")
 
     def __str__(self):
         return self.custom_title or f"{self.video.title}"
@@ -84,6 +89,31 @@ class UserCourse(models.Model):
         verbose_name = "课程"
         verbose_name_plural = verbose_name
 
+    @property
+    def completion_rate(self):
+        """课程完成百分比"""
+        return (self.completed_count / self.total_count * 100) if self.total_count > 0 else 0
+
+    def adjust_completed_count(self, delta):
+        """原子地增减已完成分集数，并同步实例上的计数器"""
+        if delta:
+            UserCourse.objects.filter(pk=self.pk).update(completed_count=F('completed_count') + delta)
+            self.refresh_from_db(fields=['completed_count'])
+
+            from .learning_context import invalidate
+            invalidate(self.user_id)
+        return self.completed_count
+
+    def rebuild_progress_counters(self):
+        """根据LearningProgress重新统计计数器"""
+        counts = self.progress.aggregate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(is_completed=True))
+        )
+        self.total_count = counts['total']
+        self.completed_count = counts['completed']
+        self.save(update_fields=['total_count', 'completed_count'])
+
 class LearningProgress(models.Model):
     """学习进度模型"""
     user_course = models.ForeignKey(UserCourse, on_delete=models.CASCADE, related_name='progress', verbose_name="课程")
@@ -129,12 +159,7 @@ class StudyPlan(models.Model):
     @property
     def progress_percentage(self):
         """计划完成百分比"""
-        total_episodes = self.user_course.video.episodes.count()
-        completed_episodes = LearningProgress.objects.filter(
-            user_course=self.user_course,
-            is_completed=True
-        ).count()
-        return (completed_episodes / total_episodes * 100) if total_episodes > 0 else 0
+        return self.user_course.completion_rate
 
     @property
     def days_passed(self):
@@ -225,15 +250,10 @@ class DailyStudyRecord(models.Model):
     def get_total_progress(self):
         """获取总体学习进度"""
         user_course = self.study_plan.user_course
-        total_episodes = user_course.video.episodes.count()
-        completed_episodes = LearningProgress.objects.filter(
-            user_course=user_course,
-            is_completed=True
-        ).count()
         return {
-            'completed': completed_episodes,
-            'total': total_episodes,
-            'percentage': round((completed_episodes / total_episodes * 100), 1) if total_episodes > 0 else 0
+            'completed': user_course.completed_count,
+            'total': user_course.total_count,
+            'percentage': round(user_course.completion_rate, 1)
         }
 
     def get_daily_episodes_detail(self):
@@ -255,7 +275,7 @@ class DailyStudyRecord(models.Model):
 
 class ChatHistory(models.Model):
     """AI助手聊天历史记录模型"""
-    session_id = models.CharField(max_length=100, verbose_name="会话ID")
+    session_id = models.CharField(max_length=100, db_index=True, verbose_name="会话ID")
     user_message = models.TextField(verbose_name="用户消息")
     ai_response = models.TextField(verbose_name="AI回复")
     chat_type = models.CharField(max_length=50, default='general', verbose_name="聊天类型")
@@ -270,6 +290,21 @@ class ChatHistory(models.Model):
         ordering = ['-created_at']
 
 
+class ChatSessionMemory(models.Model):
+    """AI助手会话记忆：较早对话的滚动摘要"""
+    session_id = models.CharField(max_length=100, unique=True, verbose_name="会话ID")
+    summary = models.TextField(blank=True, verbose_name="对话摘要")
+    summarized_until = models.BigIntegerField(default=0, verbose_name="已摘要到的聊天记录ID")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    def __str__(self):
+        return f"会话 {self.session_id} 的记忆"
+
+    class Meta:
+        verbose_name = "会话记忆"
+        verbose_name_plural = verbose_name
+
+
 class UserPreference(models.Model):
     """用户偏好设置模型"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='preference', verbose_name="用户")
@@ -298,4 +333,87 @@ class UserPreference(models.Model):
 
     class Meta:
         verbose_name = "用户偏好设置"
-        verbose_name_plural = verbose_name
\ No newline at end of file
+        verbose_name_plural = verbose_name
+
+
+class AIContentVerdict(models.Model):
+    """AI语义分析结论缓存，相同的分析提示词不再重复调用大模型"""
+    SOURCE_CHOICES = [
+        ('deepseek', 'DeepSeek'),
+        ('gemini', 'Gemini'),
+        ('admin', '管理员'),
+    ]
+
+    prompt_hash = models.CharField(max_length=64, unique=True, verbose_name="提示词哈希")
+    query_key = models.CharField(max_length=200, db_index=True, verbose_name="规范化搜索词")
+    search_query = models.CharField(max_length=200, verbose_name="搜索关键词")
+    prompt = models.TextField(blank=True, verbose_name="分析提示词")
+    is_learning_related = models.BooleanField(null=True, blank=True, verbose_name="是否与学习相关")
+    confidence = models.FloatField(default=0.5, verbose_name="置信度")
+    reason = models.TextField(blank=True, verbose_name="理由")
+    full_response = models.TextField(blank=True, verbose_name="AI完整回复")
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='deepseek', verbose_name="来源")
+    is_override = models.BooleanField(default=False, verbose_name="管理员修正", help_text="修正后的结论对该搜索词的所有分析生效，且不会被AI结果覆盖")
+    hit_count = models.IntegerField(default=0, verbose_name="命中次数")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    def __str__(self):
+        return f"{self.search_query} - {self.get_source_display()}"
+
+    class Meta:
+        verbose_name = "AI内容分析结论"
+        verbose_name_plural = verbose_name
+        ordering = ['-updated_at']
+
+
+class AIResponseCache(models.Model):
+    """AI助手通用问题的回复缓存，相同或相近的问题直接返回已有回复"""
+    question_hash = models.CharField(max_length=64, unique=True, verbose_name="问题哈希")
+    ai_model = models.CharField(max_length=20, verbose_name="AI模型")
+    question = models.TextField(verbose_name="用户问题")
+    normalized_question = models.CharField(max_length=500, verbose_name="规范化问题")
+    response = models.TextField(verbose_name="AI回复")
+    hit_count = models.IntegerField(default=0, verbose_name="命中次数")
+    last_hit_at = models.DateTimeField(null=True, blank=True, verbose_name="最近命中时间")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="过期时间")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+
+    def __str__(self):
+        return f"{self.question[:50]} - {self.ai_model}"
+
+    class Meta:
+        verbose_name = "AI回复缓存"
+        verbose_name_plural = verbose_name
+        ordering = ['-hit_count', '-created_at']
+
+
+class PlanReportJob(models.Model):
+    """学习报告PDF生成任务"""
+    STATUS_CHOICES = [
+        ('pending', '排队中'),
+        ('running', '生成中'),
+        ('done', '已完成'),
+        ('failed', '失败'),
+    ]
+
+    study_plan = models.ForeignKey(StudyPlan, on_delete=models.CASCADE, related_name='report_jobs', verbose_name="学习计划")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='report_jobs', verbose_name="用户")
+    fingerprint = models.CharField(max_length=64, verbose_name="数据指纹", help_text="计划、进度和学习记录不变时指纹相同，复用已生成的报告")
+    include_all_records = models.BooleanField(default=False, verbose_name="包含全部学习记录")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', db_index=True, verbose_name="状态")
+    file = models.FileField(upload_to='reports/', blank=True, verbose_name="报告文件")
+    filename = models.CharField(max_length=200, blank=True, verbose_name="下载文件名")
+    error = models.TextField(blank=True, verbose_name="错误信息")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="开始时间")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="完成时间")
+
+    def __str__(self):
+        return f"{self.study_plan} - {self.get_status_display()}"
+
+    class Meta:
+        verbose_name = "学习报告任务"
+        verbose_name_plural = verbose_name
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['study_plan', 'fingerprint'])]
@@ -0,0 +1,584 @@
+"""
+学习报告PDF
+根据学习计划和每日学习记录用ReportLab生成学习报告，由 report_jobs 在后台线程中调用。
+中文字体在每个进程中只查找和注册一次（PLAN_REPORT_FONT_FILE，或在 PLAN_REPORT_FONT_DIRS 中查找常见的中文TrueType字体，
+都找不到时使用ReportLab自带的STSong-Light CID字体），段落和表格样式也只构建一次，之后的每次导出直接复用
+"""
+
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from io import BytesIO
+from urllib.parse import quote
+
+from django.conf import settings
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from .models import DailyStudyRecord
+
+FONT_NAME = 'ReportCJK'
+# 按优先级排列的中文TrueType字体文件名（ReportLab不支持CFF轮廓的OpenType字体，如Noto Sans CJK的.otf/.ttc）
+FONT_FILE_NAMES = [
+    'simhei.ttf', 'msyh.ttc', 'msyh.ttf', 'simsun.ttc',
+    'wqy-microhei.ttc', 'wqy-zenhei.ttc', 'DroidSansFallbackFull.ttf', 'DroidSansFallback.ttf',
+    'NotoSansSC-Regular.ttf', 'SourceHanSansSC-Regular.ttf',
+]
+DEFAULT_FONT_DIRS = [
+    '/usr/share/fonts', '/usr/local/share/fonts', '~/.local/share/fonts', '~/.fonts',
+    'C:/Windows/Fonts', '/System/Library/Fonts', '/Library/Fonts',
+]
+# ReportLab自带的中文CID字体，不需要字体文件（由PDF阅读器提供字形）
+FALLBACK_CID_FONT = 'STSong-Light'
+
+# 分批读取学习记录的批大小，以及附录中每张表格的行数
+RECORD_CHUNK_SIZE = 500
+RECORDS_PER_TABLE = 25
+
+_font_name = None
+_styles = None
+_init_lock = threading.Lock()
+
+
+def get_font_dirs():
+    return getattr(settings, 'PLAN_REPORT_FONT_DIRS', None) or DEFAULT_FONT_DIRS
+
+
+def find_font_file():
+    """查找可用的中文字体文件，找不到返回None"""
+    configured = getattr(settings, 'PLAN_REPORT_FONT_FILE', None)
+    if configured and os.path.isfile(configured):
+        return configured
+
+    found = {}
+    wanted = {name.lower() for name in FONT_FILE_NAMES}
+    for font_dir in get_font_dirs():
+        for root, _, files in os.walk(os.path.expanduser(font_dir)):
+            for filename in files:
+                key = filename.lower()
+                if key in wanted and key not in found:
+                    found[key] = os.path.join(root, filename)
+    return next((found[name.lower()] for name in FONT_FILE_NAMES if name.lower() in found), None)
+
+
+def _register_font():
+    font_file = find_font_file()
+    if font_file:
+        try:
+            pdfmetrics.registerFont(TTFont(FONT_NAME, font_file))
+            return FONT_NAME
+        except Exception as e:
+            print(f"注册报告字体失败 {font_file}: {str(e)}")
+    try:
+        pdfmetrics.registerFont(UnicodeCIDFont(FALLBACK_CID_FONT))
+        return FALLBACK_CID_FONT
+    except Exception as e:
+        print(f"注册报告字体失败 {FALLBACK_CID_FONT}: {str(e)}")
+        return 'Helvetica'  # 回退到默认字体
+
+
+def get_font():
+    """报告使用的中文字体名（每个进程只查找和注册一次）"""
+    global _font_name
+    if _font_name is None:
+        with _init_lock:
+            if _font_name is None:
+                _font_name = _register_font()
+    return _font_name
+
+
+class ReportStyles:
+    """报告的段落样式和表格样式"""
+
+    def __init__(self, font):
+        self.font = font
+        base = getSampleStyleSheet()
+
+        self.title = ParagraphStyle(
+            'CustomTitle',
+            parent=base['Heading1'],
+            fontName=font,
+            fontSize=20,
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            textColor=colors.HexColor('#1e40af')
+        )
+        self.heading = ParagraphStyle(
+            'CustomHeading',
+            parent=base['Heading2'],
+            fontName=font,
+            fontSize=14,
+            spaceAfter=12,
+            spaceBefore=20,
+            textColor=colors.HexColor('#1e40af')
+        )
+        self.normal = ParagraphStyle(
+            'CustomNormal',
+            parent=base['Normal'],
+            fontName=font,
+            fontSize=10,
+            spaceAfter=6,
+            leading=14
+        )
+        self.subtitle = ParagraphStyle(
+            'Subtitle',
+            parent=base['Normal'],
+            fontName=font,
+            fontSize=11,
+            alignment=TA_CENTER,
+            textColor=colors.HexColor('#64748b'),
+            spaceAfter=24
+        )
+        self.footer = ParagraphStyle(
+            'Footer',
+            parent=base['Normal'],
+            fontName=font,
+            fontSize=8,
+            alignment=TA_CENTER,
+            textColor=colors.HexColor('#64748b')
+        )
+        self.divider = ParagraphStyle(
+            'Divider',
+            parent=base['Normal'],
+            fontName=font,
+            fontSize=10,
+            alignment=TA_CENTER,
+            textColor=colors.HexColor('#3b82f6')
+        )
+
+        self.overview_table = TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#3b82f6')),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
+            ('BACKGROUND', (1, 0), (1, -1), colors.HexColor('#eff6ff')),
+            ('TEXTCOLOR', (1, 0), (1, -1), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, -1), font),
+            ('FONTSIZE', (0, 0), (-1, -1), 11),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
+            ('ROWBACKGROUNDS', (1, 0), (1, -1), [colors.HexColor('#eff6ff')])
+        ])
+        self.summary_table = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('BACKGROUND', (0, 1), (0, -1), colors.HexColor('#eff6ff')),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, -1), font),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#eff6ff')])
+        ])
+        self.records_table = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, -1), font),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8fafc')])
+        ])
+        self.analysis_table = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#7c3aed')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('BACKGROUND', (0, 1), (0, -1), colors.HexColor('#f3e8ff')),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, -1), font),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f3e8ff')])
+        ])
+
+
+def get_styles():
+    """报告样式（每个进程只构建一次，各次导出共享；样式对象在生成过程中只读）"""
+    global _styles
+    if _styles is None:
+        font = get_font()
+        with _init_lock:
+            if _styles is None:
+                _styles = ReportStyles(font)
+    return _styles
+
+
+def warmup():
+    """预先注册字体和构建样式，使第一次导出也不承担这部分开销"""
+    get_styles()
+
+
+def make_report_filename(plan, date=None):
+    """下载文件名：学习计划详细报告_课程名_日期.pdf"""
+    course_title = plan.user_course.custom_title or plan.user_course.video.title
+    # 清理文件名，移除特殊字符
+    clean_title = re.sub(r'[<>:"/\\|?*]', '', course_title)
+    clean_title = clean_title.replace(' ', '_')[:30]  # 限制长度并替换空格
+    return f'学习计划详细报告_{clean_title}_{(date or datetime.now()).strftime("%Y%m%d")}.pdf'
+
+
+def content_disposition(filename):
+    """使用URL编码确保中文文件名正确显示"""
+    return f"attachment; filename*=UTF-8''{quote(filename.encode('utf-8'))}"
+
+
+class LazyStory(list):
+    """按需从生成器取出flowable的story
+
+    SimpleDocTemplate.build 从列表头部逐个取出并排版flowable，这里只在列表中预读少量flowable
+    （keepWithNext需要看到后面几个），已排版的flowable随即释放，很长的附录不必一次性全部构建
+    """
+
+    LOOKAHEAD = 8
+
+    def __init__(self, flowables):
+        super().__init__()
+        self._source = iter(flowables)
+        self._exhausted = False
+
+    def _fill(self, size):
+        while not self._exhausted and super().__len__() < size:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._exhausted = True
+
+    def __len__(self):
+        self._fill(self.LOOKAHEAD)
+        return super().__len__()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            self._fill(index.stop if index.stop is not None and index.stop >= 0 else float('inf'))
+        elif index >= 0:
+            self._fill(index + 1)
+        else:
+            self._fill(float('inf'))
+        return super().__getitem__(index)
+
+
+def summarize_records(plan):
+    """一次遍历（分批读取）统计学习记录，不创建模型实例，内存占用与记录数无关"""
+    stats = {'count': 0, 'total_minutes': 0, 'completed_days': 0, 'excellent_days': 0, 'weekend_days': 0, 'weekday_days': 0}
+    records = DailyStudyRecord.objects.filter(study_plan=plan).values_list('study_date', 'study_minutes')
+    for study_date, minutes in records.iterator(chunk_size=RECORD_CHUNK_SIZE):
+        stats['count'] += 1
+        stats['total_minutes'] += minutes
+        if minutes >= plan.daily_minutes:
+            stats['excellent_days'] += 1
+        if minutes > 0:
+            stats['completed_days'] += 1
+            stats['weekend_days' if study_date.weekday() >= 5 else 'weekday_days'] += 1
+    return stats
+
+
+def _record_row(plan, study_date, minutes, date_format):
+    """学习记录表格的一行：日期、实际时长、完成率、状态"""
+    completion_rate_val = (minutes / max(plan.daily_minutes, 1)) * 100 if plan.daily_minutes > 0 else 0
+
+    if minutes >= plan.daily_minutes:
+        status = '✅ 达标'
+    elif minutes > 0:
+        status = '⚠️ 部分'
+    else:
+        status = '❌ 未学'
+
+    return [
+        study_date.strftime(date_format),
+        f'{minutes}分钟',
+        f'{min(completion_rate_val, 100):.0f}%',
+        status
+    ]
+
+
+def _all_records_flowables(plan, styles):
+    """附录：全部学习记录，分批读取，每 RECORDS_PER_TABLE 条一张表格（跨页时重复表头）"""
+    records = DailyStudyRecord.objects.filter(study_plan=plan).order_by('study_date').values_list('study_date', 'study_minutes')
+    header = ['日期', '实际时长', '完成率', '状态']
+    rows = []
+    for study_date, minutes in records.iterator(chunk_size=RECORD_CHUNK_SIZE):
+        rows.append(_record_row(plan, study_date, minutes, '%Y-%m-%d'))
+        if len(rows) == RECORDS_PER_TABLE:
+            yield _records_table([header] + rows, styles)
+            rows = []
+    if rows:
+        yield _records_table([header] + rows, styles)
+
+
+def _records_table(data, styles):
+    table = Table(data, colWidths=[1.2*inch, 1.5*inch, 1*inch, 1.5*inch], repeatRows=1)
+    table.setStyle(styles.records_table)
+    return table
+
+
+def build_plan_report(plan, output=None, include_all_records=False):
+    """生成学习计划的PDF报告
+
+    output为文件对象时PDF写入其中（例如临时文件），否则返回PDF内容；
+    include_all_records为True时在报告末尾附上全部学习记录
+    """
+    buffer = output if output is not None else BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    doc.build(LazyStory(_report_flowables(plan, get_styles(), summarize_records(plan), include_all_records)))
+    if output is None:
+        return buffer.getvalue()
+
+
+def _report_flowables(plan, styles, stats, include_all_records):
+    """按顺序生成报告内容"""
+    # 计算统计数据
+    total_study_time = stats['total_minutes']
+    completed_days = stats['completed_days']
+    avg_daily_time = total_study_time / max(completed_days, 1)
+    has_records = stats['count'] > 0
+
+    title_style = styles.title
+    heading_style = styles.heading
+    normal_style = styles.normal
+
+    # 报告标题和头部信息
+    course_title = plan.user_course.custom_title or plan.user_course.video.title
+    current_time = datetime.now()
+
+    # 主标题 - 更简洁的设计
+    yield Paragraph(f"📚 {course_title}", title_style)
+    yield Paragraph("学习报告", title_style)
+    yield Spacer(1, 12)
+
+    yield Paragraph(f"报告生成时间：{current_time.strftime('%Y年%m月%d日')}", styles.subtitle)
+    yield Spacer(1, 8)
+
+    # 学习概览卡片
+    overview_data = [
+        ['📚 课程', course_title],
+        ['👤 作者', plan.user_course.video.author],
+        ['📅 计划周期', f'{plan.total_days}天'],
+        ['⏰ 每日目标', f'{plan.daily_minutes}分钟'],
+        ['📈 当前进度', f'{plan.progress_percentage:.1f}%']
+    ]
+
+    overview_table = Table(overview_data, colWidths=[1.2*inch, 4.8*inch])
+    overview_table.setStyle(styles.overview_table)
+
+    yield overview_table
+    yield Spacer(1, 20)
+
+    # 计算详细统计数据
+    completion_rate = (completed_days / max(plan.days_passed, 1)) * 100
+    target_vs_actual = (total_study_time / max(plan.days_passed * plan.daily_minutes, 1)) * 100
+    remaining_days = max(plan.total_days - plan.days_passed, 0)
+    estimated_completion_time = remaining_days * plan.daily_minutes
+
+    # 计算预计完成日期
+    estimated_end_date = plan.start_date + timedelta(days=plan.total_days - 1)
+
+    # 计算学习效率指标
+    if plan.days_passed > 0:
+        daily_completion_rate = completion_rate / 100
+        learning_efficiency = target_vs_actual / 100
+    else:
+        daily_completion_rate = 0
+        learning_efficiency = 0
+
+    # 学习成果总结
+    yield Paragraph("📈 学习成果总结", heading_style)
+
+    # 计算关键指标
+    study_efficiency = (total_study_time / max(plan.days_passed * plan.daily_minutes, 1)) * 100
+    consistency_rate = (completed_days / max(plan.days_passed, 1)) * 100
+
+    # 生成评价
+    efficiency_grade = "优秀" if study_efficiency >= 90 else "良好" if study_efficiency >= 70 else "一般" if study_efficiency >= 50 else "待提升"
+    consistency_grade = "优秀" if consistency_rate >= 90 else "良好" if consistency_rate >= 70 else "一般" if consistency_rate >= 50 else "待提升"
+
+    summary_data = [
+        ['学习指标', '实际表现', '评价等级'],
+        ['📚 累计学习', f'{total_study_time}分钟 ({total_study_time//60}小时{total_study_time%60}分钟)', f'已完成 {study_efficiency:.1f}% 目标'],
+        ['📅 坚持天数', f'{completed_days}/{plan.days_passed}天', f'{consistency_grade} ({consistency_rate:.1f}%)'],
+        ['⏰ 平均时长', f'{avg_daily_time:.0f}分钟/天', efficiency_grade],
+        ['🎯 剩余计划', f'{remaining_days}天', f'预计需要 {estimated_completion_time//60}小时'],
+    ]
+
+    overview_table = Table(overview_data, colWidths=[2*inch, 2*inch, 2*inch])
+    overview_table.setStyle(styles.summary_table)
+
+    yield overview_table
+    yield Spacer(1, 20)
+
+
+
+    # 最近学习记录
+    if has_records:
+        yield Paragraph("📅 最近学习记录", heading_style)
+
+        # 只显示最近10天的记录
+        recent_records = DailyStudyRecord.objects.filter(study_plan=plan).order_by('-study_date').values_list(
+            'study_date', 'study_minutes'
+        )[:10]
+        records_table_data = [['日期', '实际时长', '完成率', '状态']]
+        for study_date, minutes in recent_records:
+            records_table_data.append(_record_row(plan, study_date, minutes, '%m-%d'))
+
+        records_table = Table(records_table_data, colWidths=[1*inch, 1.5*inch, 1*inch, 1.5*inch])
+        records_table.setStyle(styles.records_table)
+
+        yield records_table
+        yield Spacer(1, 16)
+
+    else:
+        yield Paragraph("📅 最近学习记录", heading_style)
+        yield Paragraph("暂无学习记录，建议开始记录每日学习情况。", normal_style)
+
+    yield Spacer(1, 20)
+
+    # 六、专业分析与改进建议
+    yield Paragraph("六、专业分析与改进建议", heading_style)
+
+    # 简化的学习建议
+    if has_records:
+        excellent_rate = (stats['excellent_days'] / stats['count']) * 100
+        overall_performance = "优秀" if excellent_rate >= 70 else "良好" if excellent_rate >= 50 else "一般" if excellent_rate >= 30 else "待改进"
+    else:
+        excellent_rate = 0
+        overall_performance = "无数据"
+
+    # 生成专业分析报告
+    analysis_data = [
+        ['分析维度', '当前状况', '专业评估', '具体建议'],
+        ['整体表现', f'{overall_performance} (优秀率{excellent_rate:.1f}%)',
+         '优秀' if excellent_rate >= 70 else '良好' if excellent_rate >= 50 else '需改进',
+         '继续保持高标准' if excellent_rate >= 70 else '提升学习质量和时长'],
+        ['学习规律', f'平均{avg_daily_time:.1f}分钟/天',
+         '规律' if abs(avg_daily_time - plan.daily_minutes) <= 15 else '不够规律',
+         '保持当前节奏' if abs(avg_daily_time - plan.daily_minutes) <= 15 else '建议固定学习时间段'],
+        ['目标达成', f'{target_vs_actual:.1f}%完成度',
+         '达标' if target_vs_actual >= 80 else '接近达标' if target_vs_actual >= 60 else '未达标',
+         '保持现状' if target_vs_actual >= 80 else '需要增加学习投入'],
+        ['学习坚持', f'{completion_rate:.1f}%出勤率',
+         '优秀' if completion_rate >= 85 else '良好' if completion_rate >= 70 else '一般',
+         '继续保持' if completion_rate >= 70 else '设置学习提醒和激励机制']
+    ]
+
+    analysis_table = Table(analysis_data, colWidths=[1.2*inch, 1.5*inch, 1.3*inch, 2*inch])
+    analysis_table.setStyle(styles.analysis_table)
+
+    yield analysis_table
+    yield Spacer(1, 16)
+
+    # 个性化改进建议
+    yield Paragraph("个性化改进建议：", heading_style)
+
+    # 根据实际数据生成针对性建议
+    suggestions = []
+
+    # 基于学习坚持性的建议
+    if completion_rate >= 90:
+        suggestions.append("1. 学习坚持性表现优异，建议挑战更高难度的学习内容。")
+    elif completion_rate >= 70:
+        suggestions.append("1. 学习坚持性良好，建议设定每周学习目标来进一步提升。")
+    else:
+        suggestions.append("1. 学习坚持性需要改进，建议使用番茄工作法，每次学习25分钟。")
+
+    # 基于学习时长的建议
+    if target_vs_actual >= 100:
+        suggestions.append("2. 学习时长已达标，可以考虑增加学习深度和复习频率。")
+    elif target_vs_actual >= 80:
+        suggestions.append("2. 学习时长接近目标，建议每天增加10-15分钟的复习时间。")
+    else:
+        suggestions.append("2. 学习时长不足，建议将大块学习时间分解为多个小时段。")
+
+    # 基于学习规律的建议
+    if has_records:
+        weekend_study = stats['weekend_days']
+        weekday_study = stats['weekday_days']
+
+        if weekend_study > 0 and weekday_study > 0:
+            suggestions.append("3. 工作日和周末都有学习记录，学习安排较为均衡。")
+        elif weekday_study > weekend_study:
+            suggestions.append("3. 工作日学习较多，建议周末也保持一定的学习强度。")
+        else:
+            suggestions.append("3. 建议在工作日也安排固定的学习时间，保持学习连续性。")
+
+    # 通用专业建议
+    suggestions.extend([
+        "4. 建议使用费曼学习法：学完后尝试向他人解释所学内容。",
+        "5. 定期进行学习回顾，每周总结学习成果和遇到的问题。",
+        "6. 建立学习社群，与同样在学习的伙伴互相监督和鼓励。"
+    ])
+
+    for suggestion in suggestions:
+        yield Paragraph(suggestion, normal_style)
+        yield Spacer(1, 8)
+
+    yield Spacer(1, 24)
+
+    # 报告总结
+    yield Paragraph("七、报告总结", heading_style)
+
+    # 生成总结性评价
+    if has_records:
+        total_planned_time = plan.days_passed * plan.daily_minutes
+        efficiency_score = min((total_study_time / max(total_planned_time, 1)) * 100, 100)
+        consistency_score = completion_rate
+        overall_score = (efficiency_score + consistency_score) / 2
+
+        if overall_score >= 85:
+            grade = "A (优秀)"
+            summary_text = "您的学习表现非常出色，已经建立了良好的学习习惯。"
+        elif overall_score >= 70:
+            grade = "B (良好)"
+            summary_text = "您的学习表现良好，继续保持并适当提升学习强度。"
+        elif overall_score >= 60:
+            grade = "C (一般)"
+            summary_text = "您的学习表现一般，需要在坚持性和效率方面有所改进。"
+        else:
+            grade = "D (待改进)"
+            summary_text = "您的学习表现有待提升，建议重新规划学习计划。"
+    else:
+        efficiency_score = consistency_score = overall_score = 0
+        grade = "N/A (无数据)"
+        summary_text = "暂无足够数据进行评估，建议开始记录学习情况。"
+
+    summary_content = f"""
+    <b>综合评估等级：</b>{grade}<br/>
+    <b>学习效率得分：</b>{efficiency_score:.1f}分 (满分100分)<br/>
+    <b>学习坚持得分：</b>{consistency_score:.1f}分 (满分100分)<br/>
+    <b>综合表现得分：</b>{overall_score:.1f}分 (满分100分)<br/><br/>
+    <b>总结评价：</b>{summary_text}
+    """
+
+    yield Paragraph(summary_content, normal_style)
+    yield Spacer(1, 20)
+
+    # 专业报告页脚
+    footer_style = styles.footer
+    yield Paragraph("═" * 60, styles.divider)
+    yield Spacer(1, 8)
+    yield Paragraph("B站学习工具 - 个人学习分析系统", footer_style)
+    yield Paragraph(f"报告编号：RPT-{plan.id}-{current_time.strftime('%Y%m%d%H%M')}", footer_style)
+    yield Paragraph(f"生成时间：{current_time.strftime('%Y年%m月%d日 %H:%M:%S')}", footer_style)
+    yield Paragraph("本报告基于真实学习数据生成，仅供个人学习参考", footer_style)
+    yield Spacer(1, 8)
+    yield Paragraph("持续学习，成就更好的自己！", footer_style)
+
+    if include_all_records and has_records:
+        yield PageBreak()
+        yield Paragraph(f"附录：全部学习记录（共{stats['count']}条）", heading_style)
+        yield from _all_records_flowables(plan, styles)
@@ -0,0 +1,202 @@
+"""
+学习报告PDF后台生成
+导出请求只登记一个 PlanReportJob 并立即返回，PDF由进程内的后台线程池（或 run_report_jobs 管理命令）生成，
+前端轮询任务状态后下载。报告按内容寻址：计划、进度、学习记录和报告版本的哈希（数据指纹）即文件名
+MEDIA_ROOT/reports/<指纹>.pdf，数据没有变化时重复导出直接复用已有的文件，下载时以指纹作为ETag。
+新增、修改或删除学习记录时（见 signals.py）该计划已生成的报告立即失效，任务记录删除后报告文件随之删除。
+PDF先写入临时文件再复制到存储中，附带全部学习记录的长报告也不会在内存中保留整份文件
+"""
+
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from .models import DailyStudyRecord, PlanReportJob
+
+# plan_report.py 的报告内容或版式变化时加1，使已生成的报告全部失效
+REPORT_VERSION = 2
+REPORT_DIR = 'reports'
+
+DEFAULT_WORKERS = 2
+# 生成中的任务超过该时长（秒）视为已中断（例如进程重启），可以重新排队
+DEFAULT_TIMEOUT = 10 * 60
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_timeout():
+    return timedelta(seconds=getattr(settings, 'PLAN_REPORT_TIMEOUT', DEFAULT_TIMEOUT))
+
+
+def compute_fingerprint(plan, include_all_records=False):
+    """报告内容依赖的数据的指纹：计划、课程进度、学习记录、报告范围，以及日期（报告中的已过天数按天变化）"""
+    records = DailyStudyRecord.objects.filter(study_plan=plan).aggregate(
+        count=Count('id'), minutes=Sum('study_minutes'), updated=Max('updated_at')
+    )
+    course = plan.user_course
+    parts = [
+        REPORT_VERSION, plan.id, plan.total_days, plan.daily_minutes, plan.is_active, plan.start_date, plan.updated_at,
+        course.custom_title, course.video.title, course.video.author, course.completed_count, course.total_count,
+        records['count'], records['minutes'], records['updated'],
+        # 与 StudyPlan.days_passed 和报告中的生成日期使用同一个日期来源（服务器本地日期）
+        include_all_records, date.today(),
+    ]
+    return hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def make_report_path(fingerprint):
+    return f"{REPORT_DIR}/{fingerprint}.pdf"
+
+
+def find_reusable_job(plan, fingerprint):
+    """同一数据指纹下已完成、或仍在排队/生成中的任务"""
+    jobs = PlanReportJob.objects.filter(study_plan=plan, fingerprint=fingerprint).exclude(status='failed')
+    for job in jobs:
+        if job.status == 'done' and not (job.file and job.file.storage.exists(job.file.name)):
+            continue
+        if job.status == 'running' and job.started_at and timezone.now() - job.started_at > get_timeout():
+            continue
+        return job
+    return None
+
+
+def request_report(plan, user, include_all_records=False):
+    """请求生成报告（include_all_records：附上全部学习记录），返回 (任务, 是否复用了已有任务)"""
+    plan = type(plan).objects.select_related('user_course__video').get(pk=plan.pk)
+    fingerprint = compute_fingerprint(plan, include_all_records)
+    job = find_reusable_job(plan, fingerprint)
+    if job is not None:
+        if job.status == 'pending':
+            # 进程在任务执行前重启时，线程池中的任务已丢失，重新提交；run_job 按条件领取，重复提交是安全的
+            transaction.on_commit(lambda: schedule(job.id))
+        return job, True
+
+    job = PlanReportJob.objects.create(
+        study_plan=plan, user=user, fingerprint=fingerprint, include_all_records=include_all_records
+    )
+    # 任务提交后再交给后台线程，保证线程能读到这条记录
+    transaction.on_commit(lambda: schedule(job.id))
+    return job, False
+
+
+def run_job(job_id):
+    """生成一个排队中的任务；已被其他线程或进程领取的任务直接返回False"""
+    claimed = PlanReportJob.objects.filter(pk=job_id, status='pending').update(
+        status='running', started_at=timezone.now()
+    )
+    if not claimed:
+        return False
+
+    job = PlanReportJob.objects.select_related('study_plan__user_course__video').get(pk=job_id)
+    plan = job.study_plan
+    try:
+        from .plan_report import build_plan_report, make_report_filename
+
+        path = make_report_path(job.fingerprint)
+        if job.file.storage.exists(path):
+            # 相同数据的报告已经生成过（例如任务记录被清理后再次导出）
+            job.file.name = path
+        else:
+            with tempfile.TemporaryFile() as output:
+                build_plan_report(plan, output, include_all_records=job.include_all_records)
+                output.seek(0)
+                job.file.save(path.rsplit('/', 1)[1], File(output), save=False)
+        job.filename = make_report_filename(plan)
+        job.status = 'done'
+    except Exception as e:
+        print(f"生成学习报告失败 {job_id}: {str(e)}")
+        job.status = 'failed'
+        job.error = str(e)[:500]
+    job.finished_at = timezone.now()
+    job.save()
+
+    if job.status == 'done':
+        _delete_old_reports(job)
+    return True
+
+
+def _delete_old_reports(job):
+    """新报告生成后删除该计划之前生成的同类报告"""
+    old_jobs = PlanReportJob.objects.filter(
+        study_plan_id=job.study_plan_id, include_all_records=job.include_all_records, created_at__lt=job.created_at
+    ).exclude(
+        status__in=['pending', 'running']
+    )
+    # 报告文件由 delete_file 在任务记录删除后清理
+    old_jobs.delete()
+
+
+def invalidate(plan_id):
+    """学习记录变化后调用：在事务提交后删除该计划已生成的报告"""
+    def delete_reports():
+        PlanReportJob.objects.filter(study_plan_id=plan_id).exclude(status__in=['pending', 'running']).delete()
+
+    transaction.on_commit(delete_reports)
+
+
+def delete_file(job):
+    """任务记录删除后调用（见 signals.py，包括删除计划、课程或用户时的级联删除）：
+    在事务提交后删除报告文件；相同数据指纹的文件仍被其他任务使用时保留"""
+    if not job.file:
+        return
+    report_file = job.file
+
+    def delete():
+        if not PlanReportJob.objects.filter(file=report_file.name).exists():
+            report_file.delete(save=False)
+
+    transaction.on_commit(delete)
+
+
+def requeue_stale_jobs():
+    """生成中但已超时的任务重新排队"""
+    return PlanReportJob.objects.filter(status='running', started_at__lt=timezone.now() - get_timeout()).update(
+        status='pending', started_at=None
+    )
+
+
+def run_pending():
+    """生成全部排队中的任务（run_report_jobs 命令使用），返回处理的任务数"""
+    requeue_stale_jobs()
+    processed = 0
+    for job_id in PlanReportJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True):
+        if run_job(job_id):
+            processed += 1
+    return processed
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = getattr(settings, 'PLAN_REPORT_WORKERS', DEFAULT_WORKERS)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='plan-report')
+    return _executor
+
+
+def _run_in_thread(job_id):
+    try:
+        run_job(job_id)
+    except Exception as e:
+        print(f"学习报告任务出错 {job_id}: {str(e)}")
+    finally:
+        # 后台线程使用独立的数据库连接，用完及时关闭
+        close_old_connections()
+
+
+def schedule(job_id):
+    """把任务交给后台线程池；关闭进程内生成时由 run_report_jobs 命令处理"""
+    if not getattr(settings, 'PLAN_REPORT_BACKGROUND', True):
+        return False
+    _get_executor().submit(_run_in_thread, job_id)
+    return True
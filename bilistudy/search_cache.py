@@ -0,0 +1,76 @@
+"""
+B站搜索结果缓存
+按 (关键词, 排序, 页码) 缓存搜索接口返回的数据，热门关键词在TTL内不再重复请求B站。
+底层使用Django缓存框架的 bilibili_search 缓存（本地为LocMem，生产可换成Redis），
+TTL和最大条目数在 settings.CACHES 中配置
+"""
+
+import hashlib
+import threading
+
+from django.core.cache import InvalidCacheBackendError, caches
+
+SEARCH_CACHE_ALIAS = 'bilibili_search'
+KEY_PREFIX = 'bili_search'
+
+_stats = {'hits': 0, 'misses': 0, 'sets': 0}
+_stats_lock = threading.Lock()
+
+
+def _get_cache():
+    """获取搜索结果缓存，未单独配置时退回默认缓存"""
+    try:
+        return caches[SEARCH_CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def _record(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def normalize_keyword(keyword):
+    """规范化关键词：去除首尾空白、合并连续空白、转小写"""
+    return ' '.join((keyword or '').split()).lower()
+
+
+def make_cache_key(keyword, order, page):
+    """生成缓存键（对规范化后的参数取哈希，避免中文和特殊字符影响缓存后端）"""
+    raw = f"{normalize_keyword(keyword)}|{order}|{int(page)}"
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f"{KEY_PREFIX}:{digest}"
+
+
+def get_search_results(keyword, order, page):
+    """读取缓存的搜索结果，未命中返回None"""
+    data = _get_cache().get(make_cache_key(keyword, order, page))
+    _record('hits' if data is not None else 'misses')
+    return data
+
+
+def set_search_results(keyword, order, page, data, timeout=None):
+    """写入搜索结果，timeout为None时使用缓存配置的TTL"""
+    cache = _get_cache()
+    key = make_cache_key(keyword, order, page)
+    if timeout is None:
+        cache.set(key, data)
+    else:
+        cache.set(key, data, timeout)
+    _record('sets')
+
+
+def get_stats():
+    """获取当前进程的缓存命中统计"""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0
+    return stats
+
+
+def reset_stats():
+    """重置命中统计"""
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,34 @@
+"""
+模型信号
+课程和学习计划变化时让用户的学习情况快照失效，学习记录变化时让已生成的学习报告失效，
+报告任务删除（包括级联删除）后清理报告文件
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import learning_context, report_jobs
+from .models import DailyStudyRecord, PlanReportJob, StudyPlan, UserCourse
+
+
+@receiver([post_save, post_delete], sender=UserCourse)
+def invalidate_course_context(sender, instance, **kwargs):
+    learning_context.invalidate(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=StudyPlan)
+def invalidate_plan_context(sender, instance, **kwargs):
+    user_id = instance.user_id
+    if user_id is None:
+        user_id = UserCourse.objects.filter(pk=instance.user_course_id).values_list('user_id', flat=True).first()
+    learning_context.invalidate(user_id)
+
+
+@receiver([post_save, post_delete], sender=DailyStudyRecord)
+def invalidate_plan_reports(sender, instance, **kwargs):
+    report_jobs.invalidate(instance.study_plan_id)
+
+
+@receiver(post_delete, sender=PlanReportJob)
+def delete_report_file(sender, instance, **kwargs):
+    report_jobs.delete_file(instance)
@@ -1,3 +1,814 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import requests
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import connection
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import ai_diagnostics, ai_router, ai_status, ai_stream, chat_memory, content_filter, learning_context, plan_report, report_jobs, video_refresh
+from .models import AIContentVerdict, AIResponseCache, BiliVideo, ChatHistory, ChatSessionMemory, DailyStudyRecord, LearningProgress, PlanReportJob, StudyPlan, UserCourse, VideoEpisode
+from .views import get_system_prompt
+
+
+def set_diagnostics(**failed):
+    """写入一份诊断结果，避免测试中发起真实的网络诊断"""
+    checks = {
+        key: {'name': name, 'ok': key not in failed, 'error': failed.get(key), 'latency_ms': 10}
+        for key, name, _ in ai_diagnostics.TARGETS
+    }
+    cache.set(ai_diagnostics.CACHE_KEY, {'checks': checks, 'checked_at': '2026-01-01T00:00:00'})
+
+
+def create_video(bvid, episode_count, duration=600):
+    """创建带指定分集数的测试视频"""
+    video = BiliVideo.objects.create(
+        bvid=bvid,
+        title=f"测试视频 {bvid}",
+        cover="https://i0.hdslb.com/bfs/archive/test.jpg",
+        author="测试UP主",
+        pub_date="2024-01-01",
+    )
+    VideoEpisode.objects.bulk_create([
+        VideoEpisode(video=video, cid=f"cid{i}", title=f"第{i}集", duration=duration, order=i)
+        for i in range(1, episode_count + 1)
+    ])
+    return video
+
+
+class AddToCourseListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', password='pass12345')
+        self.client.force_login(self.user)
+
+    def _add_course(self, video):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('add_to_course', args=[video.bvid]))
+        return response, len(ctx.captured_queries)
+
+    def test_creates_progress_for_every_episode(self):
+        video = create_video('BV1aa411c7aa', 3, duration=600)
+        response, _ = self._add_course(video)
+
+        data = response.json()
+        self.assertTrue(data['created'])
+        self.assertEqual(data['total_episodes'], 3)
+        self.assertEqual(data['total_duration'], 1800)
+        user_course = UserCourse.objects.get(user=self.user, video=video)
+        self.assertEqual(LearningProgress.objects.filter(user_course=user_course).count(), 3)
+
+    def test_query_count_does_not_grow_with_episodes(self):
+        small_video = create_video('BV1bb411c7bb', 1)
+        large_video = create_video('BV1cc411c7cc', 150)
+
+        _, small_queries = self._add_course(small_video)
+        _, large_queries = self._add_course(large_video)
+
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(LearningProgress.objects.filter(user_course__video=large_video).count(), 150)
+
+
+class CourseListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', password='pass12345')
+        self.client.force_login(self.user)
+
+    def _add_courses(self, start, count):
+        for i in range(start, start + count):
+            video = create_video(f'BV1dd411c{i:03d}', 2)
+            self.client.post(reverse('add_to_course', args=[video.bvid]))
+
+    def _render_course_list(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('course_list'))
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_progress_percentage_uses_counters(self):
+        self._add_courses(0, 1)
+        course = UserCourse.objects.get(user=self.user)
+        progress = course.progress.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('update_progress'), {'progress_id': progress.id, 'is_completed': 'true'})
+
+        response, _ = self._render_course_list()
+        self.assertEqual(response.context['courses'][0].progress_percentage, 50.0)
+
+    def test_query_count_does_not_grow_with_library(self):
+        self._add_courses(0, 1)
+        _, small_queries = self._render_course_list()
+
+        self._add_courses(1, 20)
+        response, large_queries = self._render_course_list()
+
+        self.assertEqual(len(response.context['courses']), 21)
+        self.assertEqual(small_queries, large_queries)
+
+
+class BatchUpdateProgressTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', password='pass12345')
+        self.client.force_login(self.user)
+
+    def _create_course(self, bvid, episode_count):
+        video = create_video(bvid, episode_count)
+        self.client.post(reverse('add_to_course', args=[video.bvid]))
+        user_course = UserCourse.objects.get(user=self.user, video=video)
+        StudyPlan.objects.create(user=self.user, user_course=user_course, total_days=10, daily_minutes=30)
+        return user_course
+
+    def _batch_update(self, user_course, is_completed):
+        progress_ids = list(user_course.progress.values_list('id', flat=True))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('batch_update_progress'), {
+                'progress_ids[]': progress_ids,
+                'is_completed': 'true' if is_completed else 'false',
+            })
+        return response.json(), len(ctx.captured_queries)
+
+    def test_mark_all_complete_and_undo(self):
+        user_course = self._create_course('BV1ee411c7ee', 4)
+
+        data, _ = self._batch_update(user_course, True)
+        self.assertEqual(data, {'status': 'success', 'completion_rate': 100.0, 'completed_count': 4, 'total_count': 4})
+        self.assertFalse(user_course.progress.filter(completed_at__isnull=True).exists())
+        self.assertEqual(DailyStudyRecord.objects.filter(study_plan=user_course.study_plan).count(), 1)
+
+        data, _ = self._batch_update(user_course, False)
+        self.assertEqual(data['completed_count'], 0)
+        self.assertFalse(user_course.progress.filter(completed_at__isnull=False).exists())
+
+    def test_daily_record_counts_each_episode_once(self):
+        user_course = self._create_course('BV1jj411c7jj', 3)
+        plan = user_course.study_plan
+        first, second, _ = user_course.progress.order_by('episode__order').values_list('id', flat=True)
+        self.client.post(reverse('batch_update_progress'), {'progress_ids[]': [first], 'is_completed': 'true'})
+
+        url = reverse('update_daily_record', args=[plan.id])
+        payload = {'study_date': timezone.localdate().isoformat(), 'study_minutes': 30, 'completed_episodes[]': [first, second]}
+        self.assertEqual(self.client.post(url, payload).json()['completed_episodes_count'], 1)
+        self.assertEqual(self.client.post(url, payload).json()['completed_episodes_count'], 0)
+        user_course.refresh_from_db()
+        self.assertEqual(user_course.completed_count, 2)
+
+        record = DailyStudyRecord.objects.get(study_plan=plan, study_date=timezone.localdate())
+        data = self.client.post(reverse('delete_study_record', args=[plan.id]), {
+            'record_id': record.id, 'delete_option': 'with_progress',
+        }).json()
+        self.assertEqual(data['reverted_episodes_count'], 2)
+        user_course.refresh_from_db()
+        self.assertEqual(user_course.completed_count, user_course.progress.filter(is_completed=True).count())
+        self.assertEqual(user_course.completed_count, 0)
+
+    def test_ignores_progress_of_other_users(self):
+        user_course = self._create_course('BV1ff411c7ff', 2)
+        other = User.objects.create_user(username='other', password='pass12345')
+        self.client.force_login(other)
+
+        data, _ = self._batch_update(user_course, True)
+        self.assertEqual(data, {'status': 'success'})
+        self.assertFalse(user_course.progress.filter(is_completed=True).exists())
+
+    def test_missing_progress_returns_404(self):
+        user_course = self._create_course('BV1kk411c7kk', 2)
+        progress_ids = list(user_course.progress.values_list('id', flat=True))
+
+        response = self.client.post(reverse('batch_update_progress'), {
+            'progress_ids[]': progress_ids + [max(progress_ids) + 1000],
+            'is_completed': 'true',
+        })
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(user_course.progress.filter(is_completed=True).exists())
+
+    def test_query_count_does_not_grow_with_episodes(self):
+        small_course = self._create_course('BV1gg411c7gg', 2)
+        large_course = self._create_course('BV1hh411c7hh', 150)
+
+        _, small_queries = self._batch_update(small_course, True)
+        _, large_queries = self._batch_update(large_course, True)
+
+        self.assertEqual(small_queries, large_queries)
+
+
+class AIContentAnalysisCacheTests(TestCase):
+    AI_RESPONSE = "判断结果: 否\n置信度: 0.8\n理由: 游戏娱乐内容"
+
+    def _analyze(self, search_query):
+        return self.client.post(reverse('ai_content_analysis'), {
+            'search_query': search_query,
+            'video_results': '[{"title": "原神 新角色实况"}]',
+        }).json()
+
+    @mock.patch('bilistudy.views.request_deepseek', return_value=AI_RESPONSE)
+    def test_repeat_analysis_uses_stored_verdict(self, mock_api):
+        first = self._analyze('原神')
+        second = self._analyze('  原神 ')
+
+        self.assertEqual(mock_api.call_count, 1)
+        self.assertFalse(first['cached'])
+        self.assertTrue(second['cached'])
+        self.assertIs(second['is_learning_related'], False)
+        self.assertEqual(second['reason'], '游戏娱乐内容')
+        self.assertEqual(AIContentVerdict.objects.get().hit_count, 1)
+
+    @mock.patch('bilistudy.views.request_deepseek', return_value=AI_RESPONSE)
+    def test_admin_override_wins(self, mock_api):
+        self._analyze('原神')
+        AIContentVerdict.objects.update(is_learning_related=True, reason='人工修正', is_override=True, source='admin')
+
+        result = self._analyze('原神')
+        self.assertTrue(result['is_learning_related'])
+        self.assertEqual(result['reason'], '人工修正')
+        self.assertEqual(mock_api.call_count, 1)
+
+    def test_repeated_admin_override_updates_existing_verdict(self):
+        admin_user = User.objects.create_superuser(username='admin', password='pass12345')
+        self.client.force_login(admin_user)
+        url = reverse('admin:bilistudy_aicontentverdict_add')
+
+        for reason in ('人工修正', '再次修正'):
+            response = self.client.post(url, {
+                'search_query': ' 原神 ', 'is_learning_related': 'false', 'confidence': '0.9', 'reason': reason, 'prompt': '',
+            })
+            self.assertEqual(response.status_code, 302)
+
+        verdict = AIContentVerdict.objects.get()
+        self.assertEqual(verdict.reason, '再次修正')
+        self.assertTrue(verdict.is_override)
+
+    @mock.patch.dict('os.environ', {'DEEPSEEK_API_KEY': 'test-key', 'GEMINI_API_KEY': 'test-key'})
+    def test_deepseek_timeout_fails_over_to_gemini(self):
+        for breaker in ai_router.breakers.values():
+            breaker.reset()
+            self.addCleanup(breaker.reset)
+        genai = mock.MagicMock()
+        genai.GenerativeModel.return_value.generate_content.return_value.text = self.AI_RESPONSE
+        google = mock.MagicMock(generativeai=genai)
+
+        with mock.patch('requests.post', side_effect=requests.exceptions.ReadTimeout('read timed out')), \
+                mock.patch.dict('sys.modules', {'google': google, 'google.generativeai': genai}):
+            result = self._analyze('原神')
+
+        self.assertTrue(result['success'])
+        self.assertIs(result['is_learning_related'], False)
+        self.assertEqual(result['reason'], '游戏娱乐内容')
+        self.assertEqual(ai_router.breakers['deepseek'].snapshot()['failures'], 1)
+        self.assertEqual(ai_router.breakers['gemini'].snapshot()['successes'], 1)
+
+
+class JiebaWarmupTests(TestCase):
+    @override_settings(JIEBA_WARMUP_MODE='background')
+    def test_app_loading_does_not_warm_up(self):
+        with mock.patch('bilistudy.content_filter.start_jieba_warmup') as start:
+            apps.get_app_config('bilistudy').ready()
+        start.assert_not_called()
+
+    @override_settings(JIEBA_WARMUP_MODE='sync')
+    def test_server_entry_point_warms_up(self):
+        with mock.patch('bilistudy.content_filter.start_jieba_warmup') as start:
+            content_filter.warmup_on_startup()
+        start.assert_called_once_with(background=False)
+
+
+@override_settings(AI_DIAGNOSTICS_INTERVAL=0)
+class AIChatStreamTests(TestCase):
+    def setUp(self):
+        set_diagnostics(deepseek='连接超时')
+        self.addCleanup(cache.delete, ai_diagnostics.CACHE_KEY)
+        for breaker in ai_router.breakers.values():
+            breaker.reset()
+            self.addCleanup(breaker.reset)
+
+    def _mock_provider(self, status_code, lines):
+        """让AI接口返回给定的SSE内容，返回记录请求的列表"""
+        requests_seen = []
+
+        def handler(request):
+            requests_seen.append(request)
+            return httpx.Response(status_code, text='\n'.join(lines))
+
+        def new_client():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            self.http_clients.append(client)
+            return client
+
+        self.http_clients = []
+        patcher = mock.patch('bilistudy.ai_stream._new_client', side_effect=new_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return requests_seen
+
+    async def _read_stream(self, data):
+        response = await self.async_client.post(reverse('ai_chat_stream'), data)
+        self.assertEqual(response['Content-Type'], 'text/event-stream; charset=utf-8')
+        return b''.join([chunk async for chunk in response.streaming_content]).decode('utf-8')
+
+    @mock.patch.dict('os.environ', {'DEEPSEEK_API_KEY': 'test-key'})
+    async def test_relays_tokens_and_saves_history(self):
+        requests_seen = self._mock_provider(200, [
+            'data: {"choices": [{"delta": {"content": "你好"}}]}',
+            '',
+            'data: {"choices": [{"delta": {"content": "，同学"}}]}',
+            'data: [DONE]',
+        ])
+
+        body = await self._read_stream({'message': '你好', 'ai_model': 'deepseek'})
+
+        self.assertIn('event: token\ndata: {"text": "你好"}', body)
+        self.assertTrue(body.endswith('event: done\ndata: {"type": "general", "cached": false}\n\n'))
+        self.assertTrue(json.loads(requests_seen[0].content)['stream'])
+        chat = await ChatHistory.objects.aget()
+        self.assertEqual(chat.ai_response, '你好，同学')
+
+    @mock.patch.dict('os.environ', {'DEEPSEEK_API_KEY': 'test-key'})
+    def test_wsgi_request_closes_its_own_client(self):
+        self._mock_provider(200, ['data: {"choices": [{"delta": {"content": "你好"}}]}', 'data: [DONE]'])
+
+        response = self.client.post(reverse('ai_chat_stream'), {'message': '你好', 'ai_model': 'deepseek'})
+        # 与WSGI服务器相同，同步迭代响应（Django在一个临时事件循环中读完异步迭代器）
+        body = b''.join(response).decode('utf-8')
+
+        self.assertIn('event: done', body)
+        self.assertEqual(len(self.http_clients), 1)
+        self.assertTrue(self.http_clients[0].is_closed)
+
+    @mock.patch.dict('os.environ', {'DEEPSEEK_API_KEY': 'test-key'})
+    async def test_reports_provider_error(self):
+        self._mock_provider(401, [])
+
+        body = await self._read_stream({'message': '你好', 'ai_model': 'deepseek'})
+
+        self.assertIn('event: error', body)
+        self.assertIn('API密钥无效', body)
+        self.assertIn('网络诊断：DeepSeek服务器连接超时', body)
+        self.assertFalse(await ChatHistory.objects.aexists())
+
+    @mock.patch.dict('os.environ', {'GEMINI_API_KEY': 'test-key'})
+    def test_non_streaming_chat_collects_reply(self):
+        self._mock_provider(200, [
+            'data: {"candidates": [{"content": {"parts": [{"text": "先定"}]}}]}',
+            'data: {"candidates": [{"content": {"parts": [{"text": "目标"}]}}]}',
+        ])
+
+        data = self.client.post(reverse('ai_chat'), {'message': '怎么学习', 'ai_model': 'gemini'}).json()
+
+        self.assertTrue(data['success'])
+        self.assertEqual(data['response'], '先定目标')
+        self.assertEqual(ChatHistory.objects.get().ai_response, '先定目标')
+
+
+@override_settings(AI_DIAGNOSTICS_INTERVAL=0)
+class AIDiagnosticsCommandTests(TestCase):
+    CHECKS = {key: {'name': name, 'ok': True, 'latency_ms': 10} for key, name, _ in ai_diagnostics.TARGETS}
+
+    def setUp(self):
+        self.addCleanup(cache.delete, ai_diagnostics.CACHE_KEY)
+
+    def test_warns_when_snapshot_is_process_local(self):
+        output = io.StringIO()
+        with mock.patch('bilistudy.ai_diagnostics.check_all', mock.AsyncMock(return_value=self.CHECKS)):
+            call_command('ai_diagnostics', stdout=output)
+
+        self.assertIn('不会更新Web服务的诊断结果', output.getvalue())
+        self.assertEqual(ai_diagnostics.get_cache().get(ai_diagnostics.CACHE_KEY)['checks'], self.CHECKS)
+
+
+@override_settings(AI_STATUS_REFRESH_INTERVAL=0, AI_DIAGNOSTICS_INTERVAL=0)
+class CheckAIStatusTests(TestCase):
+    def setUp(self):
+        set_diagnostics()
+        self.addCleanup(cache.delete, ai_diagnostics.CACHE_KEY)
+        cache.delete(ai_status.CACHE_KEY)
+        self.addCleanup(cache.delete, ai_status.CACHE_KEY)
+
+    def test_probes_once_then_serves_cache(self):
+        probes = []
+
+        async def fake_probe(client):
+            probes.append(client)
+            return {'status': 'normal', 'status_code': 200, 'message': 'API服务正常'}
+
+        with mock.patch('bilistudy.ai_status.probe_gemini', fake_probe), \
+                mock.patch('bilistudy.ai_status.probe_deepseek', fake_probe):
+            first = self.client.get(reverse('check_ai_status')).json()
+            second = self.client.get(reverse('check_ai_status')).json()
+
+        self.assertEqual(len(probes), 2)
+        self.assertFalse(first['cached'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['apis']['deepseek']['status'], 'normal')
+
+    def test_concurrent_refreshes_share_one_probe(self):
+        with mock.patch('bilistudy.ai_status._probe_and_store', side_effect=lambda: time.sleep(0.2) or {}) as probe:
+            futures = [ai_status.refresh_status() for _ in range(5)]
+            for future in futures:
+                future.result()
+
+        self.assertEqual(probe.call_count, 1)
+
+
+@override_settings(AI_BREAKER_MIN_REQUESTS=2, AI_BREAKER_FAILURE_RATE=0.5, AI_BREAKER_OPEN_SECONDS=30, AI_HEDGE_DELAY=0)
+class AIRouterTests(TestCase):
+    def setUp(self):
+        for breaker in ai_router.breakers.values():
+            breaker.reset()
+            self.addCleanup(breaker.reset)
+
+    def test_open_breaker_fails_over_without_calling_provider(self):
+        gemini_calls = []
+
+        def gemini():
+            gemini_calls.append(1)
+            raise ai_stream.AIStreamError('HTTP 503')
+
+        for _ in range(2):
+            self.assertEqual(ai_router.call_with_failover([('gemini', gemini), ('deepseek', lambda: 'ok')]), ('deepseek', 'ok'))
+
+        self.assertEqual(ai_router.breakers['gemini'].snapshot()['state'], ai_router.OPEN)
+        self.assertEqual(ai_router.call_with_failover([('gemini', gemini), ('deepseek', lambda: 'ok')]), ('deepseek', 'ok'))
+        self.assertEqual(len(gemini_calls), 2)
+
+    def test_half_open_trial_closes_breaker(self):
+        breaker = ai_router.breakers['gemini']
+        for _ in range(2):
+            breaker.record_failure()
+        self.assertFalse(breaker.allow_request())
+
+        with override_settings(AI_BREAKER_OPEN_SECONDS=0):
+            self.assertTrue(breaker.allow_request())
+            self.assertFalse(breaker.allow_request())  # 半开状态只放行一次试探
+            breaker.record_success()
+        self.assertEqual(breaker.snapshot()['state'], ai_router.CLOSED)
+
+    @override_settings(AI_HEDGE_DELAY=0.05)
+    def test_hedged_stream_uses_faster_provider(self):
+        async def slow():
+            await asyncio.sleep(1)
+            yield '慢'
+
+        async def fast():
+            yield '快'
+            yield '答'
+
+        async def run():
+            return await ai_stream.collect(ai_router.route_stream([('gemini', slow), ('deepseek', fast)]))
+
+        self.assertEqual(asyncio.run(run()), '快答')
+        self.assertEqual(ai_router.breakers['gemini'].snapshot()['failures'], 0)
+
+    def test_stream_cut_off_midway_counts_as_single_failure(self):
+        async def cut_off():
+            yield '部分'
+            raise ai_stream.AIStreamError('连接中断')
+
+        async def run():
+            return await ai_stream.collect(ai_router.route_stream([('gemini', cut_off)]))
+
+        for _ in range(2):
+            with self.assertRaises(ai_stream.AIStreamError):
+                asyncio.run(run())
+
+        snapshot = ai_router.breakers['gemini'].snapshot()
+        self.assertEqual((snapshot['successes'], snapshot['failures']), (0, 2))
+        self.assertEqual(snapshot['state'], ai_router.OPEN)
+
+
+class LearningContextTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', password='pass12345')
+        self.client.force_login(self.user)
+        video = create_video('BV1lc411c7lc', 4)
+        self.client.post(reverse('add_to_course', args=[video.bvid]))
+        self.course = UserCourse.objects.get(user=self.user, video=video)
+        self.addCleanup(cache.delete, learning_context.make_cache_key(self.user.id))
+        self.request = mock.Mock(user=self.user)
+
+    def test_prompt_uses_cached_snapshot(self):
+        get_system_prompt('progress_analysis', '', self.request)
+        with self.assertNumQueries(0):
+            prompt = get_system_prompt('study_plan', str(self.course.id), self.request)
+            get_system_prompt('progress_analysis', '', self.request)
+        self.assertIn('总分集数：4', prompt)
+
+    def test_progress_change_invalidates_snapshot(self):
+        get_system_prompt('progress_analysis', '', self.request)
+        progress = self.course.progress.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('update_progress'), {'progress_id': progress.id, 'is_completed': 'true'})
+
+        prompt = get_system_prompt('progress_analysis', '', self.request)
+        self.assertIn('已完成项目：1', prompt)
+
+    def test_general_prompt_skips_snapshot(self):
+        cache.delete(learning_context.make_cache_key(self.user.id))
+        with self.assertNumQueries(0):
+            get_system_prompt('general', '', self.request)
+
+    def test_video_refresh_invalidates_snapshot(self):
+        get_system_prompt('progress_analysis', '', self.request)
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {'code': 0, 'data': {
+            'title': '测试视频 BV1lc411c7lc', 'pic': 'https://i0.hdslb.com/bfs/archive/new.jpg', 'owner': {'name': '新UP主'},
+            'stat': {'view': 10, 'like': 1}, 'desc': '',
+        }}
+        with mock.patch('bilistudy.bilibili_client.get_video_view', return_value=response), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(video_refresh.refresh_video(self.course.video.bvid))
+
+        prompt = get_system_prompt('study_plan', str(self.course.id), self.request)
+        self.assertIn('UP主：新UP主', prompt)
+
+
+@override_settings(CHAT_MEMORY_TOKEN_BUDGET=400, CHAT_MEMORY_SUMMARY_MAX_TOKENS=400)
+class ChatMemoryTests(TestCase):
+    session_id = 'session-memory'
+
+    async def add_turns(self, start, count):
+        await ChatHistory.objects.abulk_create([
+            ChatHistory(
+                session_id=self.session_id,
+                user_message=f"第{i}个问题：如何学习线性代数",
+                ai_response=f"第{i}个回答：" + '建议先看视频再做练习。' * 10,
+            )
+            for i in range(start, start + count)
+        ])
+
+    async def test_long_session_history_stays_bounded(self):
+        await self.add_turns(1, 40)
+        await chat_memory.update_memory(self.session_id)
+
+        history = await chat_memory.build_history(self.session_id)
+
+        self.assertLessEqual(chat_memory.estimate_tokens(history), 400 + 400 + 50)
+        self.assertIn('较早的对话摘要', history)
+        self.assertIn('第40个回答：', history)
+        memory = await ChatSessionMemory.objects.aget(session_id=self.session_id)
+        self.assertIn('第37个问题', memory.summary)
+        self.assertNotIn('第1个问题', memory.summary)
+
+    async def test_summary_is_updated_incrementally(self):
+        await self.add_turns(1, 10)
+        await chat_memory.update_memory(self.session_id)
+        memory = await ChatSessionMemory.objects.aget(session_id=self.session_id)
+        first_until = memory.summarized_until
+
+        await self.add_turns(11, 5)
+        await chat_memory.update_memory(self.session_id)
+
+        await memory.arefresh_from_db()
+        self.assertGreater(memory.summarized_until, first_until)
+        self.assertEqual(memory.summary.count('第12个问题'), 1)
+        history = await chat_memory.build_history(self.session_id)
+        recent = history.split('最近的对话历史')[1]
+        self.assertIn('第15个回答：', recent)
+        self.assertNotIn('第12个问题', recent)
+
+    def test_delete_account_removes_session_memory(self):
+        user = User.objects.create_user(username='tester', password='pass12345')
+        self.client.force_login(user)
+        session = self.client.session
+        session['chat_session_id'] = self.session_id
+        session.save()
+        ChatHistory.objects.create(session_id=self.session_id, user_message='问题', ai_response='回答')
+        ChatSessionMemory.objects.create(session_id=self.session_id, summary='用户：如何学习线性代数', summarized_until=1)
+
+        response = self.client.post(reverse('delete_account'), {'password': 'pass12345'})
+
+        self.assertTrue(response.json()['success'])
+        self.assertFalse(ChatHistory.objects.filter(session_id=self.session_id).exists())
+        self.assertFalse(ChatSessionMemory.objects.filter(session_id=self.session_id).exists())
+
+
+@override_settings(AI_RESPONSE_CACHE_ENABLED=True, AI_RESPONSE_CACHE_SIMILARITY=0.8, AI_DIAGNOSTICS_INTERVAL=0)
+class AIResponseCacheTests(TestCase):
+    def setUp(self):
+        for breaker in ai_router.breakers.values():
+            breaker.reset()
+            self.addCleanup(breaker.reset)
+        self.calls = []
+
+        def handler(request):
+            self.calls.append(request)
+            return httpx.Response(200, text='data: {"candidates": [{"content": {"parts": [{"text": "先学语法"}]}}]}')
+
+        patcher = mock.patch(
+            'bilistudy.ai_stream._new_client',
+            side_effect=lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ask(self, message, client=None, chat_type='general', ai_model='gemini'):
+        client = client or self.client_class()
+        response = client.post(reverse('ai_chat'), {'message': message, 'type': chat_type, 'ai_model': ai_model})
+        return response.json()
+
+    @mock.patch.dict('os.environ', {'GEMINI_API_KEY': 'test-key'})
+    def test_similar_question_is_served_from_cache(self):
+        first = self.ask('零基础怎么学习Python？')
+        second = self.ask('零基础怎么学习python')
+        third = self.ask('零基础怎么学习Python啊')
+
+        self.assertFalse(first['cached'])
+        self.assertTrue(second['cached'])
+        self.assertTrue(third['cached'])
+        self.assertEqual(third['response'], '先学语法')
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(AIResponseCache.objects.get().hit_count, 2)
+
+    @mock.patch.dict('os.environ', {'GEMINI_API_KEY': 'test-key'})
+    def test_personal_and_expired_questions_are_not_shared(self):
+        self.ask('帮我制定学习计划', chat_type='study_plan')
+        self.assertFalse(AIResponseCache.objects.exists())
+
+        client = self.client_class()
+        self.ask('零基础怎么学习Python', client=client)
+        # 同一会话的后续问题带有对话历史
+        self.assertFalse(self.ask('零基础怎么学习Python', client=client)['cached'])
+
+        AIResponseCache.objects.update(expires_at=timezone.now())
+        self.assertFalse(self.ask('零基础怎么学习Python')['cached'])
+        self.assertEqual(len(self.calls), 4)
+
+    @mock.patch.dict('os.environ', {'GEMINI_API_KEY': 'test-key', 'DEEPSEEK_API_KEY': ''})
+    def test_failover_reply_is_cached_under_answering_model(self):
+        # DeepSeek未配置密钥，由Gemini回复
+        self.assertEqual(self.ask('零基础怎么学习Python', ai_model='deepseek')['response'], '先学语法')
+        self.assertEqual(AIResponseCache.objects.get().ai_model, 'gemini')
+
+        self.assertFalse(self.ask('零基础怎么学习Python', ai_model='deepseek')['cached'])
+        self.assertTrue(self.ask('零基础怎么学习Python', ai_model='gemini')['cached'])
+
+
+class PlanReportJobTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, PLAN_REPORT_BACKGROUND=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='tester', password='pass12345')
+        self.client.force_login(self.user)
+        video = create_video('BV1rp411c7rp', 6)
+        self.client.post(reverse('add_to_course', args=[video.bvid]))
+        course = UserCourse.objects.get(user=self.user, video=video)
+        self.plan = StudyPlan.objects.create(user=self.user, user_course=course, total_days=10, daily_minutes=30)
+        self.add_record(date.today(), 40)
+
+    def add_record(self, study_date, minutes):
+        DailyStudyRecord.objects.create(study_plan=self.plan, study_date=study_date, study_minutes=minutes)
+
+    def export(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('export_plan_pdf', args=[self.plan.id])).json()
+
+    def test_report_is_generated_in_background_and_reused(self):
+        data = self.export()
+        self.assertEqual(data['status'], 'pending')
+        self.assertFalse(data['reused'])
+
+        self.assertEqual(report_jobs.run_pending(), 1)
+        status = self.client.get(data['status_url']).json()
+        self.assertEqual(status['status'], 'done')
+
+        response = self.client.get(status['download_url'])
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn("filename*=UTF-8''", response['Content-Disposition'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+        again = self.export()
+        self.assertTrue(again['reused'])
+        self.assertEqual(again['job_id'], data['job_id'])
+        self.assertEqual(PlanReportJob.objects.count(), 1)
+
+    def test_reused_pending_job_is_rescheduled(self):
+        data = self.export()
+        # 模拟任务提交到线程池后进程重启：任务记录仍为排队中
+        with override_settings(PLAN_REPORT_BACKGROUND=True), \
+                mock.patch.object(report_jobs, '_get_executor') as get_executor:
+            get_executor.return_value.submit.side_effect = lambda fn, job_id: fn(job_id)
+            again = self.export()
+
+        self.assertTrue(again['reused'])
+        self.assertEqual(again['job_id'], data['job_id'])
+        self.assertEqual(PlanReportJob.objects.get(id=data['job_id']).status, 'done')
+
+    def test_fingerprint_follows_the_report_date(self):
+        fingerprint = report_jobs.compute_fingerprint(self.plan)
+        tomorrow = date.today() + timedelta(days=1)
+        with mock.patch.object(report_jobs, 'date', wraps=date) as fake_date:
+            fake_date.today.return_value = tomorrow
+            self.assertNotEqual(report_jobs.compute_fingerprint(self.plan), fingerprint)
+
+    def test_deleting_plan_removes_report_file(self):
+        self.export()
+        report_jobs.run_pending()
+        job = PlanReportJob.objects.get()
+        storage, name = job.file.storage, job.file.name
+        self.assertTrue(storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plan.delete()
+
+        self.assertFalse(PlanReportJob.objects.exists())
+        self.assertFalse(storage.exists(name))
+
+    def test_changed_plan_gets_new_report(self):
+        first = self.export()
+        report_jobs.run_pending()
+        old_file = PlanReportJob.objects.get(id=first['job_id']).file.path
+
+        self.add_record(date.today() - timedelta(days=1), 20)
+        second = self.export()
+        self.assertFalse(second['reused'])
+        # 旧报告文件在任务记录删除的事务提交后删除（后台线程中为自动提交，立即执行）
+        with self.captureOnCommitCallbacks(execute=True):
+            report_jobs.run_pending()
+
+        self.assertEqual(list(PlanReportJob.objects.values_list('id', flat=True)), [second['job_id']])
+        self.assertFalse(os.path.exists(old_file))
+
+    def test_download_is_content_addressed_with_etag(self):
+        data = self.export()
+        report_jobs.run_pending()
+        job = PlanReportJob.objects.get(id=data['job_id'])
+        self.assertEqual(job.file.name, f"reports/{job.fingerprint}.pdf")
+
+        url = reverse('download_plan_report', args=[job.id])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(etag, f'"{job.fingerprint}"')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_new_record_invalidates_report(self):
+        data = self.export()
+        report_jobs.run_pending()
+        path = PlanReportJob.objects.get(id=data['job_id']).file.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_record(date.today() - timedelta(days=2), 15)
+
+        self.assertFalse(PlanReportJob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_full_report_pages_all_records(self):
+        DailyStudyRecord.objects.bulk_create([
+            DailyStudyRecord(study_plan=self.plan, study_date=date.today() - timedelta(days=day), study_minutes=day % 50)
+            for day in range(1, 120)
+        ])
+        summary = self.export()
+        with self.captureOnCommitCallbacks(execute=True):
+            full = self.client.post(reverse('export_plan_pdf', args=[self.plan.id]), {'mode': 'full'}).json()
+        self.assertNotEqual(summary['job_id'], full['job_id'])
+
+        self.assertEqual(report_jobs.run_pending(), 2)
+        jobs = {job.include_all_records: job for job in PlanReportJob.objects.all()}
+        self.assertEqual(set(jobs), {False, True})
+        self.assertTrue(all(job.status == 'done' for job in jobs.values()))
+        self.assertGreater(jobs[True].file.size, jobs[False].file.size)
+
+        with self.assertNumQueries(2):
+            stats = plan_report.summarize_records(self.plan)
+            list(plan_report._all_records_flowables(self.plan, plan_report.get_styles()))
+        self.assertEqual(stats['count'], 120)
+
+    def test_font_and_styles_are_set_up_once(self):
+        plan_report.warmup()
+        with mock.patch.object(plan_report, '_register_font') as register_font:
+            self.assertTrue(plan_report.build_plan_report(self.plan).startswith(b'%PDF'))
+            self.assertTrue(plan_report.build_plan_report(self.plan).startswith(b'%PDF'))
+        register_font.assert_not_called()
+        self.assertIs(plan_report.get_styles(), plan_report.get_styles())
+
+    def test_finds_cjk_font_in_configured_dirs(self):
+        font_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, font_dir, ignore_errors=True)
+        os.makedirs(os.path.join(font_dir, 'truetype', 'wqy'))
+        font_file = os.path.join(font_dir, 'truetype', 'wqy', 'wqy-microhei.ttc')
+        open(font_file, 'wb').close()
+
+        with override_settings(PLAN_REPORT_FONT_FILE=None, PLAN_REPORT_FONT_DIRS=[font_dir]):
+            self.assertEqual(plan_report.find_font_file(), font_file)
+
+    def test_other_users_cannot_download(self):
+        data = self.export()
+        report_jobs.run_pending()
+
+        other = User.objects.create_user(username='other', password='pass12345')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('download_plan_report', args=[data['job_id']])).status_code, 404)
@@ -19,6 +19,7 @@ urlpatterns = [
     # AI助手相关路由
     path('ai-assistant/', views.ai_assistant, name='ai_assistant'),
     path('ai-chat/', views.ai_chat, name='ai_chat'),
+    path('ai-chat/stream/', views.ai_chat_stream, name='ai_chat_stream'),
     path('get-chat-history/', views.get_chat_history, name='get_chat_history'),
     path('check-ai-status/', views.check_ai_status, name='check_ai_status'),
     path('update-learning-reminder/', views.update_learning_reminder_preference, name='update_learning_reminder'),
@@ -35,6 +36,8 @@ urlpatterns = [
     path('plan/<int:plan_id>/delete-record/', views.delete_study_record, name='delete_study_record'),
     path('plan/<int:plan_id>/delete/', views.delete_study_plan, name='delete_study_plan'),
     path('plan/<int:plan_id>/export-pdf/', views.export_plan_pdf, name='export_plan_pdf'),
+    path('plan/report/<int:job_id>/', views.plan_report_status, name='plan_report_status'),
+    path('plan/report/<int:job_id>/download/', views.download_plan_report, name='download_plan_report'),
 
     # 用户认证相关路由
     path('auth/send-code/', views.send_verification_code, name='send_verification_code'),
@@ -0,0 +1,79 @@
+"""
+视频导入
+在一个事务内创建BiliVideo并用一次bulk_create写入全部分集，
+API导入和网页爬虫（__INITIAL_STATE__）兜底导入共用这里的逻辑
+"""
+
+from datetime import datetime
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import BiliVideo, VideoEpisode
+
+
+def episodes_from_view_data(video_data):
+    """从B站view接口数据中提取分集列表"""
+    if video_data.get('videos', 0) > 1:
+        return [
+            {
+                'cid': page_info['cid'],
+                'title': page_info['part'],
+                'duration': page_info['duration'],
+                'order': i + 1,
+            }
+            for i, page_info in enumerate(video_data.get('pages', []))
+        ]
+
+    # 单P视频，创建一个默认分集
+    return [{
+        'cid': video_data.get('cid', 'cid1'),
+        'title': "完整视频",
+        'duration': video_data.get('duration', 600),
+        'order': 1,
+    }]
+
+
+def ingest_video(bvid, video_fields, episodes):
+    """创建视频及其全部分集（一次INSERT视频 + 一次bulk_create分集）
+
+    video_fields: BiliVideo除bvid外的字段
+    episodes: [{'cid', 'title', 'duration', 'order'}, ...]
+    如果并发请求已经导入了同一个视频，直接返回已有记录
+    """
+    try:
+        with transaction.atomic():
+            video = BiliVideo.objects.create(bvid=bvid, **video_fields)
+            VideoEpisode.objects.bulk_create([
+                VideoEpisode(
+                    video=video,
+                    cid=episode['cid'],
+                    title=episode['title'],
+                    duration=episode['duration'],
+                    order=episode['order'],
+                )
+                for episode in episodes
+            ])
+    except IntegrityError:
+        video = BiliVideo.objects.filter(bvid=bvid).first()
+        if video is None:
+            raise
+    return video
+
+
+def ingest_from_view_data(bvid, video_data):
+    """用B站view接口返回的数据导入视频"""
+    return ingest_video(
+        bvid,
+        {
+            'title': video_data['title'],
+            'cover': video_data['pic'],
+            'author': video_data['owner']['name'],
+            'pub_date': datetime.fromtimestamp(video_data['pubdate']).date(),
+            'play_count': video_data['stat']['view'],
+            'like_count': video_data['stat']['like'],
+            'description': video_data['desc'],
+            'metadata_updated_at': timezone.now(),
+        },
+        episodes_from_view_data(video_data),
+    )
@@ -0,0 +1,114 @@
+"""
+视频元数据刷新（stale-while-revalidate）
+视图始终直接返回数据库中的BiliVideo，元数据过期的视频加入后台刷新队列，
+由Web进程内的后台线程或 refresh_stale_videos 管理命令更新播放量、点赞数等信息
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from . import bilibili_client, learning_context
+from .models import BiliVideo, UserCourse
+
+DEFAULT_STALE_SECONDS = 6 * 60 * 60
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def get_stale_after():
+    """元数据过期时长"""
+    return timedelta(seconds=getattr(settings, 'BILIVIDEO_STALE_SECONDS', DEFAULT_STALE_SECONDS))
+
+
+def is_stale(video):
+    """判断视频元数据是否过期（从未刷新过的视频也视为过期）"""
+    if video.metadata_updated_at is None:
+        return True
+    return timezone.now() - video.metadata_updated_at > get_stale_after()
+
+
+def stale_videos():
+    """所有元数据过期的视频"""
+    threshold = timezone.now() - get_stale_after()
+    return BiliVideo.objects.filter(
+        Q(metadata_updated_at__isnull=True) | Q(metadata_updated_at__lt=threshold)
+    )
+
+
+def refresh_video(bvid):
+    """从B站API拉取最新元数据并更新数据库，成功返回True"""
+    try:
+        response = bilibili_client.get_video_view(bvid)
+        if response.status_code != 200:
+            print(f"刷新视频元数据失败 {bvid}: HTTP {response.status_code}")
+            return False
+
+        data = response.json()
+        if data.get('code') != 0:
+            print(f"刷新视频元数据失败 {bvid}: {data.get('code')} {data.get('message', '')}")
+            return False
+
+        video_data = data['data']
+        old = BiliVideo.objects.filter(bvid=bvid).values('id', 'title', 'author').first()
+        BiliVideo.objects.filter(bvid=bvid).update(
+            title=video_data['title'],
+            cover=video_data['pic'],
+            author=video_data['owner']['name'],
+            play_count=video_data['stat']['view'],
+            like_count=video_data['stat']['like'],
+            description=video_data['desc'],
+            metadata_updated_at=timezone.now(),
+        )
+        # update() 不发送信号；标题或UP主变化时让收藏了该视频的用户的学习情况快照失效
+        if old and (old['title'], old['author']) != (video_data['title'], video_data['owner']['name']):
+            for user_id in UserCourse.objects.filter(video_id=old['id']).values_list('user_id', flat=True).distinct():
+                learning_context.invalidate(user_id)
+        return True
+    except Exception as e:
+        print(f"刷新视频元数据出错 {bvid}: {str(e)}")
+        return False
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='bilivideo-refresh')
+    return _executor
+
+
+def _run_refresh(bvid):
+    try:
+        refresh_video(bvid)
+    finally:
+        with _pending_lock:
+            _pending.discard(bvid)
+        # 后台线程使用独立的数据库连接，用完及时关闭
+        close_old_connections()
+
+
+def schedule_refresh_if_stale(video):
+    """视频元数据过期时加入后台刷新队列，不阻塞当前请求；返回是否已加入队列"""
+    if video is None or not is_stale(video):
+        return False
+    if not getattr(settings, 'BILIVIDEO_BACKGROUND_REFRESH', True):
+        # 关闭进程内刷新时，由 refresh_stale_videos 命令定时处理
+        return False
+
+    with _pending_lock:
+        if video.bvid in _pending:
+            return False
+        _pending.add(video.bvid)
+
+    _get_executor().submit(_run_refresh, video.bvid)
+    return True
@@ -4,7 +4,8 @@ import re
 import os
 from datetime import datetime
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponse
+from django.urls import reverse
+from django.http import FileResponse, Http404, JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 from django.contrib import messages
 from django.utils.html import strip_tags
@@ -16,10 +17,15 @@ from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password
 from django.core.mail import send_mail
 from django.conf import settings
+from asgiref.sync import sync_to_async
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.core.handlers.asgi import ASGIRequest
 from django.db import transaction
-from .models import BiliVideo, VideoEpisode, UserCourse, LearningProgress, StudyPlan, DailyStudyRecord, EmailVerification, UserPreference
+from django.db.models import Count, F, Sum
+from .models import BiliVideo, VideoEpisode, UserCourse, LearningProgress, StudyPlan, DailyStudyRecord, EmailVerification, UserPreference, PlanReportJob
 from .content_filter import analyze_search_content, need_ai_semantic_analysis, get_ai_analysis_prompt
+from . import ai_diagnostics, ai_response_cache, ai_router, ai_status, ai_stream, ai_verdicts, bilibili_client, chat_memory, learning_context, report_jobs, search_cache, video_ingest, video_refresh
 # google.generativeai 将在需要时动态导入
 
 def index(request):
@@ -70,52 +76,17 @@ def search_videos(request):
 
             if not video:
                 # 如果数据库中没有，通过API获取
-                api_url = "https://api.bilibili.com/x/web-interface/view"
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                    'Referer': f'https://www.bilibili.com/video/{extracted_bvid}',
-                }
-                params = {'bvid': extracted_bvid}
-
-                response = requests.get(api_url, params=params, headers=headers, timeout=10)
+                response = bilibili_client.get_video_view(extracted_bvid)
                 if response.status_code == 200:
                     data = response.json()
                     if data['code'] == 0:
-                        video_data = data['data']
-                        pub_date = datetime.fromtimestamp(video_data['pubdate']).date()
-
-                        # 创建视频记录
-                        video = BiliVideo.objects.create(
-                            bvid=extracted_bvid,
-                            title=video_data['title'],
-                            cover=video_data['pic'],
-                            author=video_data['owner']['name'],
-                            pub_date=pub_date,
-                            play_count=video_data['stat']['view'],
-                            like_count=video_data['stat']['like'],
-                            description=video_data['desc']
-                        )
-
-                        # 创建分集信息
-                        if video_data.get('videos', 0) > 1:
-                            for i, page_info in enumerate(video_data.get('pages', [])):
-                                VideoEpisode.objects.create(
-                                    video=video,
-                                    cid=page_info['cid'],
-                                    title=page_info['part'],
-                                    duration=page_info['duration'],
-                                    order=i+1
-                                )
-                        else:
-                            VideoEpisode.objects.create(
-                                video=video,
-                                cid=video_data.get('cid', 'cid1'),
-                                title="完整视频",
-                                duration=video_data.get('duration', 600),
-                                order=1
-                            )
+                        # 创建视频记录和分集信息
+                        video = video_ingest.ingest_from_view_data(extracted_bvid, data['data'])
 
             if video:
+                # 元数据过期时在后台刷新，本次直接使用数据库中的数据
+                video_refresh.schedule_refresh_if_stale(video)
+
                 # 检查视频是否已在课程列表中
                 is_in_course_list = UserCourse.objects.filter(video=video).exists()
 
@@ -158,44 +129,40 @@ def search_videos(request):
             messages.error(request, f"获取视频信息失败: {str(e)}")
             return render(request, 'bilistudy/search_results.html', {'videos': [], 'keyword': keyword, 'sort_type': sort_type})
     
-    # B站搜索API
-    api_url = "https://api.bilibili.com/x/web-interface/search/type"
-    params = {
-        'search_type': 'video',
-        'keyword': keyword,
-        'page': page,
-        'order': 'totalrank'  # 默认综合排序
-    }
-    
+    # B站搜索API排序参数
+    order = 'totalrank'  # 默认综合排序
+
     # 根据排序类型设置参数
     if sort_type == 'view':
-        params['order'] = 'click'  # 播放量排序
+        order = 'click'  # 播放量排序
     elif sort_type == 'like':
-        params['order'] = 'stow'  # 点赞数排序（收藏数，通常与点赞相关）
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Referer': 'https://www.bilibili.com',
-        'Cookie': 'buvid3=CFF74DA7-E79E-4B53-BB96-FC74AB8CD2F3184997infoc'
-    }
-    
+        order = 'stow'  # 点赞数排序（收藏数，通常与点赞相关）
+
     try:
-        response = requests.get(api_url, params=params, headers=headers, timeout=5)  # 减少超时时间
-        
-        # 检查响应状态码
-        if response.status_code != 200:
-            messages.error(request, f"搜索请求失败: HTTP {response.status_code}")
-            return render(request, 'bilistudy/search_results.html', {'videos': [], 'keyword': keyword, 'sort_type': sort_type, 'is_single_video': False})
-        
-        # 尝试解析JSON响应
-        try:
-            data = response.json()
-        except json.JSONDecodeError:
-            # 如果JSON解析失败，打印响应内容以便调试
-            print(f"JSON解析失败，响应内容: {response.text[:200]}...")
-            messages.error(request, "搜索结果格式错误，无法解析")
-            return render(request, 'bilistudy/search_results.html', {'videos': [], 'keyword': keyword, 'sort_type': sort_type})
-        
+        # 优先使用缓存的搜索结果，热门关键词不再重复请求B站
+        data = search_cache.get_search_results(keyword, order, page)
+
+        if data is None:
+            response = bilibili_client.search_videos(keyword, page=page, order=order)
+
+            # 检查响应状态码
+            if response.status_code != 200:
+                messages.error(request, f"搜索请求失败: HTTP {response.status_code}")
+                return render(request, 'bilistudy/search_results.html', {'videos': [], 'keyword': keyword, 'sort_type': sort_type, 'is_single_video': False})
+
+            # 尝试解析JSON响应
+            try:
+                data = response.json()
+            except json.JSONDecodeError:
+                # 如果JSON解析失败，打印响应内容以便调试
+                print(f"JSON解析失败，响应内容: {response.text[:200]}...")
+                messages.error(request, "搜索结果格式错误，无法解析")
+                return render(request, 'bilistudy/search_results.html', {'videos': [], 'keyword': keyword, 'sort_type': sort_type})
+
+            # 只缓存成功的搜索结果
+            if data.get('code') == 0 and 'result' in (data.get('data') or {}):
+                search_cache.set_search_results(keyword, order, page, data)
+
         # 检查API返回结果
         if 'code' not in data or data['code'] != 0 or 'data' not in data or 'result' not in data.get('data', {}):
             # 如果API返回错误或数据格式不符合预期，返回空结果
@@ -523,21 +490,8 @@ def video_detail_ajax(request, bvid):
             api_error_msg = ""
 
             try:
-                api_url = "https://api.bilibili.com/x/web-interface/view"
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                    'Referer': f'https://www.bilibili.com/video/{bvid}',
-                    'Origin': 'https://www.bilibili.com',
-                    'Cookie': 'buvid3=CFF74DA7-E79E-4B53-BB96-FC74AB8CD2F3184997infoc',
-                    'Accept': 'application/json, text/plain, */*',
-                    'Connection': 'keep-alive'
-                }
-                params = {
-                    'bvid': bvid
-                }
-
                 print(f"尝试通过API获取视频信息: {bvid}")
-                response = requests.get(api_url, params=params, headers=headers, timeout=15)
+                response = bilibili_client.get_video_view(bvid)
                 print(f"API响应状态码: {response.status_code}")
 
                 if response.status_code == 200:
@@ -546,41 +500,8 @@ def video_detail_ajax(request, bvid):
                         print(f"API返回码: {data.get('code')}, 消息: {data.get('message', 'N/A')}")
 
                         if data['code'] == 0:
-                            video_data = data['data']
-                            pub_date = datetime.fromtimestamp(video_data['pubdate']).date()
-
-                            # 创建视频记录
-                            video = BiliVideo.objects.create(
-                                bvid=bvid,
-                                title=video_data['title'],
-                                cover=video_data['pic'],
-                                author=video_data['owner']['name'],
-                                pub_date=pub_date,
-                                play_count=video_data['stat']['view'],
-                                like_count=video_data['stat']['like'],
-                                description=video_data['desc']
-                            )
-
-                            # 获取分集信息
-                            if video_data.get('videos', 0) > 1:
-                                # 获取分P列表
-                                for i, page in enumerate(video_data.get('pages', [])):
-                                    VideoEpisode.objects.create(
-                                        video=video,
-                                        cid=page['cid'],
-                                        title=page['part'],
-                                        duration=page['duration'],
-                                        order=i+1
-                                    )
-                            else:
-                                # 如果是单P视频，创建一个默认分集
-                                VideoEpisode.objects.create(
-                                    video=video,
-                                    cid=video_data.get('cid', 'cid1'),
-                                    title="完整视频",
-                                    duration=video_data.get('duration', 600),
-                                    order=1
-                                )
+                            # 创建视频记录和分集信息
+                            video = video_ingest.ingest_from_view_data(bvid, data['data'])
 
                             api_success = True
                             print("API获取视频信息成功")
@@ -620,18 +541,7 @@ def video_detail_ajax(request, bvid):
 
                 try:
                     print(f"API获取失败({api_error_msg})，尝试通过网页爬虫获取视频信息: {bvid}")
-                    # 构建B站视频页面URL
-                    video_url = f"https://www.bilibili.com/video/{bvid}"
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                        'Referer': 'https://www.bilibili.com',
-                        'Cookie': 'buvid3=CFF74DA7-E79E-4B53-BB96-FC74AB8CD2F3184997infoc',
-                        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
-                        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                        'Cache-Control': 'no-cache'
-                    }
-
-                    response = requests.get(video_url, headers=headers, timeout=15)
+                    response = bilibili_client.get_video_page(bvid)
                     print(f"网页请求状态码: {response.status_code}")
 
                     if response.status_code == 200:
@@ -731,28 +641,21 @@ def video_detail_ajax(request, bvid):
                                 'order': 1
                             })
 
-                        # 创建视频记录
-                        video = BiliVideo.objects.create(
-                            bvid=bvid,
-                            title=title,
-                            cover=cover_url,
-                            author=author,
-                            pub_date=datetime.now().date(),
-                            play_count=0,
-                            like_count=0,
-                            description=description
+                        # 创建视频记录和分集记录
+                        video = video_ingest.ingest_video(
+                            bvid,
+                            {
+                                'title': title,
+                                'cover': cover_url,
+                                'author': author,
+                                'pub_date': datetime.now().date(),
+                                'play_count': 0,
+                                'like_count': 0,
+                                'description': description,
+                            },
+                            episode_list
                         )
 
-                        # 创建分集记录
-                        for episode in episode_list:
-                            VideoEpisode.objects.create(
-                                video=video,
-                                cid=episode['cid'],
-                                title=episode['title'],
-                                duration=episode['duration'],
-                                order=episode['order']
-                            )
-
                         crawler_success = True
                         print("网页爬虫获取视频信息成功")
                     else:
@@ -776,6 +679,8 @@ def video_detail_ajax(request, bvid):
                     })
         else:
             print(f"数据库中找到视频: {video.title}")
+            # 元数据过期时在后台刷新，本次直接使用数据库中的数据
+            video_refresh.schedule_refresh_if_stale(video)
 
         # 检查视频是否已在课程列表中
         is_in_course_list = UserCourse.objects.filter(video=video).exists()
@@ -827,16 +732,23 @@ def add_to_course_list(request, bvid):
     )
 
     if created:
-        # 为每个分集创建学习进度记录
-        for episode in video.episodes.all():
-            LearningProgress.objects.create(
-                user_course=user_course,
-                episode=episode
-            )
+        # 一次聚合查询计算视频总时长和分集数
+        totals = video.episodes.aggregate(total_duration=Sum('duration'), total_episodes=Count('id'))
+        total_duration = totals['total_duration'] or 0
+        total_episodes = totals['total_episodes']
 
-        # 计算视频总时长
-        total_duration = sum(episode.duration for episode in video.episodes.all())
-        total_episodes = video.episodes.count()
+        with transaction.atomic():
+            # 为每个分集批量创建学习进度记录
+            episode_ids = video.episodes.values_list('id', flat=True)
+            LearningProgress.objects.bulk_create([
+                LearningProgress(user_course=user_course, episode_id=episode_id)
+                for episode_id in episode_ids
+            ])
+
+            # 初始化进度计数器
+            user_course.total_count = total_episodes
+            user_course.completed_count = 0
+            user_course.save(update_fields=['total_count', 'completed_count'])
 
         # 返回JSON响应，包含课程信息用于学习计划弹窗
         return JsonResponse({
@@ -853,7 +765,7 @@ def add_to_course_list(request, bvid):
         # 更新自定义标题
         if custom_title:
             user_course.custom_title = course_title
-            user_course.save()
+            user_course.save(update_fields=['custom_title'])
             return JsonResponse({
                 'success': True,
                 'created': False,
@@ -869,18 +781,12 @@ def add_to_course_list(request, bvid):
 @login_required
 def course_list(request):
     """用户课程列表"""
-    courses = UserCourse.objects.filter(user=request.user).order_by('-add_time')
+    # 一次查询取出全部课程及视频信息（进度来自UserCourse上的计数器，不再逐门课程统计）
+    courses = UserCourse.objects.filter(user=request.user).select_related('video').order_by('-add_time')
 
     # 为每个课程计算学习进度
     for course in courses:
-        progress_records = LearningProgress.objects.filter(user_course=course)
-        total_episodes = progress_records.count()
-        completed_episodes = progress_records.filter(is_completed=True).count()
-
-        if total_episodes > 0:
-            course.progress_percentage = round((completed_episodes / total_episodes) * 100, 1)
-        else:
-            course.progress_percentage = 0
+        course.progress_percentage = round(course.completion_rate, 1)
 
     return render(request, 'bilistudy/course_list.html', {'courses': courses})
 
@@ -891,9 +797,7 @@ def course_detail(request, course_id):
     progress = LearningProgress.objects.filter(user_course=course).order_by('episode__order')
 
     # 计算总体进度
-    total_episodes = progress.count()
-    completed_episodes = progress.filter(is_completed=True).count()
-    completion_rate = int(completed_episodes / total_episodes * 100) if total_episodes > 0 else 0
+    completion_rate = int(course.completion_rate)
 
     # 获取该课程的学习计划（如果存在）
     try:
@@ -915,41 +819,40 @@ def update_progress(request):
     progress_id = request.POST.get('progress_id')
     is_completed = request.POST.get('is_completed') == 'true'
 
-    progress = get_object_or_404(LearningProgress, id=progress_id)
-    # 验证用户权限
-    if progress.user_course.user != request.user:
-        return JsonResponse({'success': False, 'message': '无权限操作'})
+    with transaction.atomic():
+        progress = get_object_or_404(LearningProgress.objects.select_for_update(), id=progress_id)
+        # 验证用户权限
+        if progress.user_course.user != request.user:
+            return JsonResponse({'success': False, 'message': '无权限操作'})
 
-    # 检查状态是否真的发生了变化
-    old_is_completed = progress.is_completed
+        # 检查状态是否真的发生了变化
+        old_is_completed = progress.is_completed
 
-    # 更新完成状态和时间
-    progress.is_completed = is_completed
-    if is_completed:
-        # 只有当分集从未完成变为完成时，才更新完成时间
-        if not old_is_completed:
-            from django.utils import timezone
-            progress.completed_at = timezone.now()
-        # 如果之前已经完成，保持原有的完成时间不变
-    else:
-        # 取消完成时，清空完成时间
-        progress.completed_at = None
-    progress.save()
+        # 更新完成状态和时间
+        progress.is_completed = is_completed
+        if is_completed:
+            # 只有当分集从未完成变为完成时，才更新完成时间
+            if not old_is_completed:
+                from django.utils import timezone
+                progress.completed_at = timezone.now()
+            # 如果之前已经完成，保持原有的完成时间不变
+        else:
+            # 取消完成时，清空完成时间
+            progress.completed_at = None
+        progress.save()
+
+        # 同步进度计数器
+        user_course = progress.user_course
+        user_course.adjust_completed_count(int(is_completed) - int(old_is_completed))
 
     # 同步到学习计划
     sync_progress_to_study_plan(progress, is_completed)
 
-    # 计算更新后的进度百分比
-    user_course = progress.user_course
-    total_progress = LearningProgress.objects.filter(user_course=user_course).count()
-    completed_progress = LearningProgress.objects.filter(user_course=user_course, is_completed=True).count()
-    completion_rate = (completed_progress / total_progress * 100) if total_progress > 0 else 0
-
     return JsonResponse({
         'status': 'success',
-        'completion_rate': round(completion_rate, 1),
-        'completed_count': completed_progress,
-        'total_count': total_progress
+        'completion_rate': round(user_course.completion_rate, 1),
+        'completed_count': user_course.completed_count,
+        'total_count': user_course.total_count
     })
 
 
@@ -1007,54 +910,110 @@ def sync_progress_to_study_plan(progress, is_completed):
 @require_POST
 @login_required
 def batch_update_progress(request):
-    """批量更新学习进度"""
-    progress_ids = request.POST.getlist('progress_ids[]')
+    """批量更新学习进度（按集合一次性更新，不再逐条查询和保存）"""
+    raw_ids = request.POST.getlist('progress_ids[]')
+    progress_ids = [int(pid) for pid in raw_ids if str(pid).isdigit()]
     is_completed = request.POST.get('is_completed') == 'true'
 
-    user_course = None
-    for progress_id in progress_ids:
-        progress = get_object_or_404(LearningProgress, id=progress_id)
-        # 验证用户权限
-        if progress.user_course.user != request.user:
-            continue
+    # 与原逻辑一致：请求中有不存在的进度记录时返回404，属于其他用户的记录直接跳过
+    if len(progress_ids) != len(raw_ids) or (
+            LearningProgress.objects.filter(id__in=progress_ids).count() != len(set(progress_ids))):
+        raise Http404('学习进度不存在')
 
-        # 检查状态是否真的发生了变化
-        old_is_completed = progress.is_completed
+    # 一次查询筛选出属于当前用户的进度记录
+    owned_progress = LearningProgress.objects.filter(id__in=progress_ids, user_course__user=request.user)
 
-        # 更新完成状态和时间
-        progress.is_completed = is_completed
+    with transaction.atomic():
+        rows = list(owned_progress.select_for_update().values_list('id', 'user_course_id', 'is_completed'))
+        if not rows:
+            return JsonResponse({'status': 'success'})
+
+        # 只更新状态真正发生变化的记录，统计每门课程的变化数量
+        changed_ids = [pid for pid, _, old_is_completed in rows if old_is_completed != is_completed]
+        course_deltas = {}
+        for pid, user_course_id, old_is_completed in rows:
+            if old_is_completed != is_completed:
+                course_deltas[user_course_id] = course_deltas.get(user_course_id, 0) + (1 if is_completed else -1)
+
+        now = timezone.now()
         if is_completed:
-            # 只有当分集从未完成变为完成时，才更新完成时间
-            if not old_is_completed:
-                from django.utils import timezone
-                progress.completed_at = timezone.now()
-            # 如果之前已经完成，保持原有的完成时间不变
+            # 只有当分集从未完成变为完成时，才更新完成时间；之前已完成的保持原有完成时间
+            LearningProgress.objects.filter(id__in=changed_ids).update(
+                is_completed=True, completed_at=now, update_time=now
+            )
         else:
             # 取消完成时，清空完成时间
-            progress.completed_at = None
-        progress.save()
+            LearningProgress.objects.filter(id__in=changed_ids).update(
+                is_completed=False, completed_at=None, update_time=now
+            )
 
-        # 同步到学习计划
-        sync_progress_to_study_plan(progress, is_completed)
+        # 同步进度计数器
+        for user_course_id, delta in course_deltas.items():
+            UserCourse.objects.filter(pk=user_course_id).update(completed_count=F('completed_count') + delta)
+        if course_deltas:
+            learning_context.invalidate(request.user.id)
 
-        # 记录用户课程用于计算进度
-        if user_course is None:
-            user_course = progress.user_course
+    # 按课程、按日期汇总同步到学习计划
+    ids_by_course = {}
+    for pid, user_course_id, _ in rows:
+        ids_by_course.setdefault(user_course_id, []).append(pid)
+    for plan in StudyPlan.objects.filter(user_course_id__in=ids_by_course):
+        sync_batch_progress_to_study_plan(plan, ids_by_course[plan.user_course_id], is_completed)
 
-    # 计算更新后的进度百分比
-    if user_course:
-        total_progress = LearningProgress.objects.filter(user_course=user_course).count()
-        completed_progress = LearningProgress.objects.filter(user_course=user_course, is_completed=True).count()
-        completion_rate = (completed_progress / total_progress * 100) if total_progress > 0 else 0
+    # 计算更新后的进度百分比（与原逻辑一致，使用请求中第一条有效记录所在的课程）
+    course_by_progress = {pid: user_course_id for pid, user_course_id, _ in rows}
+    first_course_id = next(course_by_progress[pid] for pid in progress_ids if pid in course_by_progress)
+    user_course = UserCourse.objects.only('completed_count', 'total_count').get(pk=first_course_id)
 
-        return JsonResponse({
-            'status': 'success',
-            'completion_rate': round(completion_rate, 1),
-            'completed_count': completed_progress,
-            'total_count': total_progress
-        })
+    return JsonResponse({
+        'status': 'success',
+        'completion_rate': round(user_course.completion_rate, 1),
+        'completed_count': user_course.completed_count,
+        'total_count': user_course.total_count
+    })
+
+
+def sync_batch_progress_to_study_plan(study_plan, progress_ids, is_completed):
+    """把一批分集的进度变化同步到学习计划，每个受影响的日期只处理一次"""
+    try:
+        from datetime import date, time
+
+        if is_completed:
+            # 按分集完成时间所在日期汇总，每个日期创建一次学习记录
+            completed_at_list = LearningProgress.objects.filter(
+                id__in=progress_ids, completed_at__isnull=False
+            ).values_list('completed_at', flat=True)
+            study_dates = {completed_at.date() for completed_at in completed_at_list}
+            for study_date in study_dates:
+                DailyStudyRecord.objects.get_or_create(
+                    study_plan=study_plan,
+                    study_date=study_date,
+                    defaults={'study_minutes': study_plan.daily_minutes, 'notes': ''}
+                )
+        else:
+            # 取消完成时只影响今天的记录：今天没有其他完成的分集时删除该记录
+            study_date = date.today()
+            start_of_day = datetime.combine(study_date, time.min)
+            end_of_day = datetime.combine(study_date, time.max)
 
-    return JsonResponse({'status': 'success'})
+            remaining_episodes = LearningProgress.objects.filter(
+                user_course_id=study_plan.user_course_id,
+                is_completed=True,
+                completed_at__range=(start_of_day, end_of_day)
+            ).exists()
+
+            if remaining_episodes:
+                DailyStudyRecord.objects.get_or_create(
+                    study_plan=study_plan,
+                    study_date=study_date,
+                    defaults={'study_minutes': study_plan.daily_minutes, 'notes': ''}
+                )
+            else:
+                DailyStudyRecord.objects.filter(study_plan=study_plan, study_date=study_date).delete()
+
+    except Exception as e:
+        # 记录错误但不影响主流程
+        print(f"同步学习计划失败: {str(e)}")
 
 @require_POST
 @login_required
@@ -1094,7 +1053,7 @@ def update_course_title(request, course_id):
 
     # 更新课程标题
     course.custom_title = new_title
-    course.save()
+    course.save(update_fields=['custom_title'])
 
     # 根据请求类型返回不同响应
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -1120,19 +1079,8 @@ def test_api(request):
     }
     
     # 测试API1 - 详细接口
-    api_url1 = "https://api.bilibili.com/x/web-interface/view/detail"
-    headers1 = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Referer': 'https://www.bilibili.com/video/' + bvid,
-        'Origin': 'https://www.bilibili.com',
-        'Cookie': 'buvid3=CFF74DA7-E79E-4B53-BB96-FC74AB8CD2F3184997infoc'
-    }
-    params1 = {
-        'bvid': bvid
-    }
-    
     try:
-        response1 = requests.get(api_url1, params=params1, headers=headers1, timeout=15)
+        response1 = bilibili_client.get_video_view_detail(bvid)
         
         result['api1'] = {
             'status_code': response1.status_code,
@@ -1148,18 +1096,8 @@ def test_api(request):
         result['api1']['error'] = str(e)
     
     # 测试API2 - 基础接口
-    api_url2 = "https://api.bilibili.com/x/web-interface/view"
-    headers2 = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Referer': 'https://www.bilibili.com',
-        'Cookie': 'buvid3=CFF74DA7-E79E-4B53-BB96-FC74AB8CD2F3184997infoc'
-    }
-    params2 = {
-        'bvid': bvid
-    }
-    
     try:
-        response2 = requests.get(api_url2, params=params2, headers=headers2, timeout=15)
+        response2 = bilibili_client.get_video_view(bvid)
         
         result['api2'] = {
             'status_code': response2.status_code,
@@ -1306,9 +1244,86 @@ def update_theme_preference(request):
         return JsonResponse({'success': False, 'message': f'更新失败: {str(e)}'})
 
 
+def get_chat_session_id(request):
+    """获取或创建AI聊天会话ID"""
+    session_id = request.session.get('chat_session_id')
+    if not session_id:
+        import uuid
+        session_id = f"user_{request.user.id if request.user.is_authenticated else 'anonymous'}_{uuid.uuid4().hex[:8]}"
+        request.session['chat_session_id'] = session_id
+    return session_id
+
+
+async def save_chat_history(session_id, user_message, ai_response, chat_type):
+    """保存聊天历史"""
+    try:
+        from .models import ChatHistory
+        await ChatHistory.objects.acreate(
+            session_id=session_id,
+            user_message=user_message,
+            ai_response=ai_response,
+            chat_type=chat_type
+        )
+    except Exception as e:
+        print(f"保存聊天历史失败: {str(e)}")
+        return
+
+    # 超出预算的旧对话合并进会话摘要
+    await chat_memory.update_memory(session_id)
+
+
+async def prepare_ai_chat(request, user_message, chat_type, course_id, ai_model):
+    """准备会话ID并开始调用AI，返回 (会话ID, 回复文本的异步迭代器, 回复缓存状态, 实际回复的服务)
+
+    回复缓存状态：'hit' 回复来自缓存，'miss' 回复完成后应写入缓存，None 不使用缓存；
+    实际回复的服务是一个列表，故障切换选定服务后写入服务名，回复按该服务写入缓存
+    """
+    # 会话和提示词构建涉及同步的session/ORM操作，放到线程中执行
+    session_id = await sync_to_async(get_chat_session_id)(request)
+    # 对话历史：较早对话的摘要 + 预算内的最近几轮
+    chat_history = await chat_memory.build_history(session_id)
+
+    # 不含个人信息的通用问题先查回复缓存
+    cache_status = None
+    if ai_response_cache.is_cacheable(chat_type, chat_history):
+        cached_response = await ai_response_cache.lookup(user_message, ai_model)
+        if cached_response is not None:
+            return session_id, ai_response_cache.replay(cached_response), 'hit', [ai_model]
+        cache_status = 'miss'
+
+    system_prompt = await sync_to_async(get_system_prompt)(chat_type, course_id, request, ai_model)
+
+    full_prompt = f"{system_prompt}{chat_history}\n\n当前用户问题：{user_message}"
+    # 有可用的备用服务时不再原地重试，失败直接切换
+    gemini_retries = 1 if len(ai_router.available_providers(ai_model)) > 1 else 3
+    factories = {
+        'deepseek': lambda: ai_stream.stream_deepseek(
+            system_prompt, user_message, chat_history, api_key=os.getenv('DEEPSEEK_API_KEY')
+        ),
+        'gemini': lambda: ai_stream.stream_gemini(
+            full_prompt, api_key=os.getenv('GEMINI_API_KEY'), max_retries=gemini_retries
+        ),
+    }
+    if ai_model not in factories:
+        ai_model = 'gemini'  # 默认使用gemini
+
+    # 按首选模型在前的顺序调用，熔断的服务直接跳过
+    # 首选服务失败时由备用服务回复，记录实际回复的服务，避免把备用服务的回复缓存为首选服务的回复
+    answered_by = []
+    tokens = ai_router.route_stream(
+        [(name, factories[name]) for name in ai_router.order_providers(ai_model)], on_select=answered_by.append
+    )
+    return session_id, tokens, cache_status, answered_by
+
+
+def uses_shared_ai_client(request):
+    """ASGI服务器的事件循环常驻，可以复用共享连接池；WSGI/runserver下每次调用使用独立的客户端"""
+    return isinstance(request, ASGIRequest)
+
+
 @require_POST
-def ai_chat(request):
-    """处理AI聊天请求"""
+async def ai_chat(request):
+    """处理AI聊天请求（一次性返回完整回复）"""
     try:
         # 获取用户输入
         user_message = request.POST.get('message', '').strip()
@@ -1322,159 +1337,38 @@ def ai_chat(request):
                 'error': '请输入您的问题'
             })
 
-        # 配置Gemini API
-        try:
-            import google.generativeai as genai
-        except ImportError:
-            return JsonResponse({
-                'success': False,
-                'error': '请先安装google-generativeai包: pip install google-generativeai'
-            })
+        session_id, tokens, cache_status, answered_by = await prepare_ai_chat(
+            request, user_message, chat_type, course_id, ai_model
+        )
 
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
+        try:
+            async with ai_stream.client_scope(shared=uses_shared_ai_client(request)):
+                ai_response = await ai_stream.collect(tokens)
+        except ai_stream.AIStreamError as e:
             return JsonResponse({
                 'success': False,
-                'error': 'AI服务暂时不可用，请配置GEMINI_API_KEY环境变量'
+                'error': ai_diagnostics.with_diagnostics(str(e))
             })
-
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-pro')  # 使用更稳定的模型
-
-        # 获取或创建会话ID
-        session_id = request.session.get('chat_session_id')
-        if not session_id:
-            import uuid
-            session_id = f"user_{request.user.id if request.user.is_authenticated else 'anonymous'}_{uuid.uuid4().hex[:8]}"
-            request.session['chat_session_id'] = session_id
-
-        # 获取最近的聊天历史（最多5条）
-        chat_history = ""
-        try:
-            from .models import ChatHistory
-            recent_chats = ChatHistory.objects.filter(session_id=session_id).order_by('-created_at')[:5]
-            if recent_chats:
-                chat_history = "\n\n最近的对话历史：\n"
-                for chat in reversed(recent_chats):  # 按时间正序显示
-                    chat_history += f"用户：{chat.user_message}\n"
-                    chat_history += f"AI：{chat.ai_response[:200]}...\n\n"  # 限制长度
-        except:
-            pass
-
-        # 根据聊天类型和模型构建不同的提示词
-        system_prompt = get_system_prompt(chat_type, course_id, request, ai_model)
-        full_prompt = f"{system_prompt}{chat_history}\n\n当前用户问题：{user_message}"
-
-        # 根据选择的模型调用不同的API
-        try:
-            # 根据选择的模型调用不同的API
-            import requests
-            import time
-
-            if ai_model == 'deepseek':
-                ai_response = call_deepseek_api(system_prompt, user_message, chat_history)
-            else:  # 默认使用gemini
-                api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={api_key}"
-
-                headers = {
-                    'Content-Type': 'application/json',
-                }
-
-                data = {
-                    "contents": [{
-                        "parts": [{
-                            "text": full_prompt
-                        }]
-                    }]
-                }
-
-                # 重试机制：最多重试3次
-                max_retries = 3
-                ai_response = None
-
-                for attempt in range(max_retries):
-                    try:
-                        response = requests.post(api_url, headers=headers, json=data, timeout=30)
-
-                        if response.status_code == 200:
-                            result = response.json()
-                            if 'candidates' in result and len(result['candidates']) > 0:
-                                ai_response = result['candidates'][0]['content']['parts'][0]['text']
-                                break  # 成功获取回复，跳出重试循环
-                            else:
-                                ai_response = "抱歉，我暂时无法生成回复，请稍后再试。"
-                                break
-                        elif response.status_code == 503:
-                            # 服务不可用，等待后重试
-                            if attempt < max_retries - 1:
-                                print(f"API返回503，第{attempt + 1}次重试...")
-                                time.sleep(2 ** attempt)  # 指数退避：2秒、4秒、8秒
-                                continue
-                            else:
-                                return JsonResponse({
-                                    'success': False,
-                                    'error': f'AI服务暂时不可用（HTTP 503），已重试{max_retries}次。请稍后再试，或检查网络连接。'
-                                })
-                        elif response.status_code == 429:
-                            # 请求过于频繁
-                            return JsonResponse({
-                                'success': False,
-                                'error': 'AI服务请求过于频繁，请稍后再试。'
-                            })
-                        else:
-                            print(f"REST API调用失败: {response.status_code}, {response.text}")
-                            return JsonResponse({
-                                'success': False,
-                                'error': f'AI服务返回错误：HTTP {response.status_code}。请检查网络连接或稍后再试。'
-                            })
-
-                    except requests.exceptions.Timeout:
-                        if attempt < max_retries - 1:
-                            print(f"请求超时，第{attempt + 1}次重试...")
-                            time.sleep(1)
-                            continue
-                        else:
-                            return JsonResponse({
-                                'success': False,
-                                'error': 'AI服务响应超时，请稍后再试。'
-                            })
-                    except requests.exceptions.ConnectionError:
-                        if attempt < max_retries - 1:
-                            print(f"连接失败，第{attempt + 1}次重试...")
-                            time.sleep(1)
-                            continue
-                        else:
-                            return JsonResponse({
-                                'success': False,
-                                'error': '网络连接失败，无法访问Google AI服务。请检查网络连接，可能需要使用代理。'
-                            })
-
-                if not ai_response or ai_response.strip() == '':
-                    ai_response = "抱歉，我暂时无法生成回复，请稍后再试。"
-
-            # 保存聊天历史
-            try:
-                from .models import ChatHistory
-                ChatHistory.objects.create(
-                    session_id=session_id,
-                    user_message=user_message,
-                    ai_response=ai_response,
-                    chat_type=chat_type
-                )
-            except Exception as e:
-                print(f"保存聊天历史失败: {str(e)}")
-
         except Exception as api_error:
             print(f"AI API调用错误: {str(api_error)}")
             return JsonResponse({
                 'success': False,
-                'error': f'AI服务出现错误：{str(api_error)[:100]}'
+                'error': ai_diagnostics.with_diagnostics(f'AI服务出现错误：{str(api_error)[:100]}')
             })
 
+        if not ai_response or ai_response.strip() == '':
+            ai_response = "抱歉，我暂时无法生成回复，请稍后再试。"
+        elif cache_status == 'miss' and answered_by:
+            await ai_response_cache.store(user_message, answered_by[0], ai_response)
+
+        # 保存聊天历史
+        await save_chat_history(session_id, user_message, ai_response, chat_type)
+
         return JsonResponse({
             'success': True,
             'response': ai_response,
-            'type': chat_type
+            'type': chat_type,
+            'cached': cache_status == 'hit'
         })
 
     except Exception as e:
@@ -1485,8 +1379,68 @@ def ai_chat(request):
         })
 
 
-def call_deepseek_api(system_prompt, user_message, chat_history=""):
-    """调用DeepSeek API"""
+@require_POST
+async def ai_chat_stream(request):
+    """处理AI聊天请求，以Server-Sent Events逐段返回回复
+
+    事件：token（{"text": 新增文本}）、error（{"error": 错误信息}）、done（{"type": 聊天类型}）；
+    完整回复在结束后保存到聊天历史
+    """
+    user_message = request.POST.get('message', '').strip()
+    chat_type = request.POST.get('type', 'general')  # general, study_plan, progress_analysis
+    course_id = request.POST.get('course_id', '')
+    ai_model = request.POST.get('ai_model', 'gemini')  # gemini, deepseek
+
+    async def error_stream(message):
+        yield ai_stream.sse_event('error', {'error': message})
+
+    if not user_message:
+        chunks = error_stream('请输入您的问题')
+    else:
+        session_id, tokens, cache_status, answered_by = await prepare_ai_chat(
+            request, user_message, chat_type, course_id, ai_model
+        )
+        chunks = _relay_chat_stream(
+            tokens, session_id, user_message, chat_type, cache_status, answered_by, uses_shared_ai_client(request)
+        )
+
+    response = StreamingHttpResponse(chunks, content_type='text/event-stream; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    # 关闭Nginx等反向代理的响应缓冲，保证逐段送达
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _relay_chat_stream(tokens, session_id, user_message, chat_type, cache_status=None, answered_by=(),
+                             shared_client=True):
+    """把模型输出转成SSE事件，结束后保存完整回复"""
+    parts = []
+    try:
+        async with ai_stream.client_scope(shared=shared_client):
+            async for text in tokens:
+                parts.append(text)
+                yield ai_stream.sse_event('token', {'text': text})
+    except ai_stream.AIStreamError as e:
+        yield ai_stream.sse_event('error', {'error': ai_diagnostics.with_diagnostics(str(e))})
+        return
+    except Exception as e:
+        print(f"AI流式调用错误: {str(e)}")
+        yield ai_stream.sse_event('error', {'error': ai_diagnostics.with_diagnostics(f'AI服务出现错误：{str(e)[:100]}')})
+        return
+
+    ai_response = ''.join(parts)
+    if not ai_response.strip():
+        yield ai_stream.sse_event('error', {'error': '抱歉，我暂时无法生成回复，请稍后再试。'})
+        return
+
+    if cache_status == 'miss' and answered_by:
+        await ai_response_cache.store(user_message, answered_by[0], ai_response)
+    await save_chat_history(session_id, user_message, ai_response, chat_type)
+    yield ai_stream.sse_event('done', {'type': chat_type, 'cached': cache_status == 'hit'})
+
+
+def request_deepseek(system_prompt, user_message, chat_history=""):
+    """调用DeepSeek API，返回回复文本；任何失败都抛出 AIStreamError（消息可直接展示给用户），供熔断和故障切换判断"""
     try:
         import requests
         import json
@@ -1494,27 +1448,12 @@ def call_deepseek_api(system_prompt, user_message, chat_history=""):
         # 🔑 DeepSeek API密钥
         api_key = os.getenv('DEEPSEEK_API_KEY')
 
-        # 详细的调试信息
-        print(f"[DEBUG] 开始调用DeepSeek API")
-        print(f"[DEBUG] API Key前缀: {api_key[:10]}...")
-
-        # 先测试基本网络连接
-        try:
-            test_response = requests.get("https://www.baidu.com", timeout=5)
-            print(f"[DEBUG] 基本网络连接正常: {test_response.status_code}")
-        except Exception as e:
-            print(f"[DEBUG] 基本网络连接失败: {str(e)}")
-            return f"网络连接失败：{str(e)}。请检查网络设置。"
-
-        # 测试DeepSeek域名解析
-        try:
-            test_response = requests.get("https://api.deepseek.com", timeout=10)
-            print(f"[DEBUG] DeepSeek域名连接: {test_response.status_code}")
-        except Exception as e:
-            print(f"[DEBUG] DeepSeek域名连接失败: {str(e)}")
-            return f"无法连接到DeepSeek服务器：{str(e)}。可能是DNS问题或防火墙阻止。"
+        if not api_key:
+            raise ai_stream.AIStreamError("DeepSeek API调用失败：未配置DEEPSEEK_API_KEY环境变量。")
 
-        api_url = "https://api.deepseek.com/v1/chat/completions"
+        # 直接请求模型接口；网络连通性由 ai_diagnostics 定期检查，不再每次调用前测试
+        print(f"[DEBUG] 开始调用DeepSeek API")
+        api_url = ai_stream.DEEPSEEK_API_URL
         print(f"[DEBUG] API URL: {api_url}")
 
         headers = {
@@ -1524,25 +1463,7 @@ def call_deepseek_api(system_prompt, user_message, chat_history=""):
         }
 
         # 构建消息列表
-        messages = [
-            {
-                "role": "system",
-                "content": system_prompt
-            }
-        ]
-
-        # 如果有聊天历史，添加到消息中
-        if chat_history.strip():
-            messages.append({
-                "role": "assistant",
-                "content": f"以下是我们之前的对话历史：{chat_history}"
-            })
-
-        # 添加当前用户消息
-        messages.append({
-            "role": "user",
-            "content": user_message
-        })
+        messages = ai_stream.build_deepseek_messages(system_prompt, user_message, chat_history)
 
         data = {
             "model": "deepseek-chat",
@@ -1553,7 +1474,7 @@ def call_deepseek_api(system_prompt, user_message, chat_history=""):
         }
 
         print(f"[DEBUG] 发送API请求...")
-        response = requests.post(api_url, headers=headers, json=data, timeout=60)
+        response = requests.post(api_url, headers=headers, json=data, timeout=(10, 60))
 
         print(f"[DEBUG] 响应状态码: {response.status_code}")
         print(f"[DEBUG] 响应头: {dict(response.headers)}")
@@ -1568,37 +1489,47 @@ def call_deepseek_api(system_prompt, user_message, chat_history=""):
                 return content
             else:
                 print(f"[DEBUG] API返回格式异常: {result}")
-                return "DeepSeek API返回了空响应，请稍后再试。"
+                raise ai_stream.AIStreamError("DeepSeek API返回了空响应，请稍后再试。")
         else:
             error_text = response.text
             print(f"[DEBUG] API调用失败: {response.status_code}")
             print(f"[DEBUG] 错误详情: {error_text}")
 
             if response.status_code == 402:
-                return "DeepSeek API调用失败：账户余额不足或需要付费。请检查您的DeepSeek账户余额。"
+                raise ai_stream.AIStreamError("DeepSeek API调用失败：账户余额不足或需要付费。请检查您的DeepSeek账户余额。")
             elif response.status_code == 401:
-                return "DeepSeek API调用失败：API密钥无效。请检查您的API密钥是否正确。"
+                raise ai_stream.AIStreamError("DeepSeek API调用失败：API密钥无效。请检查您的API密钥是否正确。")
             elif response.status_code == 429:
-                return "DeepSeek API调用失败：请求过于频繁。请稍后再试。"
+                raise ai_stream.AIStreamError("DeepSeek API调用失败：请求过于频繁。请稍后再试。")
             elif response.status_code == 403:
-                return "DeepSeek API调用失败：访问被拒绝。请检查API密钥权限。"
+                raise ai_stream.AIStreamError("DeepSeek API调用失败：访问被拒绝。请检查API密钥权限。")
             else:
-                return f"DeepSeek API调用失败：HTTP {response.status_code}。错误详情：{error_text[:200]}"
+                raise ai_stream.AIStreamError(f"DeepSeek API调用失败：HTTP {response.status_code}。错误详情：{error_text[:200]}")
 
+    except ai_stream.AIStreamError:
+        raise
     except requests.exceptions.ConnectionError as e:
         print(f"[DEBUG] 连接错误: {str(e)}")
-        return f"无法连接到DeepSeek API服务：{str(e)}。请检查网络连接、DNS设置或防火墙配置。"
+        raise ai_stream.AIStreamError(f"无法连接到DeepSeek API服务：{str(e)}。请检查网络连接、DNS设置或防火墙配置。")
     except requests.exceptions.Timeout as e:
         print(f"[DEBUG] 超时错误: {str(e)}")
-        return "DeepSeek API响应超时，请稍后再试。"
+        raise ai_stream.AIStreamError("DeepSeek API响应超时，请稍后再试。")
     except requests.exceptions.SSLError as e:
         print(f"[DEBUG] SSL错误: {str(e)}")
-        return f"SSL连接错误：{str(e)}。请检查网络安全设置。"
+        raise ai_stream.AIStreamError(f"SSL连接错误：{str(e)}。请检查网络安全设置。")
     except Exception as e:
         print(f"[DEBUG] 未知错误: {str(e)}")
         import traceback
         traceback.print_exc()
-        return f"DeepSeek API调用出现错误：{str(e)[:200]}"
+        raise ai_stream.AIStreamError(f"DeepSeek API调用出现错误：{str(e)[:200]}")
+
+
+def call_deepseek_api(system_prompt, user_message, chat_history=""):
+    """调用DeepSeek API（旧接口：失败时返回错误提示文本而不是抛出异常）"""
+    try:
+        return request_deepseek(system_prompt, user_message, chat_history)
+    except ai_stream.AIStreamError as e:
+        return str(e)
 
 
 def get_system_prompt(chat_type, course_id, request, ai_model='gemini'):
@@ -1665,32 +1596,32 @@ def get_system_prompt(chat_type, course_id, request, ai_model='gemini'):
 
 回答风格：友好、专业、直接、有帮助。用中文回答。"""
 
+    # 用户的课程和进度使用缓存的学习情况快照；通用问题不需要
+    context = None
+    if chat_type in ('study_plan', 'progress_analysis') and request.user.is_authenticated:
+        context = learning_context.get_learning_context(request.user.id)
+
     if chat_type == 'study_plan':
         # 获取用户课程信息
         courses_info = ""
-        if course_id and request.user.is_authenticated:
-            try:
-                course = UserCourse.objects.get(id=course_id, user=request.user)
-                progress = LearningProgress.objects.filter(user_course=course)
-                total_episodes = progress.count()
-                completed_episodes = progress.filter(is_completed=True).count()
-
+        if course_id and context:
+            course = context.get_course(course_id)
+            if course:
+                completion_rate = (course['completed_count'] / course['total_count'] * 100) if course['total_count'] > 0 else 0
                 courses_info = f"""
 当前课程信息：
-- 课程名称：{course.custom_title or course.video.title}
-- 总分集数：{total_episodes}
-- 已完成：{completed_episodes}
-- 完成率：{(completed_episodes/total_episodes*100) if total_episodes > 0 else 0:.1f}%
-- UP主：{course.video.author}
+- 课程名称：{course['title']}
+- 总分集数：{course['total_count']}
+- 已完成：{course['completed_count']}
+- 完成率：{completion_rate:.1f}%
+- UP主：{course['author']}
 """
-            except:
-                pass
-        elif request.user.is_authenticated:
-            user_courses = UserCourse.objects.filter(user=request.user)[:5]
-            if user_courses:
-                courses_info = "用户当前课程：\n"
-                for course in user_courses:
-                    courses_info += f"- {course.custom_title or course.video.title}\n"
+                if course['plan_total_days'] and course['plan_is_active']:
+                    courses_info += f"- 已有学习计划：共{course['plan_total_days']}天，每天{course['plan_daily_minutes']}分钟\n"
+        elif context and context.courses:
+            courses_info = "用户当前课程：\n"
+            for course in context.courses[:5]:
+                courses_info += f"- {course['title']}\n"
 
         return f"""{base_prompt}
 
@@ -1709,10 +1640,10 @@ def get_system_prompt(chat_type, course_id, request, ai_model='gemini'):
 
     elif chat_type == 'progress_analysis':
         # 获取当前用户的学习进度统计
-        if request.user.is_authenticated:
-            total_courses = UserCourse.objects.filter(user=request.user).count()
-            total_progress = LearningProgress.objects.filter(user_course__user=request.user).count()
-            completed_progress = LearningProgress.objects.filter(user_course__user=request.user, is_completed=True).count()
+        if context:
+            total_courses = context.total_courses
+            total_progress = context.total_progress
+            completed_progress = context.completed_progress
         else:
             total_courses = 0
             total_progress = 0
@@ -1790,50 +1721,17 @@ def get_chat_history(request):
         })
 
 
-def check_ai_status(request):
-    """检查AI服务状态"""
+async def check_ai_status(request):
+    """检查AI服务状态（读取缓存的并发探测结果）"""
     try:
-        import requests
-
-        # 检查Gemini API
-        gemini_api_key =  os.getenv('GEMINI_API_KEY')
-        gemini_test_url = f"https://generativelanguage.googleapis.com/v1beta/models?key={gemini_api_key}"
-
-        gemini_response = requests.get(gemini_test_url, timeout=10)
-
-        # 检查DeepSeek API
-        deepseek_api_key = os.getenv('DEEPSEEK_API_KEY')
-        deepseek_test_url = "https://api.deepseek.com/v1/models"
-        deepseek_headers = {
-            'Authorization': f'Bearer {deepseek_api_key}',
-            'Content-Type': 'application/json'
-        }
-
-        deepseek_response = requests.get(deepseek_test_url, headers=deepseek_headers, timeout=10)
-
-        result = {
-            'gemini': {
-                'status': 'normal' if gemini_response.status_code == 200 else 'error',
-                'status_code': gemini_response.status_code,
-                'message': 'API服务正常' if gemini_response.status_code == 200 else f'HTTP {gemini_response.status_code}'
-            },
-            'deepseek': {
-                'status': 'normal' if deepseek_response.status_code == 200 else 'error',
-                'status_code': deepseek_response.status_code,
-                'message': 'API服务正常' if deepseek_response.status_code == 200 else _get_deepseek_error_message(deepseek_response.status_code)
-            }
-        }
-
+        status, cached = await ai_status.get_status()
         return JsonResponse({
             'success': True,
-            'apis': result
-        })
-
-    except requests.exceptions.ConnectionError:
-        return JsonResponse({
-            'success': False,
-            'status': 'API连接失败',
-            'error': '无法连接到AI服务，可能需要代理或检查网络连接'
+            'apis': status['apis'],
+            'checked_at': status['checked_at'],
+            'cached': cached,
+            'circuit_breakers': ai_router.get_state(),
+            'diagnostics': ai_diagnostics.get_snapshot()
         })
     except Exception as e:
         return JsonResponse({
@@ -1842,16 +1740,6 @@ def check_ai_status(request):
             'error': str(e)
         })
 
-def _get_deepseek_error_message(status_code):
-    """获取DeepSeek错误信息"""
-    error_messages = {
-        401: "API密钥无效",
-        402: "账户余额不足或需要付费",
-        429: "请求过于频繁",
-        500: "服务器内部错误"
-    }
-    return error_messages.get(status_code, f"HTTP {status_code}")
-
 
 # 学习计划相关视图函数
 @login_required
@@ -1948,11 +1836,8 @@ def plan_detail(request, plan_id):
     course_progress = LearningProgress.objects.filter(user_course=plan.user_course).order_by('episode__order')
 
     # 获取课程进度统计
-    total_episodes = plan.user_course.video.episodes.count()
-    completed_episodes = LearningProgress.objects.filter(
-        user_course=plan.user_course,
-        is_completed=True
-    ).count()
+    total_episodes = plan.user_course.total_count
+    completed_episodes = plan.user_course.completed_count
 
     # 计算统计信息
     # 使用实际完成分集的时长来计算总学习时长
@@ -2014,26 +1899,20 @@ def update_daily_record(request, plan_id):
 
         # 处理完成的分集
         completed_count = 0
-        if completed_episodes:
-            from django.utils import timezone
+        progress_ids = [int(pid) for pid in completed_episodes if str(pid).isdigit()]
+        if progress_ids:
             current_time = timezone.now()
 
-            for progress_id in completed_episodes:
-                try:
-                    progress = LearningProgress.objects.get(
-                        id=progress_id,
-                        user_course=plan.user_course
-                    )
-
-                    # 只有未完成的分集才能被标记为完成
-                    if not progress.is_completed:
-                        progress.is_completed = True
-                        progress.completed_at = current_time
-                        progress.save()
-                        completed_count += 1
+            with transaction.atomic():
+                # 只有未完成的分集才能被标记为完成；条件更新保证并发请求不会重复计数同一分集
+                completed_count = LearningProgress.objects.filter(
+                    id__in=progress_ids,
+                    user_course=plan.user_course,
+                    is_completed=False
+                ).update(is_completed=True, completed_at=current_time, update_time=current_time)
 
-                except LearningProgress.DoesNotExist:
-                    continue
+                # 按实际更新的行数同步进度计数器
+                plan.user_course.adjust_completed_count(completed_count)
 
         return JsonResponse({
             'success': True,
@@ -2476,11 +2355,7 @@ def account_settings(request):
     completed_episodes = 0
     total_study_minutes = 0
 
-    for course in user_courses:
-        completed_episodes += LearningProgress.objects.filter(
-            user_course=course,
-            is_completed=True
-        ).count()
+    completed_episodes = user_courses.aggregate(total=Sum('completed_count'))['total'] or 0
 
     # 计算总学习时间（从学习计划的每日记录中）
     study_plans = StudyPlan.objects.filter(user=request.user)
@@ -2684,6 +2559,8 @@ def delete_account(request):
                     if session_id:
                         deleted_chats = ChatHistory.objects.filter(session_id=session_id).count()
                         ChatHistory.objects.filter(session_id=session_id).delete()
+                        # 会话摘要中保存着这些对话的内容，一并删除
+                        chat_memory.forget(session_id)
                 except (ImportError, Exception) as e:
                     # 如果ChatHistory模型不存在或其他错误，记录但不中断流程
                     print(f"删除聊天历史时出错: {str(e)}")
@@ -2859,20 +2736,17 @@ def delete_study_record(request, plan_id):
             start_of_day = datetime.combine(study_date, time.min)
             end_of_day = datetime.combine(study_date, time.max)
 
-            # 查找在该日完成的学习进度记录并重置
+            # 重置在该日完成的学习进度记录；条件更新只重置仍为已完成的分集，并发请求不会重复计数
             user_course = plan.user_course
-            daily_progress_records = LearningProgress.objects.filter(
-                user_course=user_course,
-                is_completed=True,
-                completed_at__range=(start_of_day, end_of_day)
-            )
+            with transaction.atomic():
+                reverted_episodes_count = LearningProgress.objects.filter(
+                    user_course=user_course,
+                    is_completed=True,
+                    completed_at__range=(start_of_day, end_of_day)
+                ).update(is_completed=False, completed_at=None, update_time=timezone.now())
 
-            # 重置这些分集的完成状态
-            for progress in daily_progress_records:
-                progress.is_completed = False
-                progress.completed_at = None
-                progress.save()
-                reverted_episodes_count += 1
+                # 按实际更新的行数同步进度计数器
+                user_course.adjust_completed_count(-reverted_episodes_count)
 
         # 删除学习记录
         record.delete()
@@ -3021,443 +2895,65 @@ def mark_guide_viewed(request):
         return JsonResponse({'success': False, 'message': str(e)})
 
 
+@require_POST
 def export_plan_pdf(request, plan_id):
-    """导出学习计划PDF报告 - 直接下载PDF文件"""
+    """提交学习报告PDF生成任务；报告在后台生成，前端轮询 plan_report_status 后下载"""
     if not request.user.is_authenticated:
-        from django.shortcuts import redirect
-        return redirect('index')
-
-    try:
-        from django.http import HttpResponse
-        from datetime import datetime
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib import colors
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-        from reportlab.pdfbase import pdfmetrics
-        from reportlab.pdfbase.ttfonts import TTFont
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT
-        from io import BytesIO
-
-        # 获取学习计划和相关数据
-        plan = get_object_or_404(StudyPlan, id=plan_id, user=request.user)
-        daily_records = DailyStudyRecord.objects.filter(study_plan=plan).order_by('study_date')
-
-        # 计算统计数据
-        total_study_time = sum(record.study_minutes for record in daily_records)
-        completed_days = daily_records.filter(study_minutes__gt=0).count()
-        avg_daily_time = total_study_time / max(completed_days, 1)
-
-        # 创建PDF文档
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-
-        # 注册中文字体（尝试使用系统字体）
-        try:
-            pdfmetrics.registerFont(TTFont('SimHei', 'C:/Windows/Fonts/simhei.ttf'))
-            chinese_font = 'SimHei'
-        except:
-            try:
-                pdfmetrics.registerFont(TTFont('SimSun', 'C:/Windows/Fonts/simsun.ttc'))
-                chinese_font = 'SimSun'
-            except:
-                chinese_font = 'Helvetica'  # 回退到默认字体
-
-        # 创建样式
-        styles = getSampleStyleSheet()
-
-        # 自定义样式
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontName=chinese_font,
-            fontSize=20,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=colors.HexColor('#1e40af')
-        )
-
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontName=chinese_font,
-            fontSize=14,
-            spaceAfter=12,
-            spaceBefore=20,
-            textColor=colors.HexColor('#1e40af')
-        )
-
-        normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=styles['Normal'],
-            fontName=chinese_font,
-            fontSize=10,
-            spaceAfter=6,
-            leading=14
-        )
-
-        # 构建PDF内容
-        story = []
-
-        # 报告标题和头部信息
-        course_title = plan.user_course.custom_title or plan.user_course.video.title
-        current_time = datetime.now()
-
-        # 主标题 - 更简洁的设计
-        story.append(Paragraph(f"📚 {course_title}", title_style))
-        story.append(Paragraph("学习报告", title_style))
-        story.append(Spacer(1, 12))
-
-        # 副标题样式
-        subtitle_style = ParagraphStyle(
-            'Subtitle',
-            parent=styles['Normal'],
-            fontName=chinese_font,
-            fontSize=11,
-            alignment=TA_CENTER,
-            textColor=colors.HexColor('#64748b'),
-            spaceAfter=24
-        )
-
-        story.append(Paragraph(f"报告生成时间：{current_time.strftime('%Y年%m月%d日')}", subtitle_style))
-        story.append(Spacer(1, 8))
-
-        # 学习概览卡片
-        overview_data = [
-            ['📚 课程', course_title],
-            ['👤 作者', plan.user_course.video.author],
-            ['📅 计划周期', f'{plan.total_days}天'],
-            ['⏰ 每日目标', f'{plan.daily_minutes}分钟'],
-            ['📈 当前进度', f'{plan.progress_percentage:.1f}%']
-        ]
-
-        overview_table = Table(overview_data, colWidths=[1.2*inch, 4.8*inch])
-        overview_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#3b82f6')),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
-            ('BACKGROUND', (1, 0), (1, -1), colors.HexColor('#eff6ff')),
-            ('TEXTCOLOR', (1, 0), (1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), chinese_font),
-            ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-            ('ROWBACKGROUNDS', (1, 0), (1, -1), [colors.HexColor('#eff6ff')])
-        ]))
-
-        story.append(overview_table)
-        story.append(Spacer(1, 20))
-
-        # 计算详细统计数据
-        completion_rate = (completed_days / max(plan.days_passed, 1)) * 100
-        target_vs_actual = (total_study_time / max(plan.days_passed * plan.daily_minutes, 1)) * 100
-        remaining_days = max(plan.total_days - plan.days_passed, 0)
-        estimated_completion_time = remaining_days * plan.daily_minutes
-
-        # 计算预计完成日期
-        from datetime import timedelta
-        estimated_end_date = plan.start_date + timedelta(days=plan.total_days - 1)
-
-        # 计算学习效率指标
-        if plan.days_passed > 0:
-            daily_completion_rate = completion_rate / 100
-            learning_efficiency = target_vs_actual / 100
-        else:
-            daily_completion_rate = 0
-            learning_efficiency = 0
-
-        # 学习成果总结
-        story.append(Paragraph("📈 学习成果总结", heading_style))
-
-        # 计算关键指标
-        study_efficiency = (total_study_time / max(plan.days_passed * plan.daily_minutes, 1)) * 100
-        consistency_rate = (completed_days / max(plan.days_passed, 1)) * 100
-
-        # 生成评价
-        efficiency_grade = "优秀" if study_efficiency >= 90 else "良好" if study_efficiency >= 70 else "一般" if study_efficiency >= 50 else "待提升"
-        consistency_grade = "优秀" if consistency_rate >= 90 else "良好" if consistency_rate >= 70 else "一般" if consistency_rate >= 50 else "待提升"
-
-        summary_data = [
-            ['学习指标', '实际表现', '评价等级'],
-            ['📚 累计学习', f'{total_study_time}分钟 ({total_study_time//60}小时{total_study_time%60}分钟)', f'已完成 {study_efficiency:.1f}% 目标'],
-            ['📅 坚持天数', f'{completed_days}/{plan.days_passed}天', f'{consistency_grade} ({consistency_rate:.1f}%)'],
-            ['⏰ 平均时长', f'{avg_daily_time:.0f}分钟/天', efficiency_grade],
-            ['🎯 剩余计划', f'{remaining_days}天', f'预计需要 {estimated_completion_time//60}小时'],
-        ]
-
-        overview_table = Table(overview_data, colWidths=[2*inch, 2*inch, 2*inch])
-        overview_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('BACKGROUND', (0, 1), (0, -1), colors.HexColor('#eff6ff')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), chinese_font),
-            ('FONTSIZE', (0, 0), (-1, 0), 11),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#eff6ff')])
-        ]))
-
-        story.append(overview_table)
-        story.append(Spacer(1, 20))
-
-
-
-        # 最近学习记录
-        if daily_records.exists():
-            story.append(Paragraph("📅 最近学习记录", heading_style))
-
-            # 只显示最近10天的记录
-            recent_records = daily_records.order_by('-study_date')[:10]
-            records_table_data = [['日期', '实际时长', '完成率', '状态']]
-
-            for record in recent_records:
-                completion_rate_val = (record.study_minutes / max(plan.daily_minutes, 1)) * 100 if plan.daily_minutes > 0 else 0
-
-                if record.study_minutes >= plan.daily_minutes:
-                    status = '✅ 达标'
-                elif record.study_minutes > 0:
-                    status = '⚠️ 部分'
-                else:
-                    status = '❌ 未学'
-
-                records_table_data.append([
-                    record.study_date.strftime('%m-%d'),
-                    f'{record.study_minutes}分钟',
-                    f'{min(completion_rate_val, 100):.0f}%',
-                    status
-                ])
-
-            records_table = Table(records_table_data, colWidths=[1*inch, 1.5*inch, 1*inch, 1.5*inch])
-            records_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, -1), chinese_font),
-                ('FONTSIZE', (0, 0), (-1, 0), 11),
-                ('FONTSIZE', (0, 1), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                ('TOPPADDING', (0, 0), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8fafc')])
-            ]))
-
-            story.append(records_table)
-            story.append(Spacer(1, 16))
-
-        else:
-            story.append(Paragraph("📅 最近学习记录", heading_style))
-            story.append(Paragraph("暂无学习记录，建议开始记录每日学习情况。", normal_style))
-
-        story.append(Spacer(1, 20))
-
-        # 六、专业分析与改进建议
-        story.append(Paragraph("六、专业分析与改进建议", heading_style))
-
-        # 简化的学习建议
-        if daily_records.exists():
-            excellent_count = sum(1 for record in daily_records if record.study_minutes >= plan.daily_minutes)
-            excellent_rate = (excellent_count / len(daily_records)) * 100
-            overall_performance = "优秀" if excellent_rate >= 70 else "良好" if excellent_rate >= 50 else "一般" if excellent_rate >= 30 else "待改进"
-        else:
-            excellent_rate = 0
-            overall_performance = "无数据"
-
-        # 生成专业分析报告
-        analysis_data = [
-            ['分析维度', '当前状况', '专业评估', '具体建议'],
-            ['整体表现', f'{overall_performance} (优秀率{excellent_rate:.1f}%)',
-             '优秀' if excellent_rate >= 70 else '良好' if excellent_rate >= 50 else '需改进',
-             '继续保持高标准' if excellent_rate >= 70 else '提升学习质量和时长'],
-            ['学习规律', f'平均{avg_daily_time:.1f}分钟/天',
-             '规律' if abs(avg_daily_time - plan.daily_minutes) <= 15 else '不够规律',
-             '保持当前节奏' if abs(avg_daily_time - plan.daily_minutes) <= 15 else '建议固定学习时间段'],
-            ['目标达成', f'{target_vs_actual:.1f}%完成度',
-             '达标' if target_vs_actual >= 80 else '接近达标' if target_vs_actual >= 60 else '未达标',
-             '保持现状' if target_vs_actual >= 80 else '需要增加学习投入'],
-            ['学习坚持', f'{completion_rate:.1f}%出勤率',
-             '优秀' if completion_rate >= 85 else '良好' if completion_rate >= 70 else '一般',
-             '继续保持' if completion_rate >= 70 else '设置学习提醒和激励机制']
-        ]
-
-        analysis_table = Table(analysis_data, colWidths=[1.2*inch, 1.5*inch, 1.3*inch, 2*inch])
-        analysis_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#7c3aed')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('BACKGROUND', (0, 1), (0, -1), colors.HexColor('#f3e8ff')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), chinese_font),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f3e8ff')])
-        ]))
-
-        story.append(analysis_table)
-        story.append(Spacer(1, 16))
-
-        # 个性化改进建议
-        story.append(Paragraph("个性化改进建议：", heading_style))
-
-        # 根据实际数据生成针对性建议
-        suggestions = []
-
-        # 基于学习坚持性的建议
-        if completion_rate >= 90:
-            suggestions.append("1. 学习坚持性表现优异，建议挑战更高难度的学习内容。")
-        elif completion_rate >= 70:
-            suggestions.append("1. 学习坚持性良好，建议设定每周学习目标来进一步提升。")
-        else:
-            suggestions.append("1. 学习坚持性需要改进，建议使用番茄工作法，每次学习25分钟。")
-
-        # 基于学习时长的建议
-        if target_vs_actual >= 100:
-            suggestions.append("2. 学习时长已达标，可以考虑增加学习深度和复习频率。")
-        elif target_vs_actual >= 80:
-            suggestions.append("2. 学习时长接近目标，建议每天增加10-15分钟的复习时间。")
-        else:
-            suggestions.append("2. 学习时长不足，建议将大块学习时间分解为多个小时段。")
-
-        # 基于学习规律的建议
-        if daily_records.exists():
-            weekend_study = sum(1 for record in daily_records if record.study_date.weekday() >= 5 and record.study_minutes > 0)
-            weekday_study = sum(1 for record in daily_records if record.study_date.weekday() < 5 and record.study_minutes > 0)
-
-            if weekend_study > 0 and weekday_study > 0:
-                suggestions.append("3. 工作日和周末都有学习记录，学习安排较为均衡。")
-            elif weekday_study > weekend_study:
-                suggestions.append("3. 工作日学习较多，建议周末也保持一定的学习强度。")
-            else:
-                suggestions.append("3. 建议在工作日也安排固定的学习时间，保持学习连续性。")
-
-        # 通用专业建议
-        suggestions.extend([
-            "4. 建议使用费曼学习法：学完后尝试向他人解释所学内容。",
-            "5. 定期进行学习回顾，每周总结学习成果和遇到的问题。",
-            "6. 建立学习社群，与同样在学习的伙伴互相监督和鼓励。"
-        ])
-
-        for suggestion in suggestions:
-            story.append(Paragraph(suggestion, normal_style))
-            story.append(Spacer(1, 8))
-
-        story.append(Spacer(1, 24))
-
-        # 报告总结
-        story.append(Paragraph("七、报告总结", heading_style))
-
-        # 生成总结性评价
-        if daily_records.exists():
-            total_planned_time = plan.days_passed * plan.daily_minutes
-            efficiency_score = min((total_study_time / max(total_planned_time, 1)) * 100, 100)
-            consistency_score = completion_rate
-            overall_score = (efficiency_score + consistency_score) / 2
-
-            if overall_score >= 85:
-                grade = "A (优秀)"
-                summary_text = "您的学习表现非常出色，已经建立了良好的学习习惯。"
-            elif overall_score >= 70:
-                grade = "B (良好)"
-                summary_text = "您的学习表现良好，继续保持并适当提升学习强度。"
-            elif overall_score >= 60:
-                grade = "C (一般)"
-                summary_text = "您的学习表现一般，需要在坚持性和效率方面有所改进。"
-            else:
-                grade = "D (待改进)"
-                summary_text = "您的学习表现有待提升，建议重新规划学习计划。"
-        else:
-            grade = "N/A (无数据)"
-            summary_text = "暂无足够数据进行评估，建议开始记录学习情况。"
-
-        summary_content = f"""
-        <b>综合评估等级：</b>{grade}<br/>
-        <b>学习效率得分：</b>{efficiency_score:.1f}分 (满分100分)<br/>
-        <b>学习坚持得分：</b>{consistency_score:.1f}分 (满分100分)<br/>
-        <b>综合表现得分：</b>{overall_score:.1f}分 (满分100分)<br/><br/>
-        <b>总结评价：</b>{summary_text}
-        """
-
-        story.append(Paragraph(summary_content, normal_style))
-        story.append(Spacer(1, 20))
-
-        # 专业报告页脚
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=styles['Normal'],
-            fontName=chinese_font,
-            fontSize=8,
-            alignment=TA_CENTER,
-            textColor=colors.HexColor('#64748b')
-        )
+        return JsonResponse({'success': False, 'message': '请先登录'})
 
-        divider_style = ParagraphStyle(
-            'Divider',
-            parent=styles['Normal'],
-            fontName=chinese_font,
-            fontSize=10,
-            alignment=TA_CENTER,
-            textColor=colors.HexColor('#3b82f6')
-        )
+    plan = get_object_or_404(StudyPlan, id=plan_id, user=request.user)
+    # mode=full 时附上全部学习记录（分页表格）
+    include_all_records = request.POST.get('mode') == 'full'
+    job, reused = report_jobs.request_report(plan, request.user, include_all_records)
+    return JsonResponse({'success': True, 'reused': reused, **_report_job_payload(job)})
 
-        story.append(Paragraph("═" * 60, divider_style))
-        story.append(Spacer(1, 8))
-        story.append(Paragraph("B站学习工具 - 个人学习分析系统", footer_style))
-        story.append(Paragraph(f"报告编号：RPT-{plan.id}-{current_time.strftime('%Y%m%d%H%M')}", footer_style))
-        story.append(Paragraph(f"生成时间：{current_time.strftime('%Y年%m月%d日 %H:%M:%S')}", footer_style))
-        story.append(Paragraph("本报告基于真实学习数据生成，仅供个人学习参考", footer_style))
-        story.append(Spacer(1, 8))
-        story.append(Paragraph("持续学习，成就更好的自己！", footer_style))
 
-        # 生成PDF
-        doc.build(story)
+def _report_job_payload(job):
+    payload = {
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': reverse('plan_report_status', args=[job.id]),
+    }
+    if job.status == 'done':
+        payload['download_url'] = reverse('download_plan_report', args=[job.id])
+    elif job.status == 'failed':
+        payload['error'] = job.error
+    return payload
 
-        # 创建HTTP响应
-        pdf = buffer.getvalue()
-        buffer.close()
 
-        response = HttpResponse(pdf, content_type='application/pdf')
+def plan_report_status(request, job_id):
+    """查询学习报告生成任务的状态"""
+    if not request.user.is_authenticated:
+        return JsonResponse({'success': False, 'message': '请先登录'})
 
-        # 清理文件名，移除特殊字符
-        import re
-        clean_title = re.sub(r'[<>:"/\\|?*]', '', course_title)
-        clean_title = clean_title.replace(' ', '_')[:30]  # 限制长度并替换空格
+    job = get_object_or_404(PlanReportJob, id=job_id, user=request.user)
+    return JsonResponse({'success': True, **_report_job_payload(job)})
 
-        current_date = datetime.now().strftime("%Y%m%d")
-        filename = f'学习计划详细报告_{clean_title}_{current_date}.pdf'
 
-        # 使用URL编码确保中文文件名正确显示
-        from urllib.parse import quote
-        encoded_filename = quote(filename.encode('utf-8'))
-        response['Content-Disposition'] = f'attachment; filename*=UTF-8\'\'{encoded_filename}'
+def download_plan_report(request, job_id):
+    """下载已生成的学习报告PDF"""
+    if not request.user.is_authenticated:
+        return redirect('index')
 
-        return response
+    job = get_object_or_404(PlanReportJob, id=job_id, user=request.user, status='done')
+    # 报告按内容寻址，数据指纹即ETag；浏览器已有同一份报告时返回304
+    etag = f'"{job.fingerprint}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['Cache-Control'] = 'private, no-cache'
+        return not_modified
 
-    except Exception as e:
-        import traceback
-        print(f"PDF导出错误: {str(e)}")
-        print(traceback.format_exc())
+    try:
+        report = job.file.open('rb')
+    except FileNotFoundError:
+        raise Http404('报告文件不存在，请重新导出')
 
-        # 返回一个简单的错误页面
-        from django.http import HttpResponse
-        error_html = f"""
-        <html>
-        <head><title>PDF导出错误</title></head>
-        <body>
-            <h1>PDF导出失败</h1>
-            <p>错误信息: {str(e)}</p>
-            <p><a href="javascript:history.back()">返回</a></p>
-        </body>
-        </html>
-        """
-        return HttpResponse(error_html)
+    from .plan_report import content_disposition
+    response = FileResponse(report, content_type='application/pdf')
+    response['Content-Disposition'] = content_disposition(job.filename)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 
@@ -3481,26 +2977,38 @@ def ai_content_analysis(request):
         # 生成AI分析提示词
         prompt = get_ai_analysis_prompt(search_query, video_data)
 
+        # 已有结论（含管理员修正）直接返回，不再调用AI
+        verdict = ai_verdicts.get_verdict(search_query, prompt)
+        if verdict is not None:
+            return JsonResponse({
+                'success': True,
+                **ai_verdicts.verdict_to_result(verdict),
+                'cached': True
+            })
+
         # 调用AI进行语义分析
         try:
-            # 优先使用DeepSeek
             system_prompt = "你是一个专业的内容分析助手，专门判断搜索内容是否与学习、教育、知识获取相关。请严格按照要求的格式回复。"
-            ai_response = call_deepseek_api(system_prompt, prompt, "")
 
-            if "无法连接" in ai_response or "调用失败" in ai_response:
-                # DeepSeek失败，尝试Gemini
-                try:
-                    import google.generativeai as genai
-                    api_key = os.getenv('GEMINI_API_KEY')
-                    genai.configure(api_key=api_key)
-                    model = genai.GenerativeModel('gemini-1.5-flash')
-                    response = model.generate_content(f"{system_prompt}\n\n{prompt}")
-                    ai_response = response.text
-                except Exception as e:
-                    return JsonResponse({
-                        'success': False,
-                        'message': f'AI分析服务暂时不可用: {str(e)}'
-                    })
+            def ask_deepseek():
+                return request_deepseek(system_prompt, prompt, "")
+
+            def ask_gemini():
+                import google.generativeai as genai
+                api_key = os.getenv('GEMINI_API_KEY')
+                genai.configure(api_key=api_key)
+                model = genai.GenerativeModel('gemini-1.5-flash')
+                response = model.generate_content(f"{system_prompt}\n\n{prompt}")
+                return response.text
+
+            # 优先使用DeepSeek，失败或熔断时立即切换到Gemini
+            try:
+                source, ai_response = ai_router.call_with_failover([('deepseek', ask_deepseek), ('gemini', ask_gemini)])
+            except Exception as e:
+                return JsonResponse({
+                    'success': False,
+                    'message': ai_diagnostics.with_diagnostics(f'AI分析服务暂时不可用: {str(e)}')
+                })
 
             # 解析AI回复
             is_learning = None
@@ -3532,12 +3040,18 @@ def ai_content_analysis(request):
                 elif any(word in ai_response.lower() for word in ['娱乐', '游戏', '搞笑', '非学习']):
                     is_learning = False
 
-            return JsonResponse({
-                'success': True,
+            result = {
                 'is_learning_related': is_learning,
                 'confidence': confidence,
                 'reason': reason,
                 'full_response': ai_response
+            }
+            ai_verdicts.save_verdict(search_query, prompt, result, source)
+
+            return JsonResponse({
+                'success': True,
+                **result,
+                'cached': False
             })
 
         except Exception as e: